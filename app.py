@@ -1,48 +1,319 @@
-from flask import Flask, render_template, jsonify, request, session
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    jsonify,
+    request,
+    send_file,
+    session,
+    stream_with_context,
+    url_for,
+)
 from flask_cors import CORS
-from collections import defaultdict
-from jinja2 import Template
-import psycopg2
+from itertools import groupby
+from jinja2 import FileSystemBytecodeCache
+from operator import itemgetter
 import smtplib
+import socket
 import os
+import hashlib
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-import matplotlib
 from email.mime.text import MIMEText
 
-matplotlib.use("Agg")  # Using the backend without a graphical interface
-import matplotlib.pyplot as plt
-import pdfkit
-from datetime import datetime, timedelta
-import base64
+from datetime import datetime, timedelta, timezone
 import io
 import asyncio
-import aiohttp
-import google.generativeai as genai
+import click
+import json
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 
+from cache import LRUCache, PostgresBackend, RedisBackend, ResponseCache
+from charts import ChartCache
+from compression import ResponseCompressor
+from context import ContextBuilder
+from db import ConnectionPool, day_range, first_of_cluster
+from dedup import NearDuplicateIndex, cluster_news
+from embeddings import EmbeddingIndex, build_index, create_embedder
+from fetcher import Fetcher
+from llm import CachingModel, cache_key, create_model
+from ingest import (
+    NEWS_API_URL,
+    bulk_save_news,
+    fetch_new_articles,
+    ingest_progress,
+    load_high_water_marks,
+    load_ingest_gaps,
+    normalize_article,
+    save_high_water_marks,
+)
+from jobs import JobQueue, QueueFull
+from listing import list_articles, parse_fields
+from pdf import create_backend
+from reports import ReportStore
+from rollup import counts_by_category, counts_by_day, rebuild_counts
+from scheduler import IngestScheduler
+from schema import migrate
+from search import search_articles
+from serialization import EncoderJSONProvider, create_encoder, json_rows_response
+from sessions import ChatSessionStore, MemorySessionBackend, PostgresSessionBackend
+from storage import NewsStorage, add_months
+
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY")
 
-# Створюємо конфігурацію для pdfkit
-config = pdfkit.configuration(
-    wkhtmltopdf=r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-)
+# JSON encoder of every response: "orjson", or "stdlib" (also the fallback
+# when orjson is not installed)
+json_encoder = create_encoder(os.getenv("JSON_ENCODER", "orjson"))
+app.json = EncoderJSONProvider(app, json_encoder)
+# Stream the article lists from a server-side cursor instead of encoding
+# them whole. Saves memory on busy days, but holds a database connection
+# while the client downloads, and streamed lists are neither compressed
+# nor cached.
+JSON_STREAM = os.getenv("JSON_STREAM", "0") == "1"
+JSON_STREAM_FETCH_SIZE = int(os.getenv("JSON_STREAM_FETCH_SIZE", "1000"))
 
 API_KEY = os.getenv("NEWS_API_KEY")
 DB_CONFIG = {
-    "dbname": "newsdb",
-    "user": "postgres",
+    "dbname": os.getenv("DB_NAME", "newsdb"),
+    "user": os.getenv("DB_USER", "postgres"),
     "password": os.getenv("BD_PASSWORD"),
-    "host": "localhost",
+    "host": os.getenv("DB_HOST", "localhost"),
+    # libpq options, e.g. "-c search_path=bench"
+    "options": os.getenv("DB_OPTIONS"),
 }
 
+# Connections are shared by all request threads instead of opened per query
+db_pool = ConnectionPool(
+    minconn=int(os.getenv("DB_POOL_MIN", "1")),
+    maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    **DB_CONFIG,
+)
+
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-# Model initialization
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Chat model: "gemini", or "fake" to answer offline (development, benchmarks)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_OPTIONS = {
+    "gemini": {
+        "name": os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),
+        "api_key": os.getenv("GOOGLE_API_KEY"),
+    },
+    "fake": {
+        "first_token_delay": float(os.getenv("FAKE_LLM_FIRST_TOKEN_DELAY", "0.3")),
+        "token_delay": float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.02")),
+    },
+}
+# Identical questions about the same news share one answer, and concurrent
+# ones one model call
+model = CachingModel(
+    create_model(LLM_BACKEND, **LLM_OPTIONS.get(LLM_BACKEND, {})),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", "600")),
+)
+
+# How often the background worker refreshes the news table
+INGEST_INTERVAL_MINUTES = int(os.getenv("INGEST_INTERVAL_MINUTES", "30"))
+RUN_INGEST_SCHEDULER = os.getenv("RUN_INGEST_SCHEDULER", "1") == "1"
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+# Incremental fetches: how far back a category without a high-water mark
+# starts, and how many pages of new articles one run reads per category.
+# NEWS_API_URL can point to a local fixture server (see newsapi_fixture.py).
+NEWS_API_URL = os.getenv("NEWS_API_URL", NEWS_API_URL)
+INGEST_BACKFILL_DAYS = int(os.getenv("INGEST_BACKFILL_DAYS", "7"))
+INGEST_PAGE_SIZE = int(os.getenv("INGEST_PAGE_SIZE", "100"))
+INGEST_MAX_PAGES = int(os.getenv("INGEST_MAX_PAGES", "5"))
+# NewsAPI client: requests in flight, sustained rate and burst of the quota,
+# and how failed requests are retried
+news_fetcher = Fetcher(
+    concurrency=int(os.getenv("NEWS_API_CONCURRENCY", "4")),
+    rate=float(os.getenv("NEWS_API_RATE", "5")),
+    burst=int(os.getenv("NEWS_API_BURST", "10")),
+    timeout=float(os.getenv("NEWS_API_TIMEOUT", "15")),
+    max_attempts=int(os.getenv("NEWS_API_MAX_ATTEMPTS", "4")),
+    backoff=float(os.getenv("NEWS_API_BACKOFF", "0.5")),
+)
+# Near-duplicate clustering at ingest: syndicated copies of a story share a
+# cluster_id, so /articles, reports and the chat context show each story
+# once. DEDUP_WINDOW_DAYS bounds how far apart copies are matched (and the
+# articles kept in memory); `flask cluster-news` clusters stored articles.
+news_clusters = (
+    NearDuplicateIndex(
+        threshold=float(os.getenv("DEDUP_SIMILARITY", "0.7")),
+        window_days=float(os.getenv("DEDUP_WINDOW_DAYS", "3")),
+    )
+    if os.getenv("NEWS_DEDUP", "1") == "1"
+    else None
+)
+
+# Monthly partitions of the news table: every ingest run creates them
+# NEWS_PARTITIONS_AHEAD months ahead, and with NEWS_RETENTION_MONTHS set
+# archives older months to NEWS_ARCHIVE_DIR as CSV.gz and drops them
+# (`flask restore-news` loads them back)
+news_storage = NewsStorage(
+    db_pool,
+    archive_dir=os.getenv("NEWS_ARCHIVE_DIR", "archive"),
+    months_ahead=int(os.getenv("NEWS_PARTITIONS_AHEAD", "2")),
+    retention_months=int(os.getenv("NEWS_RETENTION_MONTHS", "0")),
+)
+
+# Read-only JSON endpoints are cached until ingest changes their data. The
+# data versions are shared by all workers (and a separate `flask ingest
+# --loop` process) through PostgreSQL, or through Redis together with the
+# responses if CACHE_REDIS_URL is set. CACHE_VERSIONS=local keeps them in
+# the process, which is only right for a single process.
+CACHE_VERSIONS = os.getenv("CACHE_VERSIONS", "postgres")
+response_cache = ResponseCache(
+    LRUCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000")),
+        max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "300")),
+    ),
+    shared=(
+        RedisBackend(os.environ["CACHE_REDIS_URL"])
+        if os.getenv("CACHE_REDIS_URL")
+        else None
+    ),
+    versions=PostgresBackend(db_pool) if CACHE_VERSIONS == "postgres" else None,
+)
+
+# JSON and HTML responses are compressed for clients that accept it;
+# RESPONSE_COMPRESSION lists the encodings by preference ("" turns it off)
+response_compressor = ResponseCompressor(
+    encodings=[e for e in os.getenv("RESPONSE_COMPRESSION", "br,gzip").split(",") if e],
+    min_size=int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024")),
+)
+app.after_request(response_compressor.compress)
+
+# Page size of /articles: default and maximum
+ARTICLES_PAGE_SIZE = int(os.getenv("ARTICLES_PAGE_SIZE", "50"))
+ARTICLES_MAX_PAGE_SIZE = int(os.getenv("ARTICLES_MAX_PAGE_SIZE", "200"))
+
+# News context of /chat prompts: articles per category read for a date, and
+# the estimated token budget the most relevant of them are fitted into
+chat_context = ContextBuilder(
+    db_pool,
+    per_category=int(os.getenv("CHAT_CONTEXT_PER_CATEGORY", "100")),
+    token_budget=int(os.getenv("CHAT_CONTEXT_TOKENS", "6000")),
+    similarity=float(os.getenv("CHAT_DEDUP_SIMILARITY", "0.8")),
+)
+
+# Embedding index of all stored articles, so chat questions can span more
+# than one day; filled during ingest (backfill with `flask build-index`)
+EMBEDDER = os.getenv("EMBEDDER", "hashing")
+EMBEDDER_OPTIONS = {
+    "hashing": {"dim": int(os.getenv("EMBEDDING_DIM", "256"))},
+    "gemini": {"api_key": os.getenv("GOOGLE_API_KEY")},
+}
+news_index = EmbeddingIndex(
+    os.getenv("NEWS_INDEX_DIR", "news_index"),
+    create_embedder(EMBEDDER, **EMBEDDER_OPTIONS.get(EMBEDDER, {})),
+)
+# Set while stored articles may be missing from the index (after a failed
+# append, or stored while the app was down); the next ingest run adds them
+news_index_behind = threading.Event()
+news_index_behind.set()
+CHAT_RETRIEVAL_TOP_K = int(os.getenv("CHAT_RETRIEVAL_TOP_K", "100"))
+# Chat scopes: days up to and including the chosen date, None for all news
+CHAT_SCOPES = {"day": 1, "week": 7, "month": 30, "all": None}
+
+
+def summarize_chat(summary, turns):
+    """Asks the chat model to fold older turns into the conversation summary."""
+    transcript = "\n".join(f"User: {t['user']}\nAI: {t['ai']}" for t in turns)
+    earlier = f"Earlier summary:\n{summary}\n" if summary else ""
+    prompt = f"""
+    Summarize this conversation about the news in at most five short bullet
+    points. Keep the names, dates and facts the user may refer back to.
+
+    {earlier}
+    Conversation:
+    {transcript}
+    """
+    return model.generate(prompt).strip()
+
+
+# Conversations live on the server, referenced by an id in the session
+# cookie: the cookie stays small, and a streamed answer can be saved after
+# the response headers (and so the cookie) have been sent.
+# CHAT_SESSION_BACKEND=postgres shares them between workers.
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "3600"))
+chat_sessions = ChatSessionStore(
+    (
+        PostgresSessionBackend(db_pool, ttl=CHAT_SESSION_TTL)
+        if os.getenv("CHAT_SESSION_BACKEND", "memory") == "postgres"
+        else MemorySessionBackend(
+            max_entries=int(os.getenv("CHAT_SESSIONS_MAX", "10000")),
+            ttl=CHAT_SESSION_TTL,
+        )
+    ),
+    # "extract" keeps questions and first sentences without a model call
+    summarize=summarize_chat if os.getenv("CHAT_SUMMARIZER", "model") == "model" else None,
+    keep_turns=int(os.getenv("CHAT_KEEP_TURNS", "6")),
+)
+chat_stats = {
+    "answers": 0,
+    "streams": 0,
+    "cancelled": 0,
+    "errors": 0,
+    "first_token_seconds": 0.0,
+}
+
+# Rendered charts, shared by the /chart endpoint and the PDF reports
+chart_cache = ChartCache(max_entries=int(os.getenv("CHART_CACHE_MAX_ENTRIES", "256")))
+
+# Reports are built and emailed in the background, off the request thread
+report_queue = JobQueue(
+    workers=int(os.getenv("REPORT_WORKERS", "2")),
+    max_pending=int(os.getenv("REPORT_MAX_PENDING", "100")),
+    max_attempts=int(os.getenv("REPORT_MAX_ATTEMPTS", "4")),
+    backoff=float(os.getenv("REPORT_RETRY_BACKOFF", "5")),
+)
+# Generated PDFs are kept per date, locale and news fingerprint and reused
+# until the news of that date changes
+report_store = ReportStore(
+    root=os.getenv("REPORT_DIR", "reports"),
+    max_bytes=int(os.getenv("REPORT_CACHE_MAX_BYTES", str(500 * 1024 * 1024))),
+    max_age=float(os.getenv("REPORT_CACHE_MAX_AGE_DAYS", "30")) * 86400,
+)
+REPORT_TEMPLATE_DIR = "templates"
+# Compiled templates are cached here (a per-user temporary directory by
+# default) and shared by all workers
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+app.jinja_options = {
+    **app.jinja_options,
+    "bytecode_cache": FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+}
+# Rows fetched per round trip while streaming a day's news into a report
+REPORT_FETCH_SIZE = int(os.getenv("REPORT_FETCH_SIZE", "2000"))
+
+# How reports are turned into PDF: "native" (pure Python), "wkhtmltopdf"
+# (set WKHTMLTOPDF_PATH unless the program is on the PATH) or "pool" (the
+# PDF_POOL_ENGINE backend in PDF_POOL_WORKERS long-lived processes)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "native")
+PDF_BACKEND_OPTIONS = {
+    "native": {},
+    "wkhtmltopdf": {
+        "template_dir": REPORT_TEMPLATE_DIR,
+        "cache_dir": TEMPLATE_CACHE_DIR,
+        "wkhtmltopdf_path": os.getenv("WKHTMLTOPDF_PATH"),
+    },
+    "pool": {
+        "engine": os.getenv("PDF_POOL_ENGINE", "native"),
+        "workers": int(os.getenv("PDF_POOL_WORKERS", "2")),
+    },
+}
+if os.getenv("PDF_POOL_ENGINE") == "wkhtmltopdf":
+    PDF_BACKEND_OPTIONS["pool"].update(PDF_BACKEND_OPTIONS["wkhtmltopdf"])
+pdf_renderer = create_backend(PDF_BACKEND, **PDF_BACKEND_OPTIONS.get(PDF_BACKEND, {}))
+
+# Temporary mail delivery failures worth another attempt
+SMTP_ERRORS = (smtplib.SMTPException, ConnectionError, TimeoutError, socket.gaierror)
 
 yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 
@@ -93,11 +364,6 @@ translations = {
 }
 
 
-def db_connect():
-    """Establishes and returns a connection to the PostgreSQL database."""
-    return psycopg2.connect(**DB_CONFIG)
-
-
 def get_locale():
     """
     Determines the preferred language locale from the request headers.
@@ -121,22 +387,94 @@ def get_locale():
 
 
 def save_news(title, description, url, source, published_at, category):
-    """Saves a news article to the database, ignoring duplicates based on the URL."""
-    conn = db_connect()
-    cursor = conn.cursor()
+    """
+    Saves a news article to the database, ignoring duplicates based on the URL.
+
+    Returns:
+        bool: True if a new row was inserted, False otherwise.
+    """
     try:
-        cursor.execute(
-            """INSERT INTO news (title, description, url, source, published_at, category)
-               VALUES (%s, %s, %s, %s, %s, %s) 
-               ON CONFLICT (url) DO NOTHING""",
-            (title, description, url, source, published_at, category),
+        counts = bulk_save_news(
+            db_pool,
+            [(title, description, url, source, published_at, category)],
+            on_insert=news_inserted,
+            clusters=news_clusters,
         )
-        conn.commit()
+        return counts["inserted"] == 1
     except Exception as e:
         print("Error saving the news:", e)
-    finally:
-        cursor.close()
-        conn.close()
+        return False
+
+
+def news_inserted(rows):
+    """
+    Updates everything derived from the news table after an insert commits.
+
+    Args:
+        rows (list): Inserted rows as (publication date, category, id, title,
+            description, published_at) tuples.
+    """
+    invalidate_news(row[:2] for row in rows)
+    try:
+        _, categories, ids, titles, descriptions, published = map(list, zip(*rows))
+        news_index.add(ids, titles, descriptions, published, categories)
+    except Exception as e:
+        # The articles are stored; the next ingest run indexes them
+        news_index_behind.set()
+        print(f"❌ Indexing new articles failed: {e}")
+
+
+def index_missing_news():
+    """
+    Adds the stored articles missing from the embedding index, if some may be.
+
+    Returns:
+        int: Number of articles added.
+    """
+    if not news_index_behind.is_set():
+        return 0
+    news_index_behind.clear()  # an append failing from now on sets it again
+    try:
+        added = build_index(db_pool, news_index)
+    except Exception as e:
+        news_index_behind.set()
+        print(f"❌ Indexing missing articles failed: {e}")
+        return 0
+    if added:
+        print(f"🧭 Indexed {added} articles missing from the index")
+    return added
+
+
+def invalidate_news(days_and_categories):
+    """
+    Bumps the cache data versions affected by newly inserted articles.
+
+    Args:
+        days_and_categories (iterable): (publication date, category) of every
+            inserted article.
+    """
+    scopes = {"news"}
+    for day, category in days_and_categories:
+        scopes.add(f"date:{day}")
+        scopes.add(f"category:{category}")
+    response_cache.bump(scopes)
+
+
+def invalidate_months(months):
+    """
+    Bumps the cache data versions of whole months, after they were
+    archived or restored.
+
+    Args:
+        months (iterable): First days of the months.
+    """
+    days = []
+    for month in months:
+        day = month.date()
+        while day < add_months(month, 1).date():
+            days.append(day)
+            day += timedelta(days=1)
+    invalidate_news((day, category) for day in days for category in categories)
 
 
 def news_exists_for(category, date):
@@ -149,78 +487,171 @@ def news_exists_for(category, date):
 
     Returns:
         bool: True if news exists, False otherwise."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT 1 FROM news WHERE category = %s AND DATE(published_at) = %s LIMIT 1",
-        (category, date),
-    )
-    result = cursor.fetchone()
-    conn.close()
+    start, end = day_range(date)
+    with db_pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM news WHERE category = %s AND published_at >= %s AND published_at < %s LIMIT 1",
+            (category, start, end),
+        )
+        result = cursor.fetchone()
     return result is not None
 
 
-async def fetch_news_for_category_date(session, category, date):
+async def async_fetch_and_store_news():
     """
-    Fetches news from the API for a specific category and date.
+    Asynchronously fetches the news published since the last run for every
+    category and stores them in the database.
 
-    Args:
-        session (aiohttp.ClientSession): The HTTP session.
-        category (str): The category of news.
-        date (str): Date string in YYYY-MM-DD format.
+    Every category has a high-water mark in ``ingest_state``: the newest
+    article ingested so far. Only articles from that point on are requested,
+    page by page; a category without a mark starts INGEST_BACKFILL_DAYS back.
+    Marks move forward only after the articles are committed. Older
+    articles that a truncated run skipped are kept as a gap in
+    ``ingest_state`` and fetched by the following runs, up to
+    INGEST_MAX_PAGES pages per run, until none are left.
 
     Returns:
-        list: A list of (article, category) tuples.
+        dict: Counts for the run: API ``requests``, articles ``fetched``,
+        ``invalid`` (missing required fields), ``inserted`` as new rows,
+        ``duplicates``, the categories that were ``truncated`` (more new
+        articles than INGEST_MAX_PAGES pages) or ``failed``, and those
+        with ``gaps`` left for the next runs.
     """
-    if news_exists_for(category, date):
-        print(f"⏭ Skip {category} {date} — already in database")
-        return []
-
-    url = f"https://newsapi.org/v2/everything?q={category}&from={date}&to={date}&language=en&apiKey={API_KEY}"
+    # Database calls block, so they run in a thread off the event loop
     try:
-        async with session.get(url) as response:
-            if response.status != 200:
-                print(f"❌ API error for {category}, {date}: {response.status}")
-                return []
-            data = await response.json()
-            articles = data.get("articles", [])
-            return [(article, category) for article in articles]
+        storage = await asyncio.to_thread(news_storage.maintain)
+        invalidate_months(storage["archived"])
     except Exception as e:
-        print(f"❌ Request is broken: {e}")
-        return []
+        # Rows of months without a partition wait in the default partition
+        print(f"❌ Partition maintenance failed: {e}")
+    marks = await asyncio.to_thread(load_high_water_marks, db_pool)
+    gaps = await asyncio.to_thread(load_ingest_gaps, db_pool)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)  # NewsAPI times are UTC
+    backfill_from = now - timedelta(days=INGEST_BACKFILL_DAYS)
+    since = {category: marks.get(category, backfill_from) for category in categories}
+    # The new articles of every category, then the gaps of earlier runs
+    fetches = [(category, since[category], None) for category in categories] + [
+        (category, *gaps[category]) for category in categories if category in gaps
+    ]
+    async with news_fetcher as fetcher:
+        results = await asyncio.gather(
+            *(
+                fetch_new_articles(
+                    fetcher,
+                    category,
+                    start,
+                    API_KEY,
+                    url=NEWS_API_URL,
+                    page_size=INGEST_PAGE_SIZE,
+                    max_pages=INGEST_MAX_PAGES,
+                    until=end,
+                )
+                for category, start, end in fetches
+            )
+        )
+    fresh = dict(zip(categories, results))
+    backlog = {
+        category: result
+        for (category, _, end), result in zip(fetches, results)
+        if end is not None
+    }
+
+    rows = []
+    new_marks = {}
+    fetched = 0
+    for (category, _, _), result in zip(fetches, results):
+        fetched += len(result["articles"])
+        rows.extend(
+            row
+            for row in (normalize_article(a, category) for a in result["articles"])
+            if row is not None
+        )
+    for category in categories:
+        newest, gap = ingest_progress(
+            since[category], gaps.get(category), fresh[category], backlog.get(category)
+        )
+        mark = newest or marks.get(category)
+        if mark is not None:
+            new_marks[category] = (
+                mark,
+                len(fresh[category]["articles"]),
+                fresh[category]["truncated"],
+                gap,
+            )
 
+    counts = await asyncio.to_thread(
+        bulk_save_news,
+        db_pool,
+        rows,
+        batch_size=INGEST_BATCH_SIZE,
+        on_insert=news_inserted,
+        clusters=news_clusters,
+    )
+    await asyncio.to_thread(save_high_water_marks, db_pool, new_marks)
+    await asyncio.to_thread(index_missing_news)
+    print("✅ New articles have been uploaded.")
+    return {
+        "requests": sum(r["requests"] for r in results),
+        "fetched": fetched,
+        "invalid": fetched - len(rows),
+        **counts,
+        "truncated": [c for c in categories if fresh[c]["truncated"]],
+        "failed": [
+            c for c in categories if not fresh[c]["ok"] or not backlog.get(c, fresh[c])["ok"]
+        ],
+        "gaps": [c for c in categories if c in new_marks and new_marks[c][3]],
+    }
+
+
+# Event loop of the async server (asgi.py) while it runs: the ingest is sent
+# there to share its long-lived NewsAPI session
+ingest_loop = None
 
-async def async_fetch_and_store_news():
-    """
-    Asynchronously fetches news for each category over the past 7 days
-    and stores them in the database.
-    """
-    tasks = []
-    async with aiohttp.ClientSession() as session:
-        for day_delta in range(7):
-            date = (datetime.now() - timedelta(days=day_delta)).strftime("%Y-%m-%d")
-            for category in categories:
-                tasks.append(fetch_news_for_category_date(session, category, date))
 
-        results = await asyncio.gather(*tasks)  # run all queries in parallel
+def fetch_and_store_news():
+    """Runs the asynchronous function to fetch and store news in sync context."""
+    if ingest_loop is not None:
+        return asyncio.run_coroutine_threadsafe(
+            async_fetch_and_store_news(), ingest_loop
+        ).result()
+    return asyncio.run(async_fetch_and_store_news())
 
-        for article_list in results:
-            for article, category in article_list:
-                title = article.get("title")
-                description = article.get("description")
-                url = article.get("url")
-                source = article.get("source", {}).get("name")
-                published_at = article.get("publishedAt")
 
-                if title and url and source and published_at:
-                    save_news(title, description, url, source, published_at, category)
+# Locked through the database, so of several worker processes only one ingests
+ingest_scheduler = IngestScheduler(
+    fetch_and_store_news, INGEST_INTERVAL_MINUTES * 60, pool=db_pool
+)
 
-    print("✅ News for the last week has been uploaded.")
 
+def start_background_work():
+    """Warms up the PDF renderer and starts the ingest scheduler if enabled."""
+    pdf_renderer.warm_up()
+    if RUN_INGEST_SCHEDULER:
+        ingest_scheduler.start()
 
-def fetch_and_store_news():
-    """Runs the asynchronous function to fetch and store news in sync context."""
-    asyncio.run(async_fetch_and_store_news())
+
+def get_chart(date):
+    """
+    Returns the bar chart of news counts per category for a given date.
+
+    The chart is rendered once per distinct set of counts and then served
+    from ``chart_cache``.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+
+    Returns:
+        dict: ``png``, ``base64`` and ``fingerprint`` of the chart, or None if
+        there is no news for that date.
+
+    Raises:
+        ValueError: If the date is not in YYYY-MM-DD format.
+    """
+    day = day_range(date)[0].date()
+    counts = counts_by_category(db_pool, day, day)
+    if not counts:
+        return None
+    return chart_cache.get(str(day), counts)
 
 
 def generate_chart(date):
@@ -234,131 +665,207 @@ def generate_chart(date):
         BytesIO: In-memory binary stream containing PNG image, or None.
     """
     try:
-        # Check data format
-        datetime.strptime(date, "%Y-%m-%d")
-
-        conn = db_connect()
-        if conn is None:
+        chart = get_chart(date)
+        if chart is None:
             return None
-
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT category, COUNT(*) FROM news WHERE DATE(published_at) = %s GROUP BY category",
-            (date,),
-        )
-        result = cursor.fetchall()
-        conn.close()
-
-        if not result:
-            return None
-
-        categories, counts = zip(*result)
-        plt.figure(figsize=(10, 5))
-        plt.bar(categories, counts, color="#4f46e5")
-        plt.xlabel("Categories")
-        plt.ylabel("Number of news items")
-        plt.title(f"News for {date}")
-        plt.xticks(rotation=45)
-
-        img_stream = io.BytesIO()
-        plt.savefig(img_stream, format="png")
-        plt.close()  # Avoiding memory leaks
-        img_stream.seek(0)
-
-        return img_stream
+        return io.BytesIO(chart["png"])
     except Exception as e:
         print(f"Error in generate_chart: {e}")
         return None
 
 
+# Articles of a report: one per near-duplicate cluster
+REPORT_FILTERS = " AND published_at >= %(start)s AND published_at < %(end)s"
+REPORT_NEWS_SQL = f"""
+    SELECT title, url, category, published_at, source FROM news
+    WHERE true{REPORT_FILTERS} AND {first_of_cluster(REPORT_FILTERS)}
+    ORDER BY category, published_at
+"""
+
+
 def get_news_by_date(date):
     """
     Retrieves a list of news (title and url) published on a specific date.
 
+    Syndicated copies of a story are listed once.
+
     Args:
         date (str): Date string in YYYY-MM-DD format.
 
     Returns:
-        list: List of tuples containing (title, url).
+        list: List of (title, url, category, published_at, source) tuples,
+        ordered by category.
     """
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT title, url, category, published_at, source FROM news WHERE DATE(published_at) = %s",
-        (date,),
-    )
-    news = cursor.fetchall()
-    conn.close()
+    start, end = day_range(date)
+    with db_pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(REPORT_NEWS_SQL, {"start": start, "end": end})
+        news = cursor.fetchall()
     return news
 
 
-def generate_pdf(date, news, config):
+def iter_news_by_date(date, chunk_size=REPORT_FETCH_SIZE):
+    """
+    Streams the news published on a date, ordered by category, with
+    syndicated copies of a story listed once.
+
+    Rows are read through a server-side cursor ``chunk_size`` at a time, so
+    memory does not grow with the number of articles of the day. The pooled
+    connection is held until the iteration ends.
+
+    Args:
+        date (str): Date string in YYYY-MM-DD format.
+        chunk_size (int): Rows fetched per round trip.
+
+    Yields:
+        tuple: (title, url, category, published_at, source).
+    """
+    start, end = day_range(date)
+    with db_pool.connection() as conn, conn.cursor(name="report_news") as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(REPORT_NEWS_SQL, {"start": start, "end": end})
+        yield from cursor
+
+
+def generate_pdf(date, news, renderer, locale="en", pdf_path=None):
     """
     Generates a PDF report containing news list and chart.
 
+    The news rows are consumed one category at a time while the PDF is
+    written, so a stream from ``iter_news_by_date`` is never held in memory.
+
     Args:
         date (str): The date for which to generate the report.
-        news (list): List of news tuples.
-        config (pdfkit.configuration): PDF generation configuration.
+        news (iterable): News tuples ordered by category, as returned by
+            ``get_news_by_date`` or ``iter_news_by_date``.
+        renderer (pdf.PdfBackend): Backend writing the PDF.
+        locale (str): Language of the report ('en', 'uk' or 'pl').
+        pdf_path (str): Where to write the PDF (optional, defaults to
+            ``reports/report_{date}_{locale}.pdf``).
 
     Returns:
         str: File path to the generated PDF.
     """
-    chart_stream = generate_chart(date)
-    if chart_stream is None:
+    chart = get_chart(date)
+    if chart is None:
         return None
 
-    chart_base64 = base64.b64encode(chart_stream.getvalue()).decode("utf-8")
-
-    # Detect lenguage
-    locale = get_locale()
     t = translations[locale]
 
-    news_by_category = defaultdict(list)
-    for title, url, category, published_at, source in news:
-        time_str = published_at.strftime("%H:%M")
-        news_by_category[category].append(
-            {"title": title, "url": url, "time": time_str, "source": source}
+    def items(rows):
+        for title, url, _, published_at, source in rows:
+            time_str = published_at.strftime("%H:%M")
+            yield {"title": title, "url": url, "time": time_str, "source": source}
+
+    report = {
+        "date": date,
+        "locale": locale,
+        "chart_png": chart["png"],
+        "chart_base64": chart["base64"],
+        "categories": sorted(chart["counts"]),
+        # (category, items) pairs, produced lazily from the rows
+        "news_by_category": (
+            (category, items(rows)) for category, rows in groupby(news, itemgetter(2))
+        ),
+        "t": t,  # pass translations
+    }
+
+    if pdf_path is None:
+        os.makedirs("reports", exist_ok=True)
+        pdf_path = f"reports/report_{date}_{locale}.pdf"
+    return renderer.render(report, pdf_path)
+
+
+def news_fingerprint(date):
+    """
+    Returns a hash identifying everything a report for the date is built from.
+
+    Covers the fields of the day's articles shown in the report and the
+    report template and PDF backend, so it changes whenever the PDF would.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+
+    Returns:
+        str: Hex digest, or None if there is no news for that date.
+
+    Raises:
+        ValueError: If the date is not in YYYY-MM-DD format.
+    """
+    start, end = day_range(date)
+    with db_pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT count(*), md5(string_agg(
+                concat_ws(E'\\t', id, title, url, category, published_at, source),
+                E'\\n' ORDER BY id
+            ))
+            FROM news WHERE published_at >= %s AND published_at < %s
+            """,
+            (start, end),
         )
+        count, digest = cursor.fetchone()
+    if not count:
+        return None
 
-    with open("templates/report_template.html", "r", encoding="utf-8") as f:
-        template_str = f.read()
+    template_digest = hashlib.sha1()
+    for name in sorted(os.listdir(REPORT_TEMPLATE_DIR)):
+        if name.startswith("report_template"):  # the template and its variants
+            with open(os.path.join(REPORT_TEMPLATE_DIR, name), "rb") as f:
+                template_digest.update(f.read())
+    key = f"{digest}|{template_digest.hexdigest()}|{pdf_renderer.name}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
 
-    template = Template(template_str)
-    rendered_html = template.render(
-        date=date,
-        chart_base64=chart_base64,
-        categories=sorted(news_by_category.keys()),
-        news_by_category=dict(sorted(news_by_category.items())),
-        t=t,  # pass translations
-    )
 
-    pdf_path = f"reports/report_{date}.pdf"
-    pdfkit.from_string(rendered_html, pdf_path, configuration=config)
-    return pdf_path
+def get_report(date, locale="en"):
+    """
+    Returns the PDF report for a date, generating it only if the news changed.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+        locale (str): Language of the report ('en', 'uk' or 'pl').
+
+    Returns:
+        str: Path of the PDF in ``report_store``, or None if there is no news
+        for that date.
+
+    Raises:
+        ValueError: If the date is not in YYYY-MM-DD format.
+    """
+    date = str(day_range(date)[0].date())
+    fingerprint = news_fingerprint(date)
+    if fingerprint is None:
+        return None
 
+    def build(pdf_path):
+        return generate_pdf(date, iter_news_by_date(date), pdf_renderer, locale, pdf_path)
 
-def send_email(recipient, pdf_path):
+    return report_store.get_or_create(date, locale, fingerprint, build)
+
+
+def send_email(recipient, pdf_path, locale="en", date=None):
     """
     Sends a report PDF file via email.
 
     Args:
         recipient (str): The recipient's email address.
         pdf_path (str): Path to the PDF file to send.
+        locale (str): Language of the email ('en', 'uk' or 'pl').
+        date (str): Date of the report, used in the subject and the attachment
+            name (optional, read from a ``report_{date}.pdf`` file name).
+
+    Raises:
+        FileNotFoundError: If the PDF does not exist.
+        smtplib.SMTPException, OSError: If the email could not be sent.
     """
     sender_email = os.getenv("EMAIL")
     sender_password = os.getenv("APP_PASSWORD")
 
     if not os.path.exists(pdf_path):
-        print(f"❌ File not found: {pdf_path}")
-        return
+        raise FileNotFoundError(f"File not found: {pdf_path}")
 
-    # Get the date from the file name
-    date_str = os.path.basename(pdf_path).replace("report_", "").replace(".pdf", "")
+    date_str = date or os.path.basename(pdf_path).replace("report_", "").replace(".pdf", "")
     filename = f"DailyNewsReport_{date_str}.pdf"
 
-    # Визначення мови
-    locale = get_locale()
     t = translations.get(locale, translations["en"])
 
     # Forming a message
@@ -378,58 +885,505 @@ def send_email(recipient, pdf_path):
         attach.add_header("Content-Disposition", f"attachment; filename={filename}")
         msg.attach(attach)
 
-    # Sending via SMTP with logs
-    try:
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.set_debuglevel(1)  # show SMTP log
+    # Sending via SMTP (set SMTP_DEBUG=1 to show the SMTP log)
+    with smtplib.SMTP("smtp.gmail.com", 587, timeout=30) as server:
+        server.set_debuglevel(int(os.getenv("SMTP_DEBUG", "0")))
         server.starttls()
         server.login(sender_email, sender_password)
         server.sendmail(sender_email, recipient, msg.as_string())
-        server.quit()
-        print(f"✅ Email sent to {recipient}")
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+    print(f"✅ Email sent to {recipient}")
+
+
+def deliver_report(date, recipient, locale):
+    """
+    Generates the report for a date and emails it. Runs on ``report_queue``.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+        recipient (str): The recipient's email address.
+        locale (str): Language of the report and the email.
+
+    Returns:
+        str: Message shown to the user once the job is done.
+    """
+    # A retry after a mail error reuses the PDF built by the first attempt
+    pdf_path = get_report(date, locale)
+    if not pdf_path:
+        raise ValueError("No data for this date.")
+
+    send_email(recipient, pdf_path, locale, date)
+    return "✅ Email sent!"
+
+
+def build_report(date, locale, download_url):
+    """
+    Builds the report for a date ahead of its download. Runs on ``report_queue``.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+        locale (str): Language of the report.
+        download_url (str): Where the client downloads the report.
+
+    Returns:
+        str: ``download_url``, the job result shown to the client (never
+        the report's path on the server).
+    """
+    if not get_report(date, locale):
+        raise ValueError("No data for this date.")
+    return download_url
 
 
 @app.route("/")
 def index():
-    """Root route that fetches and stores the latest news, then renders the homepage."""
-    fetch_and_store_news()
-    session.pop("chat_history", None)
+    """Root route that renders the homepage from the news already stored."""
+    chat_id = session.pop("chat_id", None)
+    if chat_id:
+        chat_sessions.clear(chat_id)
     return render_template("index.html")
 
 
+@app.route("/ingest-status")
+def ingest_status():
+    """
+    Returns JSON describing the background news ingest.
+
+    Returns:
+        JSON: Whether a run is in progress, the refresh interval, the last
+        run's start time, duration and article counts, the high-water mark
+        of every category and the gaps still to be fetched.
+    """
+    marks = load_high_water_marks(db_pool)
+    gaps = load_ingest_gaps(db_pool)
+    return jsonify(
+        {
+            **ingest_scheduler.status(),
+            "high_water_marks": {
+                category: mark.isoformat() for category, mark in sorted(marks.items())
+            },
+            "gaps": {
+                category: [start.isoformat(), end.isoformat()]
+                for category, (start, end) in sorted(gaps.items())
+            },
+        }
+    )
+
+
+def chat_metrics():
+    """Returns the chat counters and the average time to the first streamed chunk."""
+    stats = dict(chat_stats)
+    first_token = stats.pop("first_token_seconds")
+    streams = stats["streams"]
+    stats["avg_first_token_ms"] = round(first_token / streams * 1000, 1) if streams else None
+    return stats
+
+
+@app.route("/metrics")
+def metrics():
+    """
+    Returns JSON with runtime metrics of the shared components.
+
+    Returns:
+        JSON: Database pool usage (open/in-use connections, waits, wait time)
+        response/chart/chat context cache hits, misses and 304 answers,
+        compressed responses and bytes saved, chat answers, streams and
+        cancellations, model answer cache hits, coalesced requests and
+        upstream time saved, NewsAPI requests, retries and latency, report
+        queue counters and report store hits, misses and evictions.
+    """
+    return jsonify(
+        {
+            "db_pool": db_pool.stats(),
+            "response_cache": response_cache.stats(),
+            "compression": response_compressor.stats(),
+            "chart_cache": chart_cache.stats(),
+            "chat_context": chat_context.stats(),
+            "chat": chat_metrics(),
+            "llm": model.stats(),
+            "chat_sessions": chat_sessions.stats(),
+            "news_index": news_index.stats(),
+            "news_clusters": news_clusters.stats() if news_clusters else None,
+            "news_api": news_fetcher.stats(),
+            "report_queue": report_queue.stats(),
+            "report_store": report_store.stats(),
+        }
+    )
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Creates or upgrades the database schema (tables and indexes)."""
+    applied = migrate(db_pool)
+    click.echo(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date.")
+
+
+@app.cli.command("rebuild-counts")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First day to rebuild.")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last day to rebuild.")
+def rebuild_counts_command(start, end):
+    """Recomputes the per-day, per-category news counts from the news table."""
+    rows = rebuild_counts(
+        db_pool, start.date() if start else None, end.date() if end else None
+    )
+    click.echo(f"Rebuilt {rows} daily count rows.")
+
+
+@app.cli.command("build-index")
+@click.option("--rebuild", is_flag=True, help="Start over instead of adding missing articles.")
+def build_index_command(rebuild):
+    """Adds stored articles to the chat retrieval index."""
+    added = build_index(db_pool, news_index, rebuild=rebuild)
+    click.echo(f"Indexed {added} articles ({len(news_index)} in total).")
+
+
+@app.cli.command("cluster-news")
+def cluster_news_command():
+    """Groups all stored articles into near-duplicate clusters again."""
+    if news_clusters is None:
+        raise click.UsageError("Clustering is off (NEWS_DEDUP=0).")
+    counts = cluster_news(db_pool, news_clusters, on_change=invalidate_news)
+    click.echo(f"Clustered {counts['articles']} articles, {counts['changed']} changed.")
+
+
+@app.cli.command("partitions")
+def partitions_command():
+    """Lists the monthly partitions of the news table and the archived months."""
+    click.echo(json.dumps(news_storage.stats(), indent=2))
+
+
+@app.cli.command("archive-news")
+@click.option("--keep-months", type=int, help="Months to keep instead of NEWS_RETENTION_MONTHS.")
+@click.option("--restored", is_flag=True, help="Also archive months restored earlier.")
+def archive_news_command(keep_months, restored):
+    """Archives the months past the retention period and drops their partitions."""
+    news_storage.create_partitions()
+    archived = news_storage.apply_retention(include_restored=restored, months=keep_months)
+    invalidate_months(archived)
+    click.echo(
+        f"Archived {', '.join(f'{m:%Y-%m}' for m in archived)}." if archived else "Nothing to archive."
+    )
+
+
+@app.cli.command("restore-news")
+@click.argument("first", type=click.DateTime(["%Y-%m"]))
+@click.argument("last", type=click.DateTime(["%Y-%m"]), required=False)
+def restore_news_command(first, last):
+    """Loads the archived months FIRST to LAST (YYYY-MM) back into the news table."""
+    restored = news_storage.restore(first, last)
+    invalidate_months(restored)
+    click.echo(
+        ", ".join(f"{month:%Y-%m}: {rows} articles" for month, rows in restored.items())
+        or "Nothing restored."
+    )
+
+
+@app.cli.command("ingest")
+@click.option(
+    "--loop", is_flag=True, help="Keep refreshing every INGEST_INTERVAL_MINUTES."
+)
+def ingest_command(loop):
+    """Fetches the latest news from the API and stores them in the database."""
+    if loop:
+        ingest_scheduler.run_forever()
+    else:
+        click.echo(ingest_scheduler.run_once())
+
+
+def requested_days(default_days):
+    """
+    Reads an inclusive range of days from the ``start``/``end`` query params.
+
+    Args:
+        default_days (int): Length of the range when ``start`` is missing.
+
+    Returns:
+        tuple: (first_day, last_day) dates. ``end`` defaults to today.
+
+    Raises:
+        ValueError: If a date is malformed or the range is reversed.
+    """
+    end = request.args.get("end")
+    last_day = day_range(end)[0].date() if end else datetime.now().date()
+    start = request.args.get("start")
+    if start:
+        first_day = day_range(start)[0].date()
+    else:
+        first_day = last_day - timedelta(days=default_days - 1)
+    if first_day > last_day:
+        raise ValueError("start must not be after end")
+    return first_day, last_day
+
+
+def date_scopes():
+    """Cache scopes of endpoints filtered by the ``date`` query param."""
+    return [f"date:{day_range(request.args.get('date'))[0].date()}"]
+
+
+def category_scopes():
+    """Cache scopes of endpoints filtered by the ``category`` query param."""
+    return [f"category:{request.args.get('category')}"]
+
+
+def requested_period():
+    """
+    Reads an optional period from the ``date`` or ``start``/``end`` query params.
+
+    Returns:
+        tuple: (start, end) datetimes of a half-open range; either is None
+        when that side is open. ``end`` is the day after the ``end`` param.
+
+    Raises:
+        ValueError: If a date is malformed or the range is reversed.
+    """
+    if request.args.get("date"):
+        return day_range(request.args["date"])
+    start = request.args.get("start")
+    end = request.args.get("end")
+    start = day_range(start)[0] if start else None
+    end = day_range(end)[1] if end else None
+    if start and end and start >= end:
+        raise ValueError("start must not be after end")
+    return start, end
+
+
+def requested_values(name):
+    """Reads a query param given several times or as a comma-separated list."""
+    return [
+        value.strip()
+        for param in request.args.getlist(name)
+        for value in param.split(",")
+        if value.strip()
+    ]
+
+
+# Longest period whose days are used as cache scopes one by one
+ARTICLE_SCOPE_MAX_DAYS = 31
+
+
+def article_scopes():
+    """
+    Cache scopes of ``/articles``: the days of a bounded period, else its
+    categories, else all news.
+    """
+    start, end = requested_period()
+    if start and end and (end - start).days <= ARTICLE_SCOPE_MAX_DAYS:
+        return [f"date:{(start + timedelta(days=i)).date()}" for i in range((end - start).days)]
+    categories = requested_values("category")
+    if categories:
+        return [f"category:{category}" for category in categories]
+    return ["news"]
+
+
+def range_scopes(default_days):
+    """Cache scopes of endpoints covering the ``start``/``end`` range of days."""
+
+    def scopes():
+        if default_days == 1 and not ("start" in request.args or "end" in request.args):
+            return date_scopes()
+        first_day, last_day = requested_days(default_days)
+        return [
+            f"date:{first_day + timedelta(days=i)}"
+            for i in range((last_day - first_day).days + 1)
+        ]
+
+    return scopes
+
+
+@app.route("/chart/<date>.png")
+def chart_png(date):
+    """
+    Returns the PNG bar chart of news counts per category for a date.
+
+    The image is the same cached artifact embedded in the PDF reports and
+    carries an ETag, so browsers revalidate it cheaply.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+
+    Returns:
+        Response: The PNG image, or a JSON error.
+    """
+    try:
+        chart = get_chart(date)
+    except ValueError:
+        return jsonify({"error": "Invalid date"}), 400
+    if chart is None:
+        return jsonify({"error": "No data for this date."}), 404
+
+    response = Response(chart["png"], mimetype="image/png")
+    response.set_etag(chart["fingerprint"])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @app.route("/send-report", methods=["POST"])
 def send_report():
     """
-    Receives a date and email from the form, generates a report and sends it via email.
+    Receives a date and email from the form and queues a job that generates
+    the report and sends it via email.
+
+    Identical requests (same date, language and recipient) made while a job
+    is still pending share that job.
 
     Returns:
-        Response: JSON response with a success or error message.
+        Response: 202 with the ``job_id`` and the URL to poll for its status,
+        or a JSON error message.
     """
     try:
         date = request.form["date"]
-        email = request.form["email"]
+        email = request.form["email"].strip()
+        day = day_range(date)[0].date()
+    except (KeyError, ValueError):
+        return jsonify({"message": "Select a valid date and e-mail."}), 400
 
-        news = get_news_by_date(date)
+    if not counts_by_category(db_pool, day, day):
+        return jsonify({"message": "No data for this date."}), 404
 
-        if not news:
-            return jsonify({"message": "No data for this date."}), 404
+    locale = get_locale()
+    try:
+        job = report_queue.submit(
+            (str(day), locale, email.lower()),
+            deliver_report,
+            str(day),
+            email,
+            locale,
+            retry_on=SMTP_ERRORS,
+        )
+    except QueueFull as e:
+        return jsonify({"message": str(e)}), 503
+
+    return (
+        jsonify(
+            {
+                "message": "⏳ Report is being prepared...",
+                "job_id": job.id,
+                "status_url": url_for("report_status", job_id=job.id),
+            }
+        ),
+        202,
+    )
 
-        pdf_path = generate_pdf(date, news, config)
 
-        if not pdf_path:
-            return jsonify({"message": "Failed to create PDF."}), 500
+@app.route("/report-status/<job_id>")
+def report_status(job_id):
+    """
+    Returns JSON with the state of a report job.
 
-        send_email(email, pdf_path)
+    Args:
+        job_id (str): The id returned by ``/send-report``.
 
-        return jsonify({"message": "✅ Email sent!"})
-    except Exception as e:
-        print(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+    Returns:
+        JSON: Job status (queued, running, retrying, done or failed), attempts,
+        result (a message, or the download URL of a built report) or error
+        message, and the time of the next retry.
+    """
+    job = report_queue.get(job_id)
+    if job is None:
+        return jsonify({"message": "Unknown job."}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/reports/<date>")
+def download_report(date):
+    """
+    Downloads the PDF report for a date.
+
+    A report already built for the current news of that date is served
+    directly from ``report_store``; otherwise it is built in the background
+    and the client polls the returned status URL before downloading again.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+
+    Query Params:
+        lang (str): Language of the report, 'en', 'uk' or 'pl' (optional,
+            defaults to the Accept-Language header).
+
+    Returns:
+        Response: The PDF, 202 with the ``job_id``, ``status_url`` and
+        ``download_url`` of the build, or a JSON error message.
+    """
+    locale = request.args.get("lang") or get_locale()
+    if locale not in translations:
+        return jsonify({"message": "Unsupported language."}), 400
+    try:
+        date = str(day_range(date)[0].date())
+        fingerprint = news_fingerprint(date)
+    except ValueError:
+        return jsonify({"message": "Invalid date"}), 400
+    if fingerprint is None:
+        return jsonify({"message": "No data for this date."}), 404
+
+    pdf_path = report_store.get(date, locale, fingerprint)
+    if pdf_path is None:
+        download_url = url_for("download_report", date=date, lang=locale)
+        try:
+            job = report_queue.submit(
+                ("build", date, locale), build_report, date, locale, download_url
+            )
+        except QueueFull as e:
+            return jsonify({"message": str(e)}), 503
+        return (
+            jsonify(
+                {
+                    "message": "⏳ Report is being prepared...",
+                    "job_id": job.id,
+                    "status_url": url_for("report_status", job_id=job.id),
+                    "download_url": download_url,
+                }
+            ),
+            202,
+        )
+
+    response = send_file(
+        os.path.abspath(pdf_path),
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=f"DailyNewsReport_{date}.pdf",
+        etag=fingerprint,
+    )
+    response.cache_control.no_cache = True
+    return response
+
+
+NEWS_LIST_COLUMNS = ("title", "description", "url", "source", "published_at")
+
+
+def news_list_response(sql, params):
+    """
+    Answers a news list route with the rows of a query as a JSON array.
+
+    Args:
+        sql (str): Query selecting the ``NEWS_LIST_COLUMNS``.
+        params (tuple): Query parameters.
+
+    Returns:
+        flask.Response: The array, streamed from a server-side cursor if
+        JSON_STREAM is set.
+    """
+    if JSON_STREAM:
+
+        def rows():
+            with db_pool.connection() as conn, conn.cursor(name="news_list") as cursor:
+                cursor.itersize = JSON_STREAM_FETCH_SIZE
+                cursor.execute(sql, params)
+                yield from cursor
+
+        return json_rows_response(
+            json_encoder,
+            NEWS_LIST_COLUMNS,
+            rows(),
+            stream=True,
+            batch_size=JSON_STREAM_FETCH_SIZE,
+        )
+
+    with db_pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return json_rows_response(json_encoder, NEWS_LIST_COLUMNS, rows)
 
 
 @app.route("/news-by-date")
+@response_cache.cached(date_scopes)
 def news_by_date():
     """
     Returns JSON of news articles filtered by a specific date.
@@ -440,30 +1394,19 @@ def news_by_date():
     Returns:
         JSON: List of news articles.
     """
-    date = request.args.get("date")
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT title, description, url, source, published_at FROM news WHERE DATE(published_at) = %s ORDER BY published_at DESC",
-        (date,),
-    )
-    news = cursor.fetchall()
-    conn.close()
-    return jsonify(
-        [
-            {
-                "title": n[0],
-                "description": n[1],
-                "url": n[2],
-                "source": n[3],
-                "published_at": n[4],
-            }
-            for n in news
-        ]
+    try:
+        start, end = day_range(request.args.get("date"))
+    except ValueError:
+        return jsonify({"error": "Invalid date"}), 400
+
+    return news_list_response(
+        "SELECT title, description, url, source, published_at FROM news WHERE published_at >= %s AND published_at < %s ORDER BY published_at DESC",
+        (start, end),
     )
 
 
 @app.route("/news-by-category")
+@response_cache.cached(category_scopes)
 def news_by_category():
     """
     Returns JSON of latest news articles filtered by category.
@@ -475,29 +1418,14 @@ def news_by_category():
         JSON: List of news articles.
     """
     category = request.args.get("category")
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
+    return news_list_response(
         "SELECT title, description, url, source, published_at FROM news WHERE category = %s ORDER BY published_at DESC LIMIT 20",
         (category,),
     )
-    news = cursor.fetchall()
-    conn.close()
-    return jsonify(
-        [
-            {
-                "title": n[0],
-                "description": n[1],
-                "url": n[2],
-                "source": n[3],
-                "published_at": n[4],
-            }
-            for n in news
-        ]
-    )
 
 
 @app.route("/news-by-category-and-date")
+@response_cache.cached(date_scopes)
 def news_by_category_and_date():
     """
     Returns JSON of news articles filtered by both category and date.
@@ -510,126 +1438,261 @@ def news_by_category_and_date():
         JSON: List of news articles.
     """
     category = request.args.get("category")
-    date = request.args.get("date")
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT title, description, url, source, published_at FROM news WHERE category = %s AND DATE(published_at) = %s ORDER BY published_at DESC",
-        (category, date),
-    )
-    news = cursor.fetchall()
-    conn.close()
-    return jsonify(
-        [
-            {
-                "title": n[0],
-                "description": n[1],
-                "url": n[2],
-                "source": n[3],
-                "published_at": n[4],
-            }
-            for n in news
-        ]
+    try:
+        start, end = day_range(request.args.get("date"))
+    except ValueError:
+        return jsonify({"error": "Invalid date"}), 400
+
+    return news_list_response(
+        "SELECT title, description, url, source, published_at FROM news WHERE category = %s AND published_at >= %s AND published_at < %s ORDER BY published_at DESC",
+        (category, start, end),
     )
 
 
+@app.route("/articles")
+@response_cache.cached(article_scopes)
+def articles():
+    """
+    Returns one page of news articles, newest first.
+
+    Supersedes ``/news-by-date``, ``/news-by-category`` and
+    ``/news-by-category-and-date``: the filters combine, pages are cut with
+    a keyset cursor on ``(published_at, id)`` and only the requested fields
+    are read and sent.
+
+    Query Params:
+        date (str): Only this day (optional).
+        start (str): First day, inclusive (optional, ignored with ``date``).
+        end (str): Last day, inclusive (optional, ignored with ``date``).
+        category (str): Category; repeat it or separate several with commas
+            (optional).
+        source (str): Source name, likewise (optional).
+        fields (str): Comma-separated fields of every article, from id,
+            title, description, url, source, published_at and category
+            (optional, all by default).
+        limit (int): Page size, ARTICLES_PAGE_SIZE by default and at most
+            ARTICLES_MAX_PAGE_SIZE (optional).
+        cursor (str): ``next_cursor`` of the previous page (optional).
+        collapse (str): "0" to list every syndicated copy of a story, not
+            only the first (optional).
+
+    Returns:
+        JSON: ``results`` and ``next_cursor`` (None on the last page).
+    """
+    limit = request.args.get("limit", ARTICLES_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, ARTICLES_MAX_PAGE_SIZE))
+    try:
+        start, end = requested_period()
+        fields = parse_fields(request.args.get("fields"))
+        page = list_articles(
+            db_pool,
+            start,
+            end,
+            categories=requested_values("category"),
+            sources=requested_values("source"),
+            fields=fields,
+            limit=limit,
+            cursor=request.args.get("cursor"),
+            collapse=request.args.get("collapse", "1") != "0",
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(page)
+
+
 @app.route("/weekly-data")
+@response_cache.cached(range_scopes(default_days=7))
 def weekly_data():
     """
-    Returns JSON of the number of news per day for the past week.
+    Returns JSON of the number of news per day, for the past week by default.
+
+    Counts are read from the ``news_daily_counts`` rollup.
+
+    Query Params:
+        start (str): First day in YYYY-MM-DD format (optional, defaults to six
+            days before ``end``).
+        end (str): Last day, inclusive (optional, defaults to today).
 
     Returns:
-        JSON: Date -> count mapping.
+        JSON: Date -> count mapping, with 0 for days without news.
     """
-    conn = db_connect()
-    cursor = conn.cursor()
-    week_ago = (datetime.now() - timedelta(days=6)).strftime("%Y-%m-%d")
-    cursor.execute(
-        """
-        SELECT DATE(published_at), COUNT(*) 
-        FROM news 
-        WHERE DATE(published_at) >= %s 
-        GROUP BY DATE(published_at)
-        ORDER BY DATE(published_at)
-    """,
-        (week_ago,),
-    )
-    result = cursor.fetchall()
-    conn.close()
-    return jsonify({str(r[0]): r[1] for r in result})
+    try:
+        first_day, last_day = requested_days(default_days=7)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    counts = counts_by_day(db_pool, first_day, last_day)
+    return jsonify({str(day): count for day, count in counts.items()})
 
 
 @app.route("/daily-data")
+@response_cache.cached(range_scopes(default_days=1))
 def daily_data():
     """
-    Returns JSON of news count per category for a specific day.
+    Returns JSON of news count per category for a specific day or range of days.
+
+    Counts are read from the ``news_daily_counts`` rollup.
 
     Query Params:
         date (str): The date.
+        start (str): First day of a range, used instead of ``date`` (optional).
+        end (str): Last day of the range, inclusive (optional).
 
     Returns:
         JSON: Category -> count mapping.
     """
-    date = request.args.get("date")
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT category, COUNT(*) FROM news WHERE DATE(published_at) = %s GROUP BY category",
-        (date,),
-    )
-    result = dict(cursor.fetchall())
-    conn.close()
+    try:
+        if "start" in request.args or "end" in request.args:
+            first_day, last_day = requested_days(default_days=1)
+        else:
+            first_day = last_day = day_range(request.args.get("date"))[0].date()
+    except ValueError:
+        return jsonify({"error": "Invalid date"}), 400
+
+    result = counts_by_category(db_pool, first_day, last_day)
     return jsonify({cat: result.get(cat, 0) for cat in categories})
 
 
 @app.route("/search")
 def search_news():
     """
-    Handles a GET request to search news articles by keyword and optional date.
+    Handles a GET request to full-text search news articles by keyword and optional date.
 
-    Retrieves news articles from the database where the title or description
-    contains the specified search keyword (case-insensitive). If a date is provided,
-    the search is further filtered to that specific date. Results are limited to
-    the 50 most recent matches, ordered by publication date descending.
+    Matches the search text against news titles and descriptions using the
+    ``search_vector`` full-text index. If a date is provided, the search is
+    further filtered to that specific date. Results are ordered by relevance
+    and returned page by page.
 
     Query Parameters:
-        q (str): The search keyword (required).
+        q (str): The search text (required). Supports "quoted phrases", ``or``
+            and ``-excluded`` words.
         date (str): The publication date in YYYY-MM-DD format (optional).
+        limit (int): Page size, 50 by default and at most 100 (optional).
+        cursor (str): ``next_cursor`` of the previous page (optional).
 
     Returns:
-        JSON: A list of matching news articles, each with title, description, and URL.
+        JSON: ``results`` (matching news articles with title, description, URL,
+        source, publication date, rank and ``<mark>``-highlighted
+        ``title_html``/``description_html``), ``next_cursor`` and
+        ``truncated`` (True if only the most recent matches were ranked;
+        searching a date reaches the older ones).
     """
-    query = request.args.get("q", "").strip().lower()
+    query = request.args.get("q", "").strip()
     date = request.args.get("date", "").strip()
+    limit = max(1, min(request.args.get("limit", 50, type=int), 100))
 
     if not query:
-        return jsonify([])
+        return jsonify({"results": [], "next_cursor": None, "truncated": False})
+
+    start = end = None
+    if date:
+        try:
+            start, end = day_range(date)
+        except ValueError:
+            return jsonify({"error": "Invalid date"}), 400
+
+    try:
+        page = search_articles(
+            db_pool, query, start, end, limit=limit, cursor=request.args.get("cursor")
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    return jsonify(page)
+
 
-    conn = db_connect()
-    cursor = conn.cursor()
+NO_NEWS_REPLY = "😕 Unfortunately, no news for this date was found."
 
-    base_query = """
-        SELECT title, description, url
-        FROM news
-        WHERE (LOWER(title) LIKE %s OR LOWER(description) LIKE %s)
+
+def prepare_chat(data):
     """
-    params = [f"%{query}%", f"%{query}%"]
+    Validates a chat request and builds the prompt for the model.
 
-    if date:
-        base_query += " AND DATE(published_at) = %s"
-        params.append(date)
+    Makes sure the session has a chat id, so it has to run inside the view,
+    before a streamed response starts.
+
+    Args:
+        data (dict): Request JSON with ``message``, ``date``, ``category``
+            and ``scope``.
 
-    base_query += " ORDER BY published_at DESC LIMIT 50"
+    Returns:
+        dict: ``chat_id``, ``message``, ``prompt`` and the answer
+        ``cache_key``; ``prompt`` is None if there is no news for the date.
 
-    cursor.execute(base_query, tuple(params))
-    results = cursor.fetchall()
-    conn.close()
+    Raises:
+        ValueError: If the message or date is missing or the date or scope
+            is invalid.
+    """
+    data = data or {}
+    msg = data.get("message", "")
+    date = data.get("date", "")  # YYYY-MM-DD
+    category = data.get("category") or "All categories"
+    scope = data.get("scope") or "day"
+
+    if scope not in CHAT_SCOPES:
+        raise ValueError(f"Invalid scope, use one of {', '.join(CHAT_SCOPES)}")
+    days = CHAT_SCOPES[scope]
+    if not msg or (not date and days is not None):
+        raise ValueError("Неповні дані")
+
+    start = end = None
+    if days is not None:
+        try:
+            start, end = day_range(date)
+        except ValueError:
+            raise ValueError("Invalid date")
+        start -= timedelta(days=days - 1)
+
+    if "chat_id" not in session:
+        session["chat_id"] = uuid.uuid4().hex
+    chat = {"chat_id": session["chat_id"], "message": msg, "prompt": None}
+
+    category_filter = category if category != "All categories" else None
+    if days == 1:
+        # One windowed query for all categories, cached between turns and
+        # trimmed to the token budget by relevance to the message
+        day = start.date()
+        version = response_cache.validators(f"chat:{day}", [f"date:{day}"])[0]
+        context = chat_context.build(msg, start, end, category_filter, version=version)
+        period = date
+    else:
+        # Longer periods are too big to read whole: take the articles most
+        # similar to the message from the embedding index
+        context = chat_context.retrieve(
+            msg, news_index, start, end, category_filter, top_k=CHAT_RETRIEVAL_TOP_K
+        )
+        period = f"{start:%Y-%m-%d} to {date}" if start else "all dates"
+    if not context["text"]:
+        return chat
 
-    news_list = []
-    for title, description, url in results:
-        news_list.append({"title": title, "description": description, "url": url})
+    history = chat_sessions.render(chat_sessions.load(chat["chat_id"]))
+    news_text = context["text"]
+    chat["cache_key"] = cache_key(msg, period, category, news_text, history)
 
-    return jsonify(news_list)
+    # The conversation goes first: it only grows between summaries, so
+    # consecutive prompts of a chat share their beginning
+    chat["prompt"] = f"""
+    {history}
+
+    News for {period} {f'in category {category}' if category else ''}:
+    {news_text}
+
+    User: {msg}
+    AI:
+    """
+    return chat
+
+
+def remember_turn(chat, response):
+    """Appends a finished question and answer to the conversation."""
+    chat_sessions.append(chat["chat_id"], chat["message"], response)
+
+
+def sse_event(data, event=None):
+    """Formats one server-sent event with a JSON payload."""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 @app.route("/chat", methods=["POST"])
@@ -642,14 +1705,17 @@ def chat():
     (or all categories), formats them into a readable context, and appends them to a prompt
     for a generative AI model (e.g., Gemini or ChatGPT).
 
-    If chat history exists in the user's session, it is appended to the prompt for context.
+    If the user's session has a chat history, it is appended to the prompt for context.
     The AI model then generates a response based on the news content and user's message.
 
     Request JSON:
         {
             "message": str,          # The user's chat input (required)
-            "date": str,             # Date in 'YYYY-MM-DD' format (required)
-            "category": str|null     # Optional category or "All categories"
+            "date": str,             # Date in 'YYYY-MM-DD' format (required
+                                     # unless scope is "all")
+            "category": str|null,    # Optional category or "All categories"
+            "scope": str|null        # "day" (default), "week" or "month" up
+                                     # to the date, or "all" dates
         }
 
     Returns:
@@ -668,96 +1734,102 @@ def chat():
 
     Notes:
         - News is grouped by category and numbered starting from 1 per group.
-        - Up to 100 articles per category are fetched.
-        - Chat history is stored in the user's session and included in the prompt.
+        - The newest 100 articles per category (CHAT_CONTEXT_PER_CATEGORY) are
+          read in one query and near-duplicate stories are dropped; the list
+          is cached per date and category until ingest changes that date.
+        - The articles most relevant to the message are kept within
+          CHAT_CONTEXT_TOKENS estimated tokens.
+        - For a week, a month or all dates, the CHAT_RETRIEVAL_TOP_K articles
+          most similar to the message are taken from the embedding index.
+        - The conversation is kept on the server under an id stored in the
+          user's session and included in the prompt; turns beyond
+          2 * CHAT_KEEP_TURNS are folded into a summary.
+        - Answers are cached by the normalized message, period, category,
+          news context and history (LLM_CACHE_TTL), and identical questions
+          asked at the same time share one model call.
+        - POST /chat/stream takes the same request and streams the reply.
     """
-    data = request.json
-    msg = data.get("message", "")
-    date = data.get("date", "")  # YYYY-MM-DD
-    category = data.get("category") or "All categories"
-
-    if not msg or not date:
-        return jsonify({"error": "Неповні дані"}), 400
-
-    # Reading news from the database by date and category
-    conn = db_connect()
-    cursor = conn.cursor()
-
-    if category != "All categories":
-        cursor.execute(
-            """
-            SELECT title, description, category FROM news
-            WHERE DATE(published_at) = %s AND category = %s
-            ORDER BY published_at DESC
-            LIMIT 100
-        """,
-            (date, category),
-        )
-        articles = cursor.fetchall()
-    else:
-        articles = []
-        for cat in categories:  # using a list of categories
-            cursor.execute(
-                """
-                SELECT title, description, category FROM news
-                WHERE DATE(published_at) = %s AND category = %s
-                ORDER BY published_at DESC
-                LIMIT 100
-            """,
-                (date, cat),
-            )
-            articles += cursor.fetchall()
-
-    cursor.close()
-    conn.close()
-
-    if not articles:
-        return jsonify(
-            {"response": "😕 Unfortunately, no news for this date was found."}
-        )
+    try:
+        chat = prepare_chat(request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if not articles:
-        return jsonify({"response": "😕 No news found for the selected parameters."})
+    if chat["prompt"] is None:
+        return jsonify({"response": NO_NEWS_REPLY})
 
-    # Saving chat history
-    history = session.get("chat_history", "")
+    response = model.generate(chat["prompt"], chat["cache_key"]).strip()
+    remember_turn(chat, response)
+    chat_stats["answers"] += 1
 
-    #  Grouping news into categories
-    grouped = defaultdict(list)
-    for title, description, cat in articles:
-        grouped[cat].append((title, description))
+    return jsonify({"response": response})
 
-    formatted_articles = []
 
-    # Forming blocks by category
-    for cat in sorted(grouped.keys()):
-        formatted_articles.append(f"\n### 🗂 Category: {cat.capitalize()}")
-        for i, (title, description) in enumerate(grouped[cat], start=1):
-            formatted_articles.append(
-                f"""{i}.
-    Title: {title}
-    Description: {description}
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
     """
-            )
-    # Combining into the final text
-    news_text = "\n".join(formatted_articles)
+    Streams the chat reply as server-sent events while the model writes it.
 
-    prompt = f"""
-    News for {date} {f'in category {category}' if category else ''}:
-    {news_text}
-
-    {history}
-    User: {msg}
-    AI:
-    """
-    response = model.generate_content(prompt).text.strip()
+    Takes the same request JSON as ``/chat``. Every chunk of the answer is
+    sent as soon as the model produces it, so the first words show up after
+    the model's time to first token instead of its whole generation time.
 
-    # Refreshing the session
-    history += f"User: {msg}\nAI: {response}"
-    session["chat_history"] = history[-5000:]
+    Returns:
+        text/event-stream: ``data: {"text": str}`` events with consecutive
+        pieces of the reply, then an ``event: done`` (or ``event: error``).
+        Invalid requests get a JSON error with status 400 instead.
 
-    return jsonify({"response": response})
+    Notes:
+        - When the client disconnects (the user cancels or leaves), the
+          model stream is closed and nothing is added to the chat history.
+        - The reply is added to the chat history only once it is complete.
+    """
+    try:
+        chat = prepare_chat(request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def events():
+        if chat["prompt"] is None:
+            yield sse_event({"text": NO_NEWS_REPLY})
+            yield sse_event({}, "done")
+            return
+
+        chat_stats["streams"] += 1
+        started = time.perf_counter()
+        chunks = model.stream(chat["prompt"], chat["cache_key"])
+        parts = []
+        try:
+            for chunk in chunks:
+                if not parts:
+                    chat_stats["first_token_seconds"] += time.perf_counter() - started
+                parts.append(chunk)
+                yield sse_event({"text": chunk})
+        except GeneratorExit:
+            # The WSGI server closes the response when the client goes away
+            chat_stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            chat_stats["errors"] += 1
+            print(f"❌ Chat stream failed: {e}")
+            yield sse_event({"error": "The model failed to answer"}, "error")
+            return
+        finally:
+            chunks.close()
+
+        remember_turn(chat, "".join(parts).strip())
+        yield sse_event({}, "done")
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        # Proxies must pass every event on instead of buffering the response
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 if __name__ == "__main__":
+    # With the debug reloader only the child process serves requests
+    # For production use wsgi.py or asgi.py, see gunicorn.conf.py
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_work()
     app.run(debug=True)
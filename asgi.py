@@ -0,0 +1,280 @@
+"""
+ASGI entry point that serves the I/O-bound routes on an event loop.
+
+``GET /news-by-date`` reads through an asyncpg pool and ``POST /chat``
+waits for the model without holding a worker; every other route is passed
+on to the Flask app. The server's event loop also runs the news ingest,
+with one long-lived NewsAPI session.
+
+Usage:
+    WEB_MODE=asgi gunicorn -c gunicorn.conf.py
+    uvicorn asgi:application --workers 4
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import asyncpg
+from flask import jsonify, request
+
+import app
+from db import asyncpg_params, day_range
+
+# Threads for the blocking work left: model calls (the SDK is synchronous),
+# psycopg2 reads of the chat context and sessions, and the Flask routes
+ASYNC_THREADS = int(os.getenv("ASYNC_THREADS", "64"))
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "1"))
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "10"))
+
+NEWS_BY_DATE_SQL = """SELECT title, description, url, source, published_at FROM news
+    WHERE published_at >= $1 AND published_at < $2 ORDER BY published_at DESC"""
+
+
+def wsgi_environ(scope, body):
+    """
+    Builds the WSGI environ of an ASGI HTTP request.
+
+    Args:
+        scope (dict): ASGI connection scope.
+        body (bytes): The whole request body.
+
+    Returns:
+        dict: The environ, usable by a WSGI app or a Flask request context.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin1"),
+        "PATH_INFO": scope["path"].encode().decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class AsyncServer:
+    """
+    ASGI application answering some routes with coroutine views and the
+    rest with the Flask app.
+
+    Coroutine views run inside a Flask request context, so they use
+    ``request``, ``session`` and ``jsonify`` like the other views, and their
+    responses go through the same after-request processing and session
+    cookie. Flask routes run on the event loop's thread pool; their
+    responses are streamed, and a client disconnecting closes them like a
+    WSGI server does.
+
+    Args:
+        flask_app (flask.Flask): App serving the other routes.
+        threads (int): Size of the event loop's thread pool.
+        min_connections (int): Connections the asyncpg pool opens at startup.
+        max_connections (int): Maximum connections of the asyncpg pool.
+    """
+
+    def __init__(self, flask_app, threads=64, min_connections=1, max_connections=10):
+        self.flask_app = flask_app
+        self.threads = threads
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.db = None
+        self.routes = {}  # (method, path) -> coroutine view
+
+    def route(self, path, methods=("GET",)):
+        """Registers a coroutine view for a path."""
+
+        def decorator(view):
+            for method in methods:
+                self.routes[(method, path)] = view
+            return view
+
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        view = self.routes.get((scope["method"], scope["path"]))
+        if view is None:
+            await self._run_wsgi(scope, body, receive, send)
+        else:
+            await self._run_view(view, scope, body, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    print(f"❌ Server startup failed: {e}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self):
+        """Opens the asyncpg pool and the NewsAPI session, then starts the background work."""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(self.threads, thread_name_prefix="asgi"))
+        self.db = await asyncpg.create_pool(
+            **asyncpg_params(app.db_pool.dsn),
+            min_size=self.min_connections,
+            max_size=self.max_connections,
+        )
+        await app.news_fetcher.open()
+        app.ingest_loop = loop
+        await asyncio.to_thread(app.start_background_work)
+
+    async def shutdown(self):
+        """Stops the ingest scheduler and closes the NewsAPI session and the pool."""
+        app.ingest_scheduler.stop()
+        app.ingest_loop = None
+        await app.news_fetcher.close()
+        await self.db.close()
+
+    async def _run_view(self, view, scope, body, send):
+        flask_app = self.flask_app
+        with flask_app.request_context(wsgi_environ(scope, body)):
+            try:
+                try:
+                    rv = await view()
+                except Exception as e:
+                    rv = flask_app.handle_user_exception(e)
+                response = flask_app.finalize_request(rv)
+            except Exception as e:
+                response = flask_app.handle_exception(e)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in response.headers.to_wsgi_list()
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def _run_wsgi(self, scope, body, receive, send):
+        loop = asyncio.get_running_loop()
+        disconnected = threading.Event()
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        def call(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            head = {}
+
+            def start_response(status, headers, exc_info=None):
+                head["status"] = int(status.split(" ", 1)[0])
+                head["headers"] = [
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in headers
+                ]
+
+            def send_head():
+                if not head.get("sent"):
+                    call({"type": "http.response.start", **head})
+                    head["sent"] = True
+
+            chunks = self.flask_app(wsgi_environ(scope, body), start_response)
+            try:
+                for chunk in chunks:
+                    if disconnected.is_set():
+                        return  # closing the iterable cancels streamed answers
+                    if chunk:
+                        send_head()
+                        call({"type": "http.response.body", "body": chunk, "more_body": True})
+                send_head()
+                call({"type": "http.response.body", "body": b""})
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await asyncio.to_thread(run)
+        finally:
+            watcher.cancel()
+
+
+application = AsyncServer(
+    app.app,
+    threads=ASYNC_THREADS,
+    min_connections=ASYNC_DB_POOL_MIN,
+    max_connections=ASYNC_DB_POOL_MAX,
+)
+
+
+@application.route("/news-by-date")
+@app.response_cache.cached_async(app.date_scopes)
+async def news_by_date():
+    """Same answer as ``app.news_by_date``, read through the asyncpg pool."""
+    try:
+        start, end = day_range(request.args.get("date"))
+    except ValueError:
+        return jsonify({"error": "Invalid date"}), 400
+
+    async with application.db.acquire() as conn:
+        rows = await conn.fetch(NEWS_BY_DATE_SQL, start, end)
+    return jsonify([dict(row) for row in rows])
+
+
+@application.route("/chat", methods=["POST"])
+async def chat():
+    """
+    Same as ``app.chat``, but waiting for the model only holds a thread of
+    the pool, not a worker. The chat context and the conversation are read
+    on the thread pool too, through the psycopg2 pool and caches they share
+    with the Flask routes.
+    """
+    try:
+        chat = await asyncio.to_thread(app.prepare_chat, request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if chat["prompt"] is None:
+        return jsonify({"response": app.NO_NEWS_REPLY})
+
+    response = await asyncio.to_thread(app.model.generate, chat["prompt"], chat["cache_key"])
+    response = response.strip()
+    await asyncio.to_thread(app.remember_turn, chat, response)
+    app.chat_stats["answers"] += 1
+
+    return jsonify({"response": response})
@@ -0,0 +1,1320 @@
+"""
+Benchmarks for the DataNewsHub data paths.
+
+They run against the database configured by the same environment variables
+as the app (``DB_NAME``, ``DB_USER``, ``BD_PASSWORD``, ``DB_HOST``), but
+only ever touch tables inside a scratch ``bench`` schema. Correctness
+checks live in the test suite (``python -m pytest tests``).
+
+Usage:
+    python benchmarks.py bulk-insert --rows 5000
+    python benchmarks.py search --rows 1000000
+    python benchmarks.py reports --backends native,pool
+    python benchmarks.py template-render --articles 1000
+    python benchmarks.py chat-stream --first-token-delay 0.3
+    python benchmarks.py retrieval --articles 10000 100000
+    python benchmarks.py chat-cache --concurrency 16
+    python benchmarks.py chat-session --turns 40
+    python benchmarks.py ingest-catchup --articles 3000
+    python benchmarks.py ingest-faults --error-rate 0.2 --rate-limit 20
+    python benchmarks.py serve-load --servers dev wsgi asgi --concurrency 64
+    python benchmarks.py articles --rows 20000
+    python benchmarks.py json-encode --rows 1000 10000 50000
+    python benchmarks.py dedup --stories 20000
+    python benchmarks.py partitions --rows 500000 --days 730
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+import psycopg2
+
+from db import ConnectionPool
+from dedup import canonical_url
+from embeddings import EmbeddingIndex, HashingEmbedder, build_index
+from ingest import bulk_save_news, normalize_article, parse_published_at
+from llm import CachingModel, FakeModel
+from schema import migrate
+from search import search_articles
+from serialization import StdlibEncoder, create_encoder, iter_json_array, json_rows_response
+
+BENCH_SCHEMA = "bench"
+CATEGORIES = [
+    "business",
+    "entertainment",
+    "general",
+    "health",
+    "science",
+    "sports",
+    "technology",
+]
+WORDS = (
+    "market election storm vaccine rocket league startup court climate energy "
+    "budget trial museum festival research player merger outbreak satellite "
+    "police strike record transfer launch drought tariff summit virus galaxy"
+).split()
+SYLLABLES = "ka lo mi ra ten vo shi pe dru an gel mor tis ub zen fa".split()
+# Real words first, then made-up ones; word frequency follows Zipf's law
+VOCABULARY = WORDS + [
+    "".join(s) for n in (2, 3) for s in itertools.product(SYLLABLES, repeat=n)
+]
+ZIPF_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+
+def db_config():
+    """Returns connection parameters for the scratch schema."""
+    return {
+        "dbname": os.getenv("DB_NAME", "newsdb"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("BD_PASSWORD"),
+        "host": os.getenv("DB_HOST", "localhost"),
+        "options": f"-c search_path={BENCH_SCHEMA}",
+    }
+
+
+def reset_schema():
+    """Recreates the scratch schema and applies all migrations to it."""
+    conn = psycopg2.connect(**db_config())
+    with conn, conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    conn.close()
+
+    pool = ConnectionPool(minconn=1, maxconn=1, **db_config())
+    migrate(pool)
+    pool.close()
+
+
+def seed(rows, days):
+    """Fills the scratch ``news`` table with synthetic articles and analyzes it."""
+    pool = ConnectionPool(minconn=1, maxconn=1, **db_config())
+    articles = synthetic_articles(rows, days=days)
+    while True:
+        chunk = [normalize_article(a, c) for a, c in itertools.islice(articles, 50_000)]
+        if not chunk:
+            break
+        bulk_save_news(pool, chunk, 5000)
+    with pool.connection() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE news")
+        conn.autocommit = False
+    pool.close()
+
+
+def synthetic_articles(n, days=7, seed=42, day=None):
+    """
+    Generates NewsAPI-shaped article dicts.
+
+    Args:
+        n (int): Number of articles.
+        days (int): Articles are spread over this many days back from now.
+        seed (int): Random seed, so runs are comparable.
+        day (date): Put all articles on this day instead (optional).
+
+    Yields:
+        tuple: (article, category).
+    """
+    rnd = random.Random(seed)
+    now = datetime.now()
+    if day is not None:
+        now, days = datetime.combine(day + timedelta(days=1), datetime.min.time()), 1
+    for i in range(n):
+        words = rnd.choices(VOCABULARY, cum_weights=ZIPF_WEIGHTS, k=24)
+        published = now - timedelta(seconds=rnd.randrange(1, days * 86400))
+        article = {
+            "title": " ".join(words[:6]).capitalize(),
+            "description": " ".join(words[6:]).capitalize() + ".",
+            "url": f"https://example.com/{day or 'any'}/{seed}/{i}",
+            "source": {"name": f"Source {i % 40}"},
+            "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        yield article, rnd.choice(CATEGORIES)
+
+
+def report(name, seconds, rows):
+    print(f"{name:<24} {seconds:8.3f}s  {rows / seconds:10.0f} rows/s")
+
+
+def report_latencies(name, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{name:<24} p50 {p50:9.2f}ms  p99 {p99:9.2f}ms  ({len(latencies)} runs)")
+
+
+def bench_bulk_insert(args):
+    """Compares the row-at-a-time insert path with ``bulk_save_news``."""
+    rows = [normalize_article(a, c) for a, c in synthetic_articles(args.rows)]
+
+    # Old path: one connection and one commit per article
+    reset_schema()
+    start = time.perf_counter()
+    for row in rows:
+        conn = psycopg2.connect(**db_config())
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """INSERT INTO news
+                       (title, description, url, source, published_at, category, url_key)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s)
+                   ON CONFLICT (url_key, published_at) DO NOTHING""",
+                (*row, canonical_url(row[2])),
+            )
+        conn.commit()
+        conn.close()
+    report("row-at-a-time", time.perf_counter() - start, len(rows))
+
+    reset_schema()
+    pool = ConnectionPool(minconn=1, maxconn=1, **db_config())
+    start = time.perf_counter()
+    counts = bulk_save_news(pool, rows, batch_size=args.batch_size)
+    report(f"bulk (batch={args.batch_size})", time.perf_counter() - start, len(rows))
+
+    # Second pass only finds duplicates
+    start = time.perf_counter()
+    again = bulk_save_news(pool, rows, batch_size=args.batch_size)
+    report("bulk, all duplicates", time.perf_counter() - start, len(rows))
+    print(f"first pass: {counts}, second pass: {again}")
+    pool.close()
+
+
+LEGACY_SEARCH_SQL = """
+    SELECT title, description, url
+    FROM news
+    WHERE (LOWER(title) LIKE %s OR LOWER(description) LIKE %s)
+    ORDER BY published_at DESC LIMIT 50
+"""
+
+
+def bench_search(args):
+    """Compares p50/p99 latency of the LIKE search with the full-text search."""
+    if not args.no_seed:
+        reset_schema()
+        seed(args.rows, args.days)
+
+    rnd = random.Random(7)
+    # A mix of common, mid-frequency and rare words
+    buckets = [
+        VOCABULARY[: len(VOCABULARY) // 100],
+        VOCABULARY[: len(VOCABULARY) // 10],
+        VOCABULARY,
+    ]
+    queries = [rnd.choice(rnd.choice(buckets)) for _ in range(args.queries)]
+
+    pool = ConnectionPool(minconn=1, maxconn=1, **db_config())
+    latencies = []
+    with pool.connection() as conn, conn.cursor() as cursor:
+        for word in queries:
+            start = time.perf_counter()
+            cursor.execute(LEGACY_SEARCH_SQL, (f"%{word}%", f"%{word}%"))
+            cursor.fetchall()
+            latencies.append(time.perf_counter() - start)
+    report_latencies("LIKE '%q%'", latencies)
+
+    latencies = []
+    for word in queries:
+        start = time.perf_counter()
+        search_articles(pool, word, limit=50)
+        latencies.append(time.perf_counter() - start)
+    report_latencies("full-text", latencies)
+    pool.close()
+
+
+def synthetic_report(articles):
+    """Builds the report data ``app.generate_pdf`` passes to a PDF backend."""
+    from charts import render_chart
+
+    news_by_category = defaultdict(list)
+    for article, category in synthetic_articles(articles, days=1):
+        news_by_category[category].append(
+            {
+                "title": article["title"],
+                "url": article["url"],
+                "time": article["publishedAt"][11:16],
+                "source": article["source"]["name"],
+            }
+        )
+    date = datetime.now().strftime("%Y-%m-%d")
+    counts = {category: len(items) for category, items in news_by_category.items()}
+    return {
+        "date": date,
+        "locale": "en",
+        "chart_png": render_chart(date, counts),
+        "chart_base64": "",
+        "categories": sorted(news_by_category),
+        "news_by_category": sorted(news_by_category.items()),
+        "t": {
+            "report_title": "Report for",
+            "graph_title": "News distribution graph",
+            "news_list": "List of news",
+            "category_label": "Category",
+            "footer": "Generated automatically by NewsAnalyzer™",
+            "contents": "Contents",
+        },
+    }
+
+
+def bench_reports(args):
+    """Measures reports per second of the PDF backends for growing days."""
+    from pdf import create_backend
+
+    options = {
+        "wkhtmltopdf": {"wkhtmltopdf_path": os.getenv("WKHTMLTOPDF_PATH")},
+        "pool": {"workers": args.workers},
+    }
+    reports = {n: synthetic_report(n) for n in args.articles}
+    out = tempfile.mkdtemp()
+    try:
+        for name in args.backends.split(","):
+            backend = create_backend(name, **options.get(name, {}))
+            # The pool renders several reports at once
+            concurrency = args.workers if name == "pool" else 1
+            try:
+                backend.warm_up()
+                backend.render(reports[args.articles[0]], os.path.join(out, "warm-up.pdf"))
+            except OSError as e:
+                print(f"{name:<12} skipped: {e}")
+                continue
+            for n, report in reports.items():
+                paths = [os.path.join(out, f"{name}-{n}-{i}.pdf") for i in range(args.repeat)]
+                start = time.perf_counter()
+                with ThreadPoolExecutor(concurrency) as executor:
+                    list(executor.map(lambda path: backend.render(report, path), paths))
+                seconds = time.perf_counter() - start
+                size = os.path.getsize(paths[0]) / 1024
+                print(
+                    f"{name:<12} {n:>6} articles  {args.repeat / seconds:8.2f} reports/s"
+                    f"  {seconds / args.repeat * 1000:9.1f}ms each  {size:8.0f} KiB"
+                )
+            backend.close()
+    finally:
+        shutil.rmtree(out)
+
+
+def bench_template_render(args):
+    """Compares rendering the HTML report with and without compiled templates."""
+    from jinja2 import Template
+
+    from pdf import ReportTemplates
+
+    report = synthetic_report(args.articles)
+    path = "templates/report_template.html"
+    cache_dir = tempfile.mkdtemp()
+    shared = ReportTemplates(cache_dir=cache_dir)
+    shared.warm_up()
+
+    def per_call():
+        with open(path, "r", encoding="utf-8") as f:
+            return Template(f.read())
+
+    def new_environment():
+        # e.g. a fresh worker process: compiled code comes from the bytecode cache
+        return ReportTemplates(cache_dir=cache_dir).get("en")
+
+    variants = {
+        "per-call Template": per_call,
+        "bytecode cache": new_environment,
+        "shared env": lambda: shared.get("en"),
+    }
+    try:
+        for name, get_template in variants.items():
+            compile_times, render_times = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                template = get_template()
+                compiled = time.perf_counter()
+                for _ in template.generate(**report):
+                    pass
+                compile_times.append(compiled - start)
+                render_times.append(time.perf_counter() - compiled)
+            report_latencies(f"{name} load", compile_times)
+            report_latencies(f"{name} render", render_times)
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def bench_chat_stream(args):
+    """
+    Compares when the first words of a chat answer arrive with ``/chat`` and
+    ``/chat/stream``, using the fake model, and checks that disconnecting
+    cancels the stream.
+    """
+    import app
+
+    reset_schema()
+    seed(args.rows, 2)
+    app.db_pool.close()
+    app.db_pool.dsn.update(db_config())
+    app.model = CachingModel(FakeModel(args.first_token_delay, args.token_delay))
+    app.app.secret_key = app.app.secret_key or "chat-stream"
+    client = app.app.test_client()
+    date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    body = {"message": "Any news about the election?", "date": date}
+    # Every turn extends the chat history, so no answer comes from the cache
+    client.post("/chat", json=body)  # warm the context cache
+
+    blocking = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        client.post("/chat", json=body)
+        blocking.append(time.perf_counter() - start)
+
+    first_chunk = []
+    complete = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        response = client.post("/chat/stream", json=body, buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+        first_chunk.append(time.perf_counter() - start)
+        for _ in chunks:
+            pass
+        complete.append(time.perf_counter() - start)
+        response.close()
+
+    report_latencies("/chat (whole answer)", blocking)
+    report_latencies("/chat/stream first", first_chunk)
+    report_latencies("/chat/stream complete", complete)
+
+    cancelled = app.chat_stats["cancelled"]
+    response = client.post("/chat/stream", json=body, buffered=False)
+    next(iter(response.response))
+    response.close()  # what the WSGI server does when the client disconnects
+    if app.chat_stats["cancelled"] != cancelled + 1:
+        sys.exit("Closing the response did not cancel the stream")
+    print("cancellation ok")
+
+
+CHAT_QUESTIONS = [
+    "What happened in sports today?",
+    "what happened in sports today",
+    "Any news about the election?",
+    "Summarize the business news.",
+    "What is new in science?",
+    "Were there any storms?",
+    "Which stories mention a vaccine?",
+    "What did the court decide?",
+]
+
+
+def bench_chat_cache(args):
+    """
+    Sends a burst of identical chat questions and then a mix of popular
+    ones, and reports how many of them reached the (fake) model.
+    """
+    import app
+
+    reset_schema()
+    seed(args.rows, 2)
+    app.db_pool.close()
+    app.db_pool.dsn.update(db_config())
+    app.model = CachingModel(FakeModel(args.first_token_delay, args.token_delay))
+    app.app.secret_key = app.app.secret_key or "chat-cache"
+    date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    def ask(message):
+        client = app.app.test_client()  # a new visitor, without chat history
+        start = time.perf_counter()
+        response = client.post("/chat", json={"message": message, "date": date})
+        assert response.status_code == 200, response.data
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        burst = list(executor.map(ask, [CHAT_QUESTIONS[0]] * args.concurrency))
+    report_latencies(f"burst of {args.concurrency}", burst)
+    print(f"{'model calls':<24} {app.model.stats()['misses']:9}")
+
+    rnd = random.Random(3)
+    weights = [1 / rank for rank in range(1, len(CHAT_QUESTIONS) + 1)]
+    questions = rnd.choices(CHAT_QUESTIONS, weights, k=args.requests)
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        mixed = list(executor.map(ask, questions))
+    report_latencies(f"mix of {len(CHAT_QUESTIONS)} questions", mixed)
+
+    stats = app.model.stats()
+    requests = args.concurrency + args.requests
+    print(
+        f"{'model calls':<24} {stats['misses']:9} of {requests} requests"
+        f"  (hits {stats['hits']}, coalesced {stats['coalesced']},"
+        f" hit rate {stats['hit_rate']:.1%}, saved {stats['saved_seconds']:.1f}s)"
+    )
+
+
+def bench_chat_session(args):
+    """
+    Holds a long chat and compares the session cookie and how much of each
+    prompt's history repeats the previous one, against the old cookie-held
+    history string trimmed to its last 5000 characters.
+    """
+    import app
+    from sessions import ChatSessionStore, MemorySessionBackend, PostgresSessionBackend
+
+    reset_schema()
+    seed(args.rows, 2)
+    app.db_pool.close()
+    app.db_pool.dsn.update(db_config())
+    prompts = []
+
+    class RecordingModel(FakeModel):
+        def stream(self, prompt):
+            prompts.append(prompt)
+            return super().stream(prompt)
+
+    app.model = CachingModel(RecordingModel(0, 0))
+    app.app.secret_key = app.app.secret_key or "chat-session"
+    serializer = app.app.session_interface.get_signing_serializer(app.app)
+    date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    rnd = random.Random(5)
+
+    for backend in args.backends:
+        app.chat_sessions = ChatSessionStore(
+            PostgresSessionBackend(app.db_pool)
+            if backend == "postgres"
+            else MemorySessionBackend(),
+            keep_turns=args.keep_turns,
+        )
+        client = app.app.test_client()
+        prompts.clear()
+        old_history = ""
+        old_cookie = new_cookie = 0
+        old_stable = 0
+        turn_seconds = []
+        for turn in range(args.turns):
+            message = f"{rnd.choice(CHAT_QUESTIONS)} ({turn})"
+            start = time.perf_counter()
+            client.post("/chat/stream", json={"message": message, "date": date}).get_data()
+            turn_seconds.append(time.perf_counter() - start)
+
+            cookie = client.get_cookie("session")
+            new_cookie = max(new_cookie, len(cookie.value) if cookie else 0)
+            answer = RecordingModel().answer(prompts[-1])
+            previous = old_history
+            old_history = (old_history + f"User: {message}\nAI: {answer}")[-5000:]
+            old_stable += old_history.startswith(previous)
+            old_cookie = max(old_cookie, len(serializer.dumps({"chat_history": old_history})))
+
+        # Conversation part of the prompt: everything before the news
+        histories = [p.split("News for", 1)[0].strip() for p in prompts]
+        new_stable = sum(
+            1 for before, after in zip([""] + histories, histories) if after.startswith(before)
+        )
+        print(f"{backend} sessions, {args.turns} turns, keep {args.keep_turns}:")
+        report_latencies("  chat turn", turn_seconds)
+        print(f"  {'largest cookie':<22} {new_cookie:6} B   (history in cookie: {old_cookie} B)")
+        print(
+            f"  {'history kept as prefix':<22} {new_stable:6}/{args.turns}"
+            f"  (history in cookie: {old_stable}/{args.turns})"
+        )
+        print(f"  {'summaries':<22} {app.chat_sessions.stats()['summaries']:6}")
+
+
+def bench_ingest_catchup(args):
+    """
+    Runs the incremental ingest against the local NewsAPI fixture: a first
+    catch-up, a run without news, and a run after new articles arrived.
+    """
+    os.environ["NEWS_INDEX_DIR"] = tempfile.mkdtemp(prefix="news-index-")
+    import app
+    from newsapi_fixture import NewsAPIFixture
+
+    reset_schema()
+    app.db_pool.close()
+    app.db_pool.dsn.update(db_config())
+    fixture = NewsAPIFixture(
+        synthetic_articles(args.articles, days=args.days), max_results=args.max_results
+    )
+    app.NEWS_API_URL = fixture.start()
+    app.INGEST_BACKFILL_DAYS = args.days
+    app.INGEST_MAX_PAGES = args.max_pages
+    if args.save_fixture:
+        fixture.save(args.save_fixture)
+
+    def run(name):
+        requests = len(fixture.requests)
+        start = time.perf_counter()
+        counts = app.fetch_and_store_news()
+        seconds = time.perf_counter() - start
+        print(
+            f"{name:<24} {seconds:8.3f}s  {len(fixture.requests) - requests:4} requests"
+            f"  {counts['inserted']:6} inserted  {counts['duplicates']:5} duplicates"
+            f"  truncated: {', '.join(counts['truncated']) or '-'}"
+        )
+        return counts
+
+    counts = run("catch-up")
+    # Articles a truncated run skipped are fetched by the next runs
+    for _ in range(args.max_runs):
+        if not counts["gaps"]:
+            break
+        counts = run("closing gaps")
+    run("nothing new")
+    # News published after the last run, newest a few minutes from now
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    fresh = []
+    for i, (article, category) in enumerate(
+        synthetic_articles(args.new, days=1, seed=args.articles)
+    ):
+        article["publishedAt"] = (now + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        article["url"] += "/fresh"
+        fresh.append((article, category))
+    fixture.add(fresh)
+    run(f"{args.new} new articles")
+
+    with app.db_pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM news")
+        stored = cursor.fetchone()[0]
+    fixture.stop()
+    shutil.rmtree(app.news_index.root, ignore_errors=True)
+    print(f"{'stored':<24} {stored} of {args.articles + args.new} articles")
+    if stored != args.articles + args.new:
+        sys.exit("Some articles were not ingested")
+
+
+def bench_ingest_faults(args):
+    """
+    Runs the catch-up ingest against a NewsAPI fixture that answers slowly,
+    fails at random and rate limits, and checks that nothing is lost.
+    """
+    os.environ["NEWS_INDEX_DIR"] = tempfile.mkdtemp(prefix="news-index-")
+    import app
+    from fetcher import Fetcher
+    from newsapi_fixture import NewsAPIFixture
+
+    reset_schema()
+    app.db_pool.close()
+    app.db_pool.dsn.update(db_config())
+    fixture = NewsAPIFixture(
+        synthetic_articles(args.articles, days=args.days),
+        max_results=10 * args.articles,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    app.NEWS_API_URL = fixture.start()
+    app.INGEST_BACKFILL_DAYS = args.days
+    app.INGEST_PAGE_SIZE = args.page_size
+    app.INGEST_MAX_PAGES = 1000
+    app.news_fetcher = Fetcher(
+        concurrency=args.concurrency,
+        rate=args.rate,
+        burst=args.burst,
+        max_attempts=args.max_attempts,
+        backoff=args.backoff,
+    )
+
+    start = time.perf_counter()
+    counts = app.fetch_and_store_news()
+    seconds = time.perf_counter() - start
+    with app.db_pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM news")
+        stored = cursor.fetchone()[0]
+    fixture.stop()
+    shutil.rmtree(app.news_index.root, ignore_errors=True)
+
+    stats = app.news_fetcher.stats()
+    print(
+        f"{'ingest':<24} {seconds:8.3f}s  {stats['requests']:4} requests"
+        f"  {stats['retries']:4} retries  failed: {', '.join(counts['failed']) or '-'}"
+    )
+    print(
+        f"{'injected faults':<24} {fixture.faults['errors']:4} errors (503)"
+        f"  {fixture.faults['rate_limited']:4} rate limited (429)"
+    )
+    print(
+        f"{'fetcher':<24} p50 {stats.get('latency_p50_ms', 0):7.1f}ms"
+        f"  p99 {stats.get('latency_p99_ms', 0):7.1f}ms"
+        f"  throttled {stats['throttled_seconds']:.2f}s  statuses {stats['statuses']}"
+    )
+    print(f"{'stored':<24} {stored} of {args.articles} articles")
+    if stored != args.articles:
+        sys.exit("Some articles were not ingested")
+
+
+# Server processes compared by serve-load; {port} is filled in
+LOAD_SERVERS = {
+    # Flask's threaded development server, what `python app.py` runs
+    "dev": [sys.executable, "-m", "flask", "--app", "app", "run", "--port", "{port}"],
+    "wsgi": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+    "asgi": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+}
+
+
+def start_server(name, port, env):
+    """Starts one of ``LOAD_SERVERS`` and waits until it answers."""
+    command = [part.format(port=port) for part in LOAD_SERVERS[name]]
+    server_env = {
+        **os.environ,
+        **env,
+        "WEB_MODE": name,
+        "WEB_BIND": f"127.0.0.1:{port}",
+    }
+    process = subprocess.Popen(
+        command,
+        env=server_env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1)
+            return process
+        except OSError:
+            if process.poll() is not None:
+                sys.exit(f"The {name} server exited with status {process.returncode}")
+            time.sleep(0.2)
+    process.kill()
+    sys.exit(f"The {name} server did not start")
+
+
+async def load(url, concurrency, duration, request):
+    """
+    Sends requests from ``concurrency`` clients for ``duration`` seconds.
+
+    Args:
+        url (str): Base URL of the server.
+        concurrency (int): Requests in flight at any time.
+        duration (float): Seconds to keep sending.
+        request (callable): ``request(session, url, i)`` sending request
+            number ``i`` and returning the HTTP status.
+
+    Returns:
+        tuple: (latencies of successful requests, failed requests, seconds).
+    """
+    latencies = []
+    failures = 0
+    counter = itertools.count()
+    # Every request starts a new chat, as with that many different users
+    async with aiohttp.ClientSession(
+        cookie_jar=aiohttp.DummyCookieJar(),
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        timeout=aiohttp.ClientTimeout(total=60),
+    ) as session:
+        start = time.perf_counter()
+        stop_at = start + duration
+
+        async def client():
+            nonlocal failures
+            while time.perf_counter() < stop_at:
+                sent = time.perf_counter()
+                try:
+                    status = await request(session, url, next(counter))
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    status = None
+                if status == 200:
+                    latencies.append(time.perf_counter() - sent)
+                else:
+                    failures += 1
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, failures, time.perf_counter() - start
+
+
+def bench_serve_load(args):
+    """
+    Load-tests /news-by-date and /chat (fake model) on the Flask development
+    server, gunicorn with threaded workers (wsgi.py) and the async server
+    (asgi.py), reporting requests per second and latency percentiles.
+    """
+    reset_schema()
+    seed(args.rows, 2)
+    date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    index_dir = tempfile.mkdtemp(prefix="news-index-")
+    env = {
+        "DB_OPTIONS": db_config()["options"],
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_FIRST_TOKEN_DELAY": str(args.model_delay),
+        "FAKE_LLM_TOKEN_DELAY": "0",
+        "RUN_INGEST_SCHEDULER": "0",
+        "FLASK_SECRET_KEY": "serve-load",
+        "NEWS_INDEX_DIR": index_dir,
+        "WEB_WORKERS": str(args.workers),
+        "WEB_THREADS": str(args.threads),
+    }
+    if not args.response_cache:
+        # Every /news-by-date request reads the database
+        env["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+
+    async def news_by_date(session, url, i):
+        async with session.get(f"{url}/news-by-date", params={"date": date}) as response:
+            await response.read()
+            return response.status
+
+    async def chat(session, url, i):
+        # A different question every time, so no answer comes from the cache
+        body = {"message": f"What happened in story {i}?", "date": date}
+        async with session.post(f"{url}/chat", json=body) as response:
+            await response.read()
+            return response.status
+
+    print(
+        f"{args.workers} workers, {args.concurrency} concurrent clients, "
+        f"{args.duration:g}s per route, model answers in {args.model_delay:g}s"
+    )
+    for name in args.servers:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        process = start_server(name, port, env)
+        try:
+            for route, request in (("/news-by-date", news_by_date), ("/chat", chat)):
+                latencies, failures, seconds = asyncio.run(
+                    load(f"http://127.0.0.1:{port}", args.concurrency, args.duration, request)
+                )
+                latencies.sort()
+                p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+                p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+                print(
+                    f"{name + ' ' + route:<20} {len(latencies) / seconds:8.1f} req/s"
+                    f"  p50 {p50:8.1f}ms  p99 {p99:8.1f}ms  failed {failures}"
+                )
+        finally:
+            process.terminate()
+            process.wait()
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def bench_articles(args):
+    """
+    Compares the size and time of a busy day's news as one ``/news-by-date``
+    response and as ``/articles`` pages, and checks that paging through
+    ``/articles`` returns every article exactly once.
+    """
+    os.environ["NEWS_INDEX_DIR"] = tempfile.mkdtemp(prefix="news-index-")
+    import app
+
+    reset_schema()
+    seed(args.rows, 1)
+    app.db_pool.close()
+    app.db_pool.dsn.update(db_config())
+    app.response_cache.local.clear()
+    client = app.app.test_client()
+    date = datetime.now().strftime("%Y-%m-%d")
+
+    def get(url, encoding=None):
+        headers = {"Accept-Encoding": encoding} if encoding else {}
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        return response, time.perf_counter() - start
+
+    response, seconds = get(f"/news-by-date?date={date}")
+    total = len(response.get_json())
+    print(f"{'/news-by-date':<36} {len(response.data):10,} bytes  {seconds * 1000:8.1f}ms")
+    fields = "title,description,url"
+    for encoding in (None, "gzip", "br"):
+        # A new day version each time, so the page is read, not cached
+        app.response_cache.bump([f"date:{date}"])
+        response, seconds = get(
+            f"/articles?date={date}&fields={fields}&limit={args.limit}", encoding
+        )
+        label = f"/articles first page ({response.headers.get('Content-Encoding', 'identity')})"
+        print(f"{label:<36} {len(response.data):10,} bytes  {seconds * 1000:8.1f}ms")
+
+    seen = set()
+    latencies = []
+    cursor = None
+    while True:
+        url = f"/articles?date={date}&fields=id&limit={args.limit}"
+        response, seconds = get(url + (f"&cursor={cursor}" if cursor else ""))
+        latencies.append(seconds)
+        page = response.get_json()
+        seen.update(article["id"] for article in page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    report_latencies(f"/articles page ({len(latencies)} pages)", latencies)
+    shutil.rmtree(app.news_index.root, ignore_errors=True)
+    print(f"{'paged through':<36} {len(seen)} of {total} articles")
+    if len(seen) != total:
+        sys.exit("Paging skipped or repeated articles")
+
+
+def bench_json_encode(args):
+    """
+    Times encoding a list of articles the way the listing routes did (dicts
+    built by hand, Flask's default jsonify) against the stdlib and orjson
+    encoders, whole and streamed in batches.
+    """
+    from flask import Flask, jsonify
+
+    flask_app = Flask("bench")
+    columns = ("title", "description", "url", "source", "published_at")
+    encoders = {"stdlib": StdlibEncoder(), "orjson": create_encoder("orjson")}
+
+    for n in args.rows:
+        # As read from the database, with datetimes
+        rows = [
+            (*row[:4], parse_published_at(row[4]))
+            for row in (
+                normalize_article(article, category)
+                for article, category in synthetic_articles(n, days=1)
+            )
+        ]
+
+        def legacy():
+            with flask_app.app_context():
+                return jsonify(
+                    [
+                        {
+                            "title": r[0],
+                            "description": r[1],
+                            "url": r[2],
+                            "source": r[3],
+                            "published_at": r[4],
+                        }
+                        for r in rows
+                    ]
+                ).get_data()
+
+        paths = {"dicts + jsonify (before)": legacy}
+        for name, encoder in encoders.items():
+            paths[f"{name}"] = lambda e=encoder: json_rows_response(e, columns, rows).get_data()
+            paths[f"{name} streamed"] = lambda e=encoder: b"".join(
+                iter_json_array(e, columns, rows, args.batch_size)
+            )
+
+        print(f"{n} articles")
+        baseline = None
+        for name, path in paths.items():
+            body = path()
+            if [a["url"] for a in json.loads(body)] != [r[2] for r in rows]:
+                sys.exit(f"{name} encoded the articles wrongly")
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                path()
+                times.append(time.perf_counter() - start)
+            best = min(times)
+            baseline = baseline or best
+            print(
+                f"  {name:<26} {best * 1000:9.2f}ms  {len(body) / best / 1e6:7.1f} MB/s"
+                f"  {baseline / best:5.1f}x  {len(body):>11,} bytes"
+            )
+
+
+def syndicated_articles(stories, syndicated=0.3, max_copies=4, days=3, seed=7):
+    """
+    Generates stories of which some are published by several sources.
+
+    A copy is either the same article linked with tracking parameters, or
+    a syndicated copy: another URL and source, the publisher's suffix on
+    the title, and a shortened or slightly edited description.
+
+    Yields:
+        tuple: (article, category, story number), in publication order.
+    """
+    rnd = random.Random(seed)
+    articles = []
+    for story, (article, category) in enumerate(synthetic_articles(stories, days, seed)):
+        articles.append((article, category, story))
+        if rnd.random() >= syndicated:
+            continue
+        published = parse_published_at(article["publishedAt"])
+        for copy in range(rnd.randint(1, max_copies)):
+            if rnd.random() < 0.3:
+                copy_article = {**article, "url": f"{article['url']}/?utm_source=feed&utm_medium={copy}"}
+            else:
+                description = article["description"].split()
+                if rnd.random() < 0.5:
+                    description = description[: int(len(description) * 0.8)]
+                else:
+                    description[rnd.randrange(len(description))] = rnd.choice(VOCABULARY)
+                source = f"Syndicate {rnd.randrange(20)}"
+                copy_article = {
+                    "title": f"{article['title']} - {source}",
+                    "description": " ".join(description),
+                    "url": f"https://news{copy}.example.org/{story}",
+                    "source": {"name": source},
+                    "publishedAt": (
+                        published + timedelta(minutes=rnd.randrange(1, 360))
+                    ).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                }
+            articles.append((copy_article, category, story))
+    articles.sort(key=lambda a: a[0]["publishedAt"])
+    yield from articles
+
+
+def bench_dedup(args):
+    """
+    Measures URL canonicalization and near-duplicate clustering throughput,
+    how well clusters match the generated stories, and the cost of
+    clustering during ``bulk_save_news``.
+    """
+    from dedup import NearDuplicateIndex, shingles
+
+    generated = list(syndicated_articles(args.stories, args.syndicated, args.max_copies))
+    urls = [article["url"] for article, _, _ in generated]
+    start = time.perf_counter()
+    for url in urls:
+        canonical_url(url)
+    report("canonical_url", time.perf_counter() - start, len(urls))
+
+    # URL variants of one article are duplicates by their canonical URL
+    rows, stories = [], {}
+    for article, category, story in generated:
+        row = normalize_article(article, category)
+        key = canonical_url(row[2])
+        if key not in stories:
+            stories[key] = story
+            rows.append(row)
+    print(
+        f"{len(generated)} articles of {args.stories} stories, "
+        f"{len(generated) - len(rows)} URL variants, {len(rows)} to cluster"
+    )
+    articles = [
+        (i + 1, row[0], row[1], parse_published_at(row[4])) for i, row in enumerate(rows)
+    ]
+    truth = [stories[canonical_url(row[2])] for row in rows]
+
+    def build():
+        index = NearDuplicateIndex(threshold=args.threshold, window_days=args.window_days)
+        clusters = []
+        for i in range(0, len(articles), args.batch_size):
+            clusters.extend(index.assign(articles[i : i + args.batch_size]))
+        return index, clusters
+
+    start = time.perf_counter()
+    index, clusters = build()
+    report("MinHash + LSH index", time.perf_counter() - start, len(articles))
+    tracemalloc.start()
+    measured, _ = build()  # held, so its memory is still traced
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del measured
+    print(f"{'index memory':<24} {memory / len(index):8.0f} bytes/article")
+
+    def pairs(labels):
+        groups = defaultdict(list)
+        for position, label in enumerate(labels):
+            groups[label].append(position)
+        return {pair for group in groups.values() for pair in itertools.combinations(group, 2)}
+
+    true_pairs, found_pairs = pairs(truth), pairs(clusters)
+    hits = len(true_pairs & found_pairs)
+    print(
+        f"{'clusters':<24} {len(set(clusters)):8d} (stories: {len(set(truth))})  "
+        f"precision {hits / len(found_pairs) if found_pairs else 1:.3f}  "
+        f"recall {hits / len(true_pairs) if true_pairs else 1:.3f}"
+    )
+
+    # Without an index every article is compared with all earlier ones
+    sample = articles[: args.brute_force]
+    word_sets = [shingles(title, description) for _, title, description, _ in sample]
+    start = time.perf_counter()
+    for i, current in enumerate(word_sets):
+        for earlier in word_sets[:i]:
+            if len(current & earlier) / len(current | earlier) >= args.threshold:
+                break
+    brute = time.perf_counter() - start
+    report(f"exact, all pairs ({len(sample)})", brute, len(sample))
+    index = NearDuplicateIndex(threshold=args.threshold, window_days=args.window_days)
+    start = time.perf_counter()
+    index.assign(sample)
+    report(f"index ({len(sample)})", time.perf_counter() - start, len(sample))
+
+    for name, clusters in (("bulk_save_news", None), ("bulk_save_news + clusters", index)):
+        reset_schema()
+        pool = ConnectionPool(minconn=1, maxconn=1, **db_config())
+        if clusters is not None:
+            clusters.reset()
+        start = time.perf_counter()
+        counts = bulk_save_news(pool, rows, batch_size=args.batch_size, clusters=clusters)
+        report(name, time.perf_counter() - start, len(rows))
+        with pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT count(DISTINCT cluster_id) FROM news")
+            print(f"{'':<24} {counts}, {cursor.fetchone()[0]} clusters stored")
+        pool.close()
+
+
+PARTITION_QUERIES = {
+    "day, newest 50": """SELECT title, url, source, published_at FROM {table}
+        WHERE published_at >= %(start)s AND published_at < %(end)s
+        ORDER BY published_at DESC, id DESC LIMIT 50""",
+    "day, category": """SELECT title, url, source, published_at FROM {table}
+        WHERE category = 'sports' AND published_at >= %(start)s AND published_at < %(end)s
+        ORDER BY published_at""",
+    "week, count": """SELECT count(*) FROM {table}
+        WHERE published_at >= %(start)s AND published_at < %(end)s + interval '7 days'""",
+}
+
+
+def bench_partitions(args):
+    """
+    Compares date-filtered queries on the monthly partitions of ``news``
+    with an unpartitioned copy, then times archiving the months past the
+    retention period and restoring one.
+    """
+    from storage import NewsStorage
+
+    reset_schema()
+    seed(args.rows, args.days)
+    pool = ConnectionPool(minconn=1, maxconn=1, **db_config())
+    storage = NewsStorage(pool, archive_dir=tempfile.mkdtemp(prefix="news-archive-"))
+    start = time.perf_counter()
+    storage.create_partitions()
+    report("split into months", time.perf_counter() - start, args.rows)
+
+    with pool.connection() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("CREATE TABLE news_flat AS SELECT * FROM news")
+            cursor.execute("CREATE INDEX ON news_flat (published_at, id)")
+            cursor.execute("CREATE INDEX ON news_flat (category, published_at, id)")
+            cursor.execute("ANALYZE news")
+            cursor.execute("ANALYZE news_flat")
+        conn.autocommit = False
+
+    rnd = random.Random(1)
+    now = datetime.now()
+    for name, sql in PARTITION_QUERIES.items():
+        for table in ("news_flat", "news"):
+            latencies = []
+            with pool.connection() as conn, conn.cursor() as cursor:
+                for _ in range(args.queries):
+                    day = (now - timedelta(days=rnd.randrange(1, args.days))).replace(
+                        hour=0, minute=0, second=0, microsecond=0
+                    )
+                    started = time.perf_counter()
+                    cursor.execute(
+                        sql.format(table=table), {"start": day, "end": day + timedelta(days=1)}
+                    )
+                    cursor.fetchall()
+                    latencies.append(time.perf_counter() - started)
+            label = "partitioned" if table == "news" else "flat"
+            report_latencies(f"{name} ({label})", latencies)
+
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT count(*), pg_total_relation_size('news_flat') FROM news_flat")
+        total, table_bytes = cursor.fetchone()
+    start = time.perf_counter()
+    archived = storage.apply_retention(months=args.keep_months)
+    seconds = time.perf_counter() - start
+    archive_bytes = sum(
+        os.path.getsize(os.path.join(storage.archive_dir, name))
+        for name in os.listdir(storage.archive_dir)
+        if name.endswith(".csv.gz")
+    )
+    archived_rows = sum(m["rows"] for m in storage.archives().values())
+    report(f"archive {len(archived)} months", seconds, archived_rows)
+    print(
+        f"{'archive size':<24} {archive_bytes / 1e6:8.1f} MB for {archived_rows} of {total} rows"
+        f" (table with indexes: {table_bytes / 1e6:.1f} MB for all rows)"
+    )
+    if archived:
+        start = time.perf_counter()
+        restored = storage.restore(archived[-1])
+        report("restore 1 month", time.perf_counter() - start, sum(restored.values()))
+    shutil.rmtree(storage.archive_dir)
+    pool.close()
+
+
+def bench_retrieval(args):
+    """
+    Measures building and searching the chat embedding index, and how often
+    an article is found first when searching for its own title.
+    """
+    for n in args.articles:
+        articles = [normalize_article(a, c) for a, c in synthetic_articles(n, days=365)]
+        root = tempfile.mkdtemp(prefix="news-index-")
+        try:
+            index = EmbeddingIndex(root, HashingEmbedder(args.dim))
+            start = time.perf_counter()
+            for first in range(0, n, 1000):
+                batch = articles[first : first + 1000]
+                titles, descriptions, _, _, published, categories = map(list, zip(*batch))
+                published = [datetime.strptime(p, "%Y-%m-%dT%H:%M:%SZ") for p in published]
+                index.add(
+                    list(range(first + 1, first + len(batch) + 1)),
+                    titles,
+                    descriptions,
+                    published,
+                    categories,
+                )
+            report(f"index {n} articles", time.perf_counter() - start, n)
+            print(f"{'index size':<24} {index.stats()['bytes'] / 2**20:8.1f} MiB")
+
+            rnd = random.Random(7)
+            picks = rnd.sample(range(n), min(args.queries, n))
+            week_end = datetime.now()
+            week_start = week_end - timedelta(days=7)
+            for name, options in (
+                ("search all", {}),
+                ("search one week", {"start": week_start, "end": week_end}),
+                ("search one category", {"category": "sports"}),
+            ):
+                latencies = []
+                for i in picks:
+                    start = time.perf_counter()
+                    index.search(articles[i][0], args.k, **options)
+                    latencies.append(time.perf_counter() - start)
+                report_latencies(name, latencies)
+
+            queries = [articles[i][0] for i in picks]
+            start = time.perf_counter()
+            results = index.search_many(queries, args.k)
+            seconds = time.perf_counter() - start
+            print(f"{'batched search':<24} {len(queries) / seconds:9.0f} queries/s")
+            found = sum(1 for i, hits in zip(picks, results) if hits and hits[0][0] == i + 1)
+            print(f"{'own title ranked first':<24} {found / len(picks):9.1%}")
+        finally:
+            shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bulk = commands.add_parser("bulk-insert", help=bench_bulk_insert.__doc__)
+    bulk.add_argument("--rows", type=int, default=5000)
+    bulk.add_argument("--batch-size", type=int, default=500)
+    bulk.set_defaults(func=bench_bulk_insert)
+
+    search = commands.add_parser("search", help=bench_search.__doc__)
+    search.add_argument("--rows", type=int, default=1_000_000)
+    search.add_argument("--days", type=int, default=365)
+    search.add_argument("--queries", type=int, default=200)
+    search.add_argument(
+        "--no-seed", action="store_true", help="Reuse the corpus of the last run."
+    )
+    search.set_defaults(func=bench_search)
+
+    reports = commands.add_parser("reports", help=bench_reports.__doc__)
+    reports.add_argument(
+        "--backends", default="native,pool,wkhtmltopdf", help="Comma-separated backends."
+    )
+    reports.add_argument(
+        "--articles", type=int, nargs="+", default=[100, 1_000, 10_000]
+    )
+    reports.add_argument("--repeat", type=int, default=8, help="Reports per size.")
+    reports.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    reports.set_defaults(func=bench_reports)
+
+    templates = commands.add_parser("template-render", help=bench_template_render.__doc__)
+    templates.add_argument("--articles", type=int, default=1_000)
+    templates.add_argument("--repeat", type=int, default=50)
+    templates.set_defaults(func=bench_template_render)
+
+    chat = commands.add_parser("chat-stream", help=bench_chat_stream.__doc__)
+    chat.add_argument("--rows", type=int, default=2_000)
+    chat.add_argument("--repeat", type=int, default=10)
+    chat.add_argument("--first-token-delay", type=float, default=0.3)
+    chat.add_argument("--token-delay", type=float, default=0.02)
+    chat.set_defaults(func=bench_chat_stream)
+
+    chat_cache = commands.add_parser("chat-cache", help=bench_chat_cache.__doc__)
+    chat_cache.add_argument("--rows", type=int, default=2_000)
+    chat_cache.add_argument("--concurrency", type=int, default=16)
+    chat_cache.add_argument("--requests", type=int, default=200)
+    chat_cache.add_argument("--first-token-delay", type=float, default=0.3)
+    chat_cache.add_argument("--token-delay", type=float, default=0.02)
+    chat_cache.set_defaults(func=bench_chat_cache)
+
+    chat_session = commands.add_parser("chat-session", help=bench_chat_session.__doc__)
+    chat_session.add_argument("--rows", type=int, default=2_000)
+    chat_session.add_argument("--turns", type=int, default=40)
+    chat_session.add_argument("--keep-turns", type=int, default=6)
+    chat_session.add_argument(
+        "--backends", nargs="+", default=["memory", "postgres"], choices=["memory", "postgres"]
+    )
+    chat_session.set_defaults(func=bench_chat_session)
+
+    catchup = commands.add_parser("ingest-catchup", help=bench_ingest_catchup.__doc__)
+    catchup.add_argument("--articles", type=int, default=3_000)
+    catchup.add_argument("--days", type=int, default=7)
+    catchup.add_argument("--new", type=int, default=150)
+    catchup.add_argument("--max-results", type=int, default=1_000)
+    catchup.add_argument("--max-pages", type=int, default=10)
+    catchup.add_argument(
+        "--max-runs", type=int, default=20, help="Runs to close the gaps of the catch-up."
+    )
+    catchup.add_argument("--save-fixture", help="Also write the fixture to this JSON file.")
+    catchup.set_defaults(func=bench_ingest_catchup)
+
+    faults = commands.add_parser("ingest-faults", help=bench_ingest_faults.__doc__)
+    faults.add_argument("--articles", type=int, default=3_000)
+    faults.add_argument("--days", type=int, default=7)
+    faults.add_argument("--page-size", type=int, default=20)
+    faults.add_argument("--latency", type=float, default=0.02)
+    faults.add_argument("--error-rate", type=float, default=0.2)
+    faults.add_argument("--rate-limit", type=float, default=20)
+    faults.add_argument("--concurrency", type=int, default=4)
+    faults.add_argument("--rate", type=float, default=25)
+    faults.add_argument("--burst", type=int, default=10)
+    faults.add_argument("--max-attempts", type=int, default=8)
+    faults.add_argument("--backoff", type=float, default=0.05)
+    faults.set_defaults(func=bench_ingest_faults)
+
+    serve = commands.add_parser("serve-load", help=bench_serve_load.__doc__)
+    serve.add_argument(
+        "--servers", nargs="+", default=list(LOAD_SERVERS), choices=list(LOAD_SERVERS)
+    )
+    serve.add_argument("--rows", type=int, default=2_000)
+    serve.add_argument("--workers", type=int, default=2)
+    serve.add_argument("--threads", type=int, default=8)
+    serve.add_argument("--concurrency", type=int, default=64)
+    serve.add_argument("--duration", type=float, default=10)
+    serve.add_argument("--model-delay", type=float, default=0.2)
+    serve.add_argument(
+        "--response-cache", action="store_true", help="Keep the response cache on."
+    )
+    serve.set_defaults(func=bench_serve_load)
+
+    articles = commands.add_parser("articles", help=bench_articles.__doc__)
+    articles.add_argument("--rows", type=int, default=20_000)
+    articles.add_argument("--limit", type=int, default=50)
+    articles.set_defaults(func=bench_articles)
+
+    json_encode = commands.add_parser("json-encode", help=bench_json_encode.__doc__)
+    json_encode.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    json_encode.add_argument("--batch-size", type=int, default=1_000)
+    json_encode.add_argument("--repeat", type=int, default=5)
+    json_encode.set_defaults(func=bench_json_encode)
+
+    dedup = commands.add_parser("dedup", help=bench_dedup.__doc__)
+    dedup.add_argument("--stories", type=int, default=20_000)
+    dedup.add_argument("--syndicated", type=float, default=0.3)
+    dedup.add_argument("--max-copies", type=int, default=4)
+    dedup.add_argument("--threshold", type=float, default=0.7)
+    dedup.add_argument("--window-days", type=float, default=3)
+    dedup.add_argument("--batch-size", type=int, default=500)
+    dedup.add_argument("--brute-force", type=int, default=3_000)
+    dedup.set_defaults(func=bench_dedup)
+
+    partitions = commands.add_parser("partitions", help=bench_partitions.__doc__)
+    partitions.add_argument("--rows", type=int, default=200_000)
+    partitions.add_argument("--days", type=int, default=365)
+    partitions.add_argument("--queries", type=int, default=200)
+    partitions.add_argument("--keep-months", type=int, default=6)
+    partitions.set_defaults(func=bench_partitions)
+
+    retrieval = commands.add_parser("retrieval", help=bench_retrieval.__doc__)
+    retrieval.add_argument("--articles", type=int, nargs="+", default=[10_000, 100_000])
+    retrieval.add_argument("--dim", type=int, default=256)
+    retrieval.add_argument("--queries", type=int, default=200)
+    retrieval.add_argument("-k", type=int, default=100)
+    retrieval.set_defaults(func=bench_retrieval)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
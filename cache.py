@@ -0,0 +1,391 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, request
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with a TTL and entry/byte bounds.
+
+    Args:
+        max_entries (int): Maximum number of entries.
+        max_bytes (int): Maximum total size of the entries.
+        ttl (float): Seconds an entry stays valid.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size=1):
+        """
+        Stores a value, evicting the least recently used entries if needed.
+
+        Args:
+            key: Hashable cache key.
+            value: The value to store.
+            size (int): Size of the value counted against ``max_bytes``.
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def delete(self, key):
+        """Drops an entry if it is cached."""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        """Drops all entries."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+            }
+
+
+class LocalSharedBackend:
+    """
+    In-process stand-in for a shared key-value store such as Redis.
+
+    Implements the small subset of commands ``ResponseCache`` needs, so the
+    app and the tests can run without a cache server.
+    """
+
+    def __init__(self):
+        self._data = {}  # key -> (bytes, expires_at or None)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] < time.monotonic():
+            del self._data[key]
+            return None
+        return entry[0]
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._get(key) is not None:
+                return False
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._get(key) or 0) + 1
+            self._data[key] = (str(value).encode(), None)
+            return value
+
+
+class RedisBackend:
+    """
+    Shared backend backed by a Redis server (needs the ``redis`` package).
+
+    Args:
+        url (str): Redis URL, e.g. ``redis://localhost:6379/0``.
+    """
+
+    def __init__(self, url):
+        import redis  # optional dependency, only needed for a shared cache
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def mget(self, keys):
+        return self._client.mget(keys)
+
+    def set(self, key, value, ex=None, nx=False):
+        return bool(self._client.set(key, value, ex=ex, nx=nx))
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+
+class PostgresBackend:
+    """
+    Shared backend keeping its keys in the ``cache_versions`` table.
+
+    Lets all workers (and a separate ingest process) agree on the data
+    versions without a cache server. Keys never expire, so it is meant for
+    the versions, not for response bodies.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connections from.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def get(self, key):
+        return self.mget([key])[0]
+
+    def mget(self, keys):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT key, value FROM cache_versions WHERE key = ANY(%s)", (list(keys),)
+            )
+            values = dict(cursor.fetchall())
+        return [values[key].encode() if key in values else None for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        on_conflict = "NOTHING" if nx else "UPDATE SET value = EXCLUDED.value"
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                f"""INSERT INTO cache_versions (key, value) VALUES (%s, %s)
+                    ON CONFLICT (key) DO {on_conflict}""",
+                (key, value.decode()),
+            )
+            return cursor.rowcount == 1
+
+    def incr(self, key):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """INSERT INTO cache_versions (key, value) VALUES (%s, '1')
+                   ON CONFLICT (key) DO UPDATE
+                   SET value = (cache_versions.value::bigint + 1)::text
+                   RETURNING value""",
+                (key,),
+            )
+            return int(cursor.fetchone()[0])
+
+
+class ResponseCache:
+    """
+    Caches rendered responses of read-only endpoints and validates them with ETags.
+
+    Every cached response depends on a set of *scopes* (for example
+    ``date:2025-04-12`` or ``category:sports``). Each scope has a data
+    version; ``bump`` increments the versions of the scopes touched by an
+    ingest, which changes the ETag and the cache key of exactly the
+    responses built from that data.
+
+    The versions must be shared by every process serving or changing the
+    data: a worker whose versions are not bumped keeps answering 304 with
+    stale data.
+
+    Args:
+        local (LRUCache): In-process cache of response bodies.
+        shared: Optional shared backend (``LocalSharedBackend`` or
+            ``RedisBackend``) holding the data versions and a second level
+            of response bodies, so all workers agree on what is fresh.
+        versions: Backend holding the data versions, if not ``shared``
+            (e.g. ``PostgresBackend``). Without either they are kept in
+            this process only.
+    """
+
+    def __init__(self, local, shared=None, versions=None):
+        self.local = local
+        self.shared = shared
+        self._versions = versions or shared or LocalSharedBackend()
+        self.not_modified = 0
+        self.shared_hits = 0
+
+    def bump(self, scopes):
+        """
+        Marks the data behind the given scopes as changed.
+
+        Args:
+            scopes (iterable): Scope names, e.g. ``["date:2025-04-12"]``.
+        """
+        now = str(time.time()).encode()
+        for scope in set(scopes):
+            self._versions.incr(f"version:{scope}")
+            self._versions.set(f"mtime:{scope}", now)
+
+    def validators(self, key, scopes):
+        """
+        Computes the ETag and Last-Modified time of a response.
+
+        Args:
+            key (str): The request path with its query string.
+            scopes (list): Scopes the response depends on.
+
+        Returns:
+            tuple: (etag, last_modified) where ``last_modified`` is a datetime.
+        """
+        names = ["epoch"]
+        for scope in scopes:
+            names += [f"version:{scope}", f"mtime:{scope}"]
+        values = self._versions.mget(names)
+        epoch = values[0]
+        if epoch is None:
+            # Versions restart from zero with a fresh backend, so the epoch
+            # keeps ETags handed out before a restart from matching again
+            self._versions.set("epoch", str(time.time()).encode(), nx=True)
+            epoch = values[0] = self._versions.get("epoch")
+        digest = hashlib.sha1(key.encode())
+        for value in values:
+            digest.update(b"|" + (value or b""))
+        modified = max(float(v) for v in [epoch, *values[2::2]] if v)
+        return digest.hexdigest(), datetime.fromtimestamp(int(modified), timezone.utc)
+
+    def cached(self, scopes):
+        """
+        Decorator caching a view's 200 responses and answering 304 when possible.
+
+        Args:
+            scopes (callable): Returns the list of scopes for the current
+                request (read from ``flask.request``).
+        """
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                try:
+                    request_scopes = scopes()
+                except ValueError:
+                    return view(*args, **kwargs)  # the view reports bad input
+                etag, last_modified, response = self._prepare(request_scopes)
+                if response is None:
+                    response = view(*args, **kwargs)
+                    if not isinstance(response, Response) or response.status_code != 200:
+                        return response
+                    self._store(etag, response)
+                return self._finish(response, etag, last_modified)
+
+            return wrapper
+
+        return decorator
+
+    def cached_async(self, scopes):
+        """
+        Like ``cached``, for coroutine views served by the async server (asgi.py).
+
+        Args:
+            scopes (callable): Returns the list of scopes for the current
+                request (read from ``flask.request``).
+        """
+
+        def decorator(view):
+            @wraps(view)
+            async def wrapper(*args, **kwargs):
+                try:
+                    request_scopes = scopes()
+                except ValueError:
+                    return await view(*args, **kwargs)
+                etag, last_modified, response = self._prepare(request_scopes)
+                if response is None:
+                    response = await view(*args, **kwargs)
+                    if not isinstance(response, Response) or response.status_code != 200:
+                        return response
+                    self._store(etag, response)
+                return self._finish(response, etag, last_modified)
+
+            return wrapper
+
+        return decorator
+
+    def _prepare(self, request_scopes):
+        """
+        Returns (etag, last_modified, response) for the current request,
+        where ``response`` is a 304, a cached body or None if the view must run.
+        """
+        etag, last_modified = self.validators(request.full_path, request_scopes)
+        if request.if_none_match:
+            unchanged = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            unchanged = since is not None and last_modified <= since
+        if unchanged:
+            self.not_modified += 1
+            return etag, last_modified, Response(status=304)
+        return etag, last_modified, self._lookup(etag)
+
+    @staticmethod
+    def _finish(response, etag, last_modified):
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+
+    def _lookup(self, etag):
+        entry = self.local.get(etag)
+        if entry is None and self.shared is not None:
+            stored = self.shared.get(f"response:{etag}")
+            if stored is not None:
+                self.shared_hits += 1
+                mimetype, body = stored.split(b"\n", 1)
+                entry = (body, mimetype.decode())
+                self.local.set(etag, entry, size=len(body))
+        if entry is None:
+            return None
+        body, mimetype = entry
+        return Response(body, mimetype=mimetype)
+
+    def _store(self, etag, response):
+        if response.is_streamed:
+            return  # only validated: reading it would buffer the whole stream
+        body = response.get_data()
+        self.local.set(etag, (body, response.mimetype), size=len(body))
+        if self.shared is not None:
+            self.shared.set(
+                f"response:{etag}",
+                response.mimetype.encode() + b"\n" + body,
+                ex=int(self.local.ttl),
+            )
+
+    def stats(self):
+        """Returns hit/miss counters of both cache levels and the 304 count."""
+        return {
+            **self.local.stats(),
+            "shared_hits": self.shared_hits,
+            "not_modified": self.not_modified,
+        }
@@ -0,0 +1,96 @@
+import base64
+import hashlib
+import io
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from cache import LRUCache
+
+
+def counts_fingerprint(counts):
+    """
+    Returns a short hash identifying a set of per-category counts.
+
+    Args:
+        counts (dict): category -> number of news.
+
+    Returns:
+        str: Hex digest that changes whenever any count changes.
+    """
+    payload = ";".join(f"{category}={count}" for category, count in sorted(counts.items()))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def render_chart(date, counts):
+    """
+    Draws the bar chart of news counts per category.
+
+    Uses the object-oriented ``Figure`` API instead of ``pyplot``, so no global
+    state is shared and charts can be rendered from several threads at once.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format, used in the title.
+        counts (dict): category -> number of news.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.bar(list(counts), list(counts.values()), color="#4f46e5")
+    ax.set_xlabel("Categories")
+    ax.set_ylabel("Number of news items")
+    ax.set_title(f"News for {date}")
+    ax.tick_params(axis="x", labelrotation=45)
+
+    stream = io.BytesIO()
+    fig.savefig(stream, format="png")
+    return stream.getvalue()
+
+
+class ChartCache:
+    """
+    Cache of rendered charts keyed by date and counts fingerprint.
+
+    A chart is rendered once per distinct set of counts; as soon as ingest
+    changes the counts of a date, its fingerprint changes and the next
+    request renders a fresh image.
+
+    Args:
+        max_entries (int): Maximum number of cached charts.
+    """
+
+    def __init__(self, max_entries=256):
+        self._cache = LRUCache(max_entries=max_entries, ttl=24 * 60 * 60)
+
+    def get(self, date, counts):
+        """
+        Returns the chart for a date, rendering it on a cache miss.
+
+        Args:
+            date (str): Date in YYYY-MM-DD format.
+            counts (dict): category -> number of news for that date.
+
+        Returns:
+            dict: ``png`` (bytes), ``base64`` (str), ``fingerprint`` (str) and
+            the ``counts`` it was drawn from.
+        """
+        fingerprint = counts_fingerprint(counts)
+        key = (date, fingerprint)
+        chart = self._cache.get(key)
+        if chart is None:
+            png = render_chart(date, counts)
+            chart = {
+                "png": png,
+                "base64": base64.b64encode(png).decode("utf-8"),
+                "fingerprint": fingerprint,
+                "counts": dict(counts),
+            }
+            self._cache.set(key, chart, size=len(png) + len(chart["base64"]))
+        return chart
+
+    def stats(self):
+        """Returns hit/miss counters of the chart cache."""
+        return self._cache.stats()
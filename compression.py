@@ -0,0 +1,111 @@
+import gzip
+import threading
+
+from flask import request
+
+from cache import LRUCache
+
+# Types worth compressing; images and PDFs are compressed already
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/plain", "text/csv"}
+
+
+class ResponseCompressor:
+    """
+    Compresses responses with brotli or gzip for clients that accept it.
+
+    Registered as an ``after_request`` hook. Streamed responses (chat
+    answers over server-sent events) and files sent directly are left
+    alone. A compressed response gets a weak ETag, so conditional requests
+    still match the ETag of the uncompressed body, and compressed bodies
+    of responses with an ETag are cached, so a response served from the
+    response cache is not compressed again on every request.
+
+    Args:
+        encodings (list): Accepted encodings in order of preference, from
+            ``br`` and ``gzip``; ``br`` needs the ``brotli`` package and is
+            skipped without it.
+        min_size (int): Smaller bodies are sent as they are.
+        gzip_level (int): gzip compression level (1-9).
+        brotli_quality (int): brotli quality (0-11).
+        cache (LRUCache): Cache of compressed bodies (optional).
+    """
+
+    def __init__(
+        self, encodings=("br", "gzip"), min_size=1024, gzip_level=6, brotli_quality=5, cache=None
+    ):
+        self._brotli = None
+        if "br" in encodings:
+            try:
+                import brotli  # optional dependency, gzip is used without it
+
+                self._brotli = brotli
+            except ImportError:
+                print("⚠️ brotli is not installed, responses are compressed with gzip only")
+        self.encodings = [e for e in encodings if e == "gzip" or (e == "br" and self._brotli)]
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache or LRUCache(max_entries=1000, max_bytes=32 * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def compress(self, response):
+        """
+        Compresses a response if the client accepts one of the encodings.
+
+        Args:
+            response (flask.Response): The response of the view.
+
+        Returns:
+            flask.Response: The same response, compressed if worthwhile.
+        """
+        if (
+            not self.encodings
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.encodings)
+        body = response.get_data()
+        if encoding is None or len(body) < self.min_size:
+            return response
+
+        etag, _ = response.get_etag()
+        compressed = self.cache.get((etag, encoding)) if etag else None
+        if compressed is None:
+            compressed = self._compress(body, encoding)
+            if etag:
+                self.cache.set((etag, encoding), compressed, size=len(compressed))
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _compress(self, body, encoding):
+        if encoding == "br":
+            return self._brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    def stats(self):
+        """Returns how many responses were compressed and the bytes saved."""
+        with self._lock:
+            stats = {
+                "encodings": self.encodings,
+                "compressed": self.compressed,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            }
+        return {**stats, "cache": self.cache.stats()}
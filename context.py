@@ -0,0 +1,327 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from cache import LRUCache
+from db import first_of_cluster
+
+CONTEXT_SQL = """
+    SELECT title, description, category
+    FROM (
+        SELECT title, description, category, published_at,
+               ROW_NUMBER() OVER (
+                   PARTITION BY category ORDER BY published_at DESC
+               ) AS position
+        FROM news
+        WHERE true {filters} AND {first_of_cluster}
+    ) ranked
+    WHERE position <= %(per_category)s
+    ORDER BY category, published_at DESC
+"""
+
+ARTICLES_BY_ID_SQL = """
+    SELECT id, title, description, category, published_at, cluster_id
+    FROM news
+    WHERE id = ANY(%s)
+"""
+
+STOPWORDS = set(
+    """
+    a about after all also an and any are as at be been but by can could did do
+    does for from had has have how i in into is it its me more most my new news
+    no not of on or our over so some than that the their them then there these
+    they this to today up us was we were what when where which who why will with
+    would you your
+    """.split()
+)
+# Endings stripped so "markets"/"market" or "voting"/"voted" match
+SUFFIXES = ("ing", "ed", "es", "s")
+# " - CNN", " | Reuters": publisher suffixes NewsAPI appends to titles
+SOURCE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+
+
+def stem(word):
+    """Strips a common English ending from a word."""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def words(text):
+    """Lower-cased, stemmed words of a text without stopwords and short words."""
+    return [
+        stem(w)
+        for w in re.findall(r"\w+", (text or "").lower())
+        if len(w) > 2 and w not in STOPWORDS
+    ]
+
+
+def estimate_tokens(text):
+    """Rough number of model tokens in a text (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def deduplicate(articles, threshold=0.8):
+    """
+    Drops articles whose title is nearly the same as an earlier one.
+
+    Titles are compared as sets of words (after removing the publisher
+    suffix) with the Jaccard similarity; an inverted index limits the
+    comparisons to titles sharing a word.
+
+    Args:
+        articles (list): Dicts with a ``title``; of near-duplicates the
+            first one is kept.
+        threshold (float): Similarity from which titles count as duplicates.
+
+    Returns:
+        list: The articles that were kept, in the same order.
+    """
+    kept = []
+    word_sets = []
+    index = defaultdict(list)  # word -> positions in kept
+    for article in articles:
+        title = SOURCE_SUFFIX.sub("", article["title"] or "")
+        title_words = set(words(title)) or {title.lower()}
+        overlaps = Counter(i for w in title_words for i in index[w])
+        if any(
+            overlap / (len(title_words) + len(word_sets[i]) - overlap) >= threshold
+            for i, overlap in overlaps.items()
+        ):
+            continue
+        for w in title_words:
+            index[w].append(len(kept))
+        kept.append(article)
+        word_sets.append(title_words)
+    return kept
+
+
+def rank(articles, message):
+    """
+    Orders articles by relevance to a chat message.
+
+    Uses BM25 over titles (counted twice) and descriptions. Ties, including
+    messages that match nothing, keep the newest articles of every category
+    first, one category after another.
+
+    Args:
+        articles (list): Dicts with ``title``, ``description``, ``category``
+            and ``position`` (recency rank within the category).
+        message (str): The user's message.
+
+    Returns:
+        list: The articles, most relevant first.
+    """
+    query = set(words(message))
+    documents = [
+        Counter(words(a["title"]) * 2 + words(a["description"])) for a in articles
+    ]
+    scores = [0.0] * len(articles)
+    if query and documents:
+        lengths = [sum(d.values()) for d in documents]
+        average_length = sum(lengths) / len(lengths) or 1
+        for term in query:
+            containing = sum(1 for d in documents if term in d)
+            if not containing:
+                continue
+            idf = math.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+            for i, document in enumerate(documents):
+                tf = document.get(term)
+                if tf:
+                    length = lengths[i] / average_length
+                    scores[i] += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length))
+    order = sorted(
+        range(len(articles)), key=lambda i: (-scores[i], articles[i]["position"])
+    )
+    return [articles[i] for i in order]
+
+
+class ContextBuilder:
+    """
+    Builds the news context of a chat prompt for a date and category.
+
+    The articles of a (date, category) are read with one windowed query,
+    de-duplicated and cached between chat turns. For every message they are
+    ranked by relevance and added until the token budget is used up.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow connections from.
+        per_category (int): Newest articles read per category.
+        token_budget (int): Maximum estimated tokens of the news context.
+        similarity (float): Title similarity from which stories are merged.
+        cache_entries (int): Number of (date, category) article lists kept.
+        cache_ttl (float): Seconds a cached article list stays valid.
+    """
+
+    def __init__(
+        self,
+        pool,
+        per_category=100,
+        token_budget=6000,
+        similarity=0.8,
+        cache_entries=256,
+        cache_ttl=600,
+    ):
+        self.pool = pool
+        self.per_category = per_category
+        self.token_budget = token_budget
+        self.similarity = similarity
+        self._cache = LRUCache(max_entries=cache_entries, ttl=cache_ttl)
+
+    def articles(self, start, end, category=None, version=None):
+        """
+        Returns the de-duplicated articles of a time range, cached.
+
+        Args:
+            start (datetime): Start of the range (inclusive).
+            end (datetime): End of the range (exclusive).
+            category (str): Only this category (optional, all by default).
+            version: Changes whenever the news of the range change, so
+                cached lists are not reused after an ingest (optional).
+
+        Returns:
+            list: Dicts with ``title``, ``description``, ``category`` and
+            ``position``, newest first within each category.
+        """
+        key = (start, end, category, version)
+        articles = self._cache.get(key)
+        if articles is not None:
+            return articles
+
+        # One article per near-duplicate cluster, before the title check
+        filters = " AND published_at >= %(start)s AND published_at < %(end)s"
+        if category:
+            filters += " AND category = %(category)s"
+        query = CONTEXT_SQL.format(filters=filters, first_of_cluster=first_of_cluster(filters))
+        params = {
+            "start": start,
+            "end": end,
+            "category": category,
+            "per_category": self.per_category,
+        }
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+        positions = Counter()
+        articles = []
+        for title, description, row_category in rows:
+            articles.append(
+                {
+                    "title": title,
+                    "description": description,
+                    "category": row_category,
+                    "position": positions[row_category],
+                }
+            )
+            positions[row_category] += 1
+        articles = deduplicate(articles, self.similarity)
+        size = sum(len(a["title"]) + len(a["description"] or "") for a in articles)
+        self._cache.set(key, articles, size=size)
+        return articles
+
+    def build(self, message, start, end, category=None, version=None):
+        """
+        Returns the news context for a chat message.
+
+        Args:
+            message (str): The user's message, used to rank the articles.
+            start (datetime): Start of the range (inclusive).
+            end (datetime): End of the range (exclusive).
+            category (str): Only this category (optional, all by default).
+            version: Data version of the range (see ``articles``).
+
+        Returns:
+            dict: ``text`` (articles grouped by category, numbered), the
+            number of ``articles`` used and ``available``, and the estimated
+            ``tokens`` of the text. ``text`` is empty if there is no news.
+        """
+        available = self.articles(start, end, category, version)
+        return self._fit(rank(available, message), len(available))
+
+    def retrieve(self, message, index, start=None, end=None, category=None, top_k=100):
+        """
+        Returns the news context for a chat message from any dates.
+
+        The articles most similar to the message are looked up in the
+        embedding index instead of reading a whole day, so questions can
+        span weeks or all stored news.
+
+        Args:
+            message (str): The user's message.
+            index (embeddings.EmbeddingIndex): Index of the stored articles.
+            start (datetime): Start of the range (inclusive, optional).
+            end (datetime): End of the range (exclusive, optional).
+            category (str): Only this category (optional, all by default).
+            top_k (int): Most similar articles considered.
+
+        Returns:
+            dict: Same as ``build``; every article is listed with its date.
+        """
+        hits = index.search(message, top_k, start, end, category)
+        if not hits:
+            return self._fit([], 0, with_dates=True)
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(ARTICLES_BY_ID_SQL, ([article_id for article_id, _ in hits],))
+            rows = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        # Most similar first; deleted articles may still be in the index
+        articles = []
+        seen_clusters = set()
+        for article_id, _ in hits:
+            if article_id in rows:
+                title, description, row_category, published_at, cluster_id = rows[article_id]
+                if cluster_id in seen_clusters:
+                    continue
+                seen_clusters.add(cluster_id)
+                articles.append(
+                    {
+                        "title": title,
+                        "description": description,
+                        "category": row_category,
+                        "published_at": published_at,
+                        "position": len(articles),
+                    }
+                )
+        articles = deduplicate(articles, self.similarity)
+        return self._fit(articles, len(articles), with_dates=True)
+
+    def _fit(self, ranked, available, with_dates=False):
+        """Formats the best ranked articles that fit into the token budget."""
+        chosen = []
+        tokens = 0
+        for article in ranked:
+            entry = f"Title: {article['title']}\nDescription: {article['description']}"
+            cost = estimate_tokens(entry)
+            if tokens + cost > self.token_budget:
+                continue  # a shorter article may still fit
+            chosen.append(article)
+            tokens += cost
+
+        grouped = defaultdict(list)
+        for article in chosen:
+            grouped[article["category"]].append(article)
+        blocks = []
+        for cat in sorted(grouped):
+            blocks.append(f"\n### 🗂 Category: {cat.capitalize()}")
+            # By position: newest first within a day, most similar first
+            # for retrieved articles
+            for i, article in enumerate(
+                sorted(grouped[cat], key=lambda a: a["position"]), start=1
+            ):
+                date = f" ({article['published_at']:%Y-%m-%d})" if with_dates else ""
+                blocks.append(
+                    f"{i}.\n    Title: {article['title']}{date}\n"
+                    f"    Description: {article['description']}\n"
+                )
+        return {
+            "text": "\n".join(blocks),
+            "articles": len(chosen),
+            "available": available,
+            "tokens": tokens,
+        }
+
+    def stats(self):
+        """Returns hit/miss counters of the article cache."""
+        return self._cache.stats()
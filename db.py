@@ -0,0 +1,318 @@
+import base64
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2 import extensions
+
+
+def day_range(date):
+    """
+    Returns the half-open timestamp range ``[start, end)`` covering one day.
+
+    Filtering with ``published_at >= start AND published_at < end`` lets
+    PostgreSQL use an index on ``published_at``, unlike ``DATE(published_at)``.
+
+    Args:
+        date (str): Date in YYYY-MM-DD format.
+
+    Returns:
+        tuple: (start, end) datetimes.
+
+    Raises:
+        ValueError: If the date is missing or not in YYYY-MM-DD format.
+    """
+    if not date:
+        raise ValueError("Date is required")
+    start = datetime.strptime(date, "%Y-%m-%d")
+    return start, start + timedelta(days=1)
+
+
+def first_of_cluster(filters=""):
+    """
+    Returns a condition keeping one article of every near-duplicate cluster.
+
+    Of the articles of a cluster that match ``filters``, only the one with
+    the lowest id passes; the lookup uses the ``(cluster_id, id)`` index.
+
+    Args:
+        filters (str): The query's own conditions on ``news``, as
+            ``" AND ..."`` with unqualified column names; inside the
+            condition they apply to the other articles of the cluster.
+
+    Returns:
+        str: SQL condition for a query on ``news``.
+    """
+    return (
+        "NOT EXISTS (SELECT 1 FROM news AS earlier WHERE "
+        f"earlier.cluster_id = news.cluster_id AND earlier.id < news.id{filters})"
+    )
+
+
+def encode_cursor(values):
+    """
+    Encodes the sort key of the last row of a page into an opaque cursor.
+
+    Args:
+        values (list): JSON-serializable sort key values.
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor string.
+
+    Returns:
+        list: The sort key values.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def asyncpg_params(dsn):
+    """
+    Translates ``psycopg2.connect`` parameters for ``asyncpg.create_pool``.
+
+    Args:
+        dsn (dict): Parameters such as ``ConnectionPool.dsn``; ``options``
+            like ``-c search_path=bench`` become server settings.
+
+    Returns:
+        dict: Keyword arguments for asyncpg.
+    """
+    names = {
+        "dbname": "database",
+        "user": "user",
+        "password": "password",
+        "host": "host",
+        "port": "port",
+    }
+    params = {names[k]: v for k, v in dsn.items() if k in names and v is not None}
+    settings = {}
+    for option in re.findall(r"-c\s*(\S+)", dsn.get("options") or ""):
+        name, _, value = option.partition("=")
+        settings[name] = value
+    if settings:
+        params["server_settings"] = settings
+    return params
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections shared by the WSGI workers.
+
+    Connections are opened lazily up to ``maxconn``. When all of them are
+    busy, callers wait until one is returned (or ``timeout`` expires).
+    Connections that sat idle for longer than ``health_check_after`` seconds
+    are checked with ``SELECT 1`` before being handed out, and broken ones
+    are replaced transparently.
+
+    Args:
+        minconn (int): Number of connections opened by ``warm_up``.
+        maxconn (int): Maximum number of open connections.
+        timeout (float): Seconds to wait for a free connection.
+        health_check_after (float): Idle seconds after which a connection is
+            checked before reuse.
+        **dsn: Connection parameters passed to ``psycopg2.connect``.
+    """
+
+    def __init__(self, minconn=1, maxconn=10, timeout=30, health_check_after=60, **dsn):
+        if minconn > maxconn:
+            raise ValueError("minconn must not exceed maxconn")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.dsn = dsn
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, time it was returned)
+        self._size = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._replaced = 0
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self):
+        """
+        Takes a connection out of the pool, waiting if all of them are busy.
+
+        Returns:
+            psycopg2.extensions.connection: An open connection.
+
+        Raises:
+            PoolTimeout: If no connection is free within ``timeout`` seconds.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                wait_start = None
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"No free database connection after {self.timeout}s"
+                        )
+                    if wait_start is None:
+                        wait_start = time.perf_counter()
+                        self._waits += 1
+                    self._cond.wait(remaining)
+                if wait_start is not None:
+                    self._wait_time += time.perf_counter() - wait_start
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = psycopg2.connect(**self.dsn)
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, time.monotonic() - returned_at):
+                self._replaced += 1
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._in_use += 1
+                self._checkouts += 1
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Returns a connection to the pool.
+
+        Args:
+            conn (psycopg2.extensions.connection): Connection from ``getconn``.
+            discard (bool): Close the connection instead of reusing it.
+        """
+        with self._cond:
+            self._in_use -= 1
+
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that borrows a connection and always gives it back.
+
+        The transaction is committed when the block exits normally and rolled
+        back when it raises.
+
+        Yields:
+            psycopg2.extensions.connection: An open connection.
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    def warm_up(self):
+        """Opens ``minconn`` connections ahead of the first requests."""
+        conns = [self.getconn() for _ in range(self.minconn)]
+        for conn in conns:
+            self.putconn(conn)
+
+    def close(self):
+        """Closes all idle connections."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """
+        Returns pool metrics.
+
+        Returns:
+            dict: Open, in-use and idle connections, number of checkouts, how
+            many of them had to wait and for how long in total, timeouts and
+            connections replaced after a failed health check.
+        """
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self.maxconn,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time": round(self._wait_time, 3),
+                "timeouts": self._timeouts,
+                "replaced": self._replaced,
+            }
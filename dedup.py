@@ -0,0 +1,415 @@
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from context import SOURCE_SUFFIX, words
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "cmpid",
+    "dclid",
+    "fbclid",
+    "gclid",
+    "guccounter",
+    "guce_referrer",
+    "guce_referrer_sig",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "msclkid",
+    "ocid",
+    "ref",
+    "ref_src",
+    "smid",
+    "smtyp",
+    "taid",
+}
+# Largest prime below 2**32: (a * x + b) of 32-bit values fits in uint64
+PRIME = 4_294_967_291
+
+SYNC_SQL = """
+    SELECT id, title, description, published_at, cluster_id
+    FROM news
+    WHERE id > %s AND published_at >= %s
+    ORDER BY id
+"""
+
+
+def canonical_url(url):
+    """
+    Returns the canonical form of an article URL.
+
+    The same article is linked with and without ``www.``, over http and
+    https, with a trailing slash or a fragment, and with campaign
+    parameters (``utm_*``, ``fbclid``...). Those differences are removed and
+    the remaining query parameters are sorted, so all the variants share
+    one key. The key is only compared (``news.url_key``); links keep the
+    URL as published, since not every site answers over https or without
+    ``www.``.
+
+    Args:
+        url (str): The URL as published.
+
+    Returns:
+        str: The canonical URL; URLs that are not http(s) are only stripped.
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return url
+    host = parts.hostname.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        return url
+    if port not in (None, 80, 443):
+        host = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMS
+        )
+    )
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def fill_url_keys(cursor, table="news", chunk_size=5000):
+    """
+    Sets the missing ``url_key`` of a table's rows to their canonical URL.
+
+    Rows are read from a server-side cursor of the same transaction.
+
+    Args:
+        cursor: Database cursor.
+        table (str): ``news`` or one of its partitions.
+        chunk_size (int): Rows updated per statement.
+
+    Returns:
+        int: Number of rows updated.
+    """
+    updated = 0
+    with cursor.connection.cursor(name="fill_url_keys") as rows:
+        rows.itersize = chunk_size
+        rows.execute(f"SELECT id, published_at, url FROM {table} WHERE url_key IS NULL")
+        while chunk := rows.fetchmany(chunk_size):
+            execute_values(
+                cursor,
+                f"""UPDATE {table} AS n SET url_key = v.url_key
+                    FROM (VALUES %s) AS v (id, published_at, url_key)
+                    WHERE n.id = v.id AND n.published_at = v.published_at""",
+                [(article_id, published_at, canonical_url(url)) for article_id, published_at, url in chunk],
+                page_size=chunk_size,
+            )
+            updated += len(chunk)
+    return updated
+
+
+def shingles(title, description):
+    """
+    Words an article is compared by: its stemmed title (without publisher
+    suffix) and description words, without stopwords.
+    """
+    title = SOURCE_SUFFIX.sub("", title or "")
+    return set(words(title)) | set(words(description)) or {title.lower()}
+
+
+class NearDuplicateIndex:
+    """
+    Groups recent articles telling the same story into clusters.
+
+    Syndicated copies of a story come from several sources under
+    different URLs, with the same or a slightly edited title and
+    description. Every article gets a MinHash signature of its words (see
+    ``shingles``); the share of equal signature values estimates the
+    Jaccard similarity of two articles' words. Signatures are split into
+    ``bands`` and every band is hashed into a bucket (locality-sensitive
+    hashing), so a new article is only compared with the few articles
+    sharing a bucket instead of with all of them.
+
+    An article joins the cluster of its most similar earlier article if
+    the similarity reaches ``threshold``, otherwise it starts a cluster
+    named after its own id. Only articles published within
+    ``window_days`` of the newest one are kept; older ones are dropped
+    from memory.
+
+    Args:
+        threshold (float): Estimated similarity from which two articles
+            are the same story.
+        num_perm (int): Values per MinHash signature.
+        bands (int): LSH bands; must divide ``num_perm``. More bands find
+            less similar candidates, at the cost of more comparisons.
+        window_days (float): How far back articles are matched.
+        seed (int): Seed of the hash functions; signatures are only
+            comparable with the same seed.
+    """
+
+    def __init__(self, threshold=0.7, num_perm=64, bands=16, window_days=7, seed=1):
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.window = timedelta(days=window_days)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32 - 1, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32 - 1, num_perm, dtype=np.uint64)
+        # Hashes the values of a band into one integer bucket key
+        self._band_mix = rng.integers(1, 2**63, num_perm // bands, dtype=np.uint64) | 1
+        self._lock = threading.Lock()
+        self._clear()
+        self.assigned = 0
+        self.matched = 0
+        self.assign_seconds = 0.0
+
+    def _clear(self):
+        # Per band: bucket key -> positions of the articles in the bucket
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures = np.empty((1024, self.num_perm), dtype=np.uint32)
+        self._ids = []
+        self._clusters = []
+        self._published = []
+        self._newest = None
+        self._last_id = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def signatures(self, articles):
+        """
+        Computes MinHash signatures.
+
+        Args:
+            articles (list): (title, description) pairs.
+
+        Returns:
+            numpy.ndarray: uint32 array of shape ``(len(articles), num_perm)``.
+        """
+        hashes, starts = [], []
+        for title, description in articles:
+            starts.append(len(hashes))
+            hashes.extend(zlib.crc32(w.encode()) for w in shingles(title, description))
+        if not hashes:
+            return np.empty((0, self.num_perm), dtype=np.uint32)
+        x = np.array(hashes, dtype=np.uint64)[:, None]
+        values = (x * self._a + self._b) % PRIME
+        # Every article has at least one word, so each slice is non-empty
+        return np.minimum.reduceat(values, starts).astype(np.uint32)
+
+    def _keys(self, signatures):
+        """Bucket keys of every band of every signature, as lists of ints."""
+        shape = (len(signatures), self.bands, self.num_perm // self.bands)
+        bands = signatures.reshape(shape).astype(np.uint64)
+        return (bands * self._band_mix).sum(axis=2).tolist()  # wraps around, like a hash
+
+    def _add(self, article_id, signature, keys, cluster_id, published_at):
+        position = len(self._ids)
+        if position == len(self._signatures):
+            grown = np.empty((position * 2, self.num_perm), dtype=np.uint32)
+            grown[:position] = self._signatures
+            self._signatures = grown
+        self._signatures[position] = signature
+        self._ids.append(article_id)
+        self._clusters.append(cluster_id)
+        self._published.append(published_at)
+        for buckets, key in zip(self._buckets, keys):
+            buckets[key].append(position)
+        if self._newest is None or published_at > self._newest:
+            self._newest = published_at
+        self._last_id = max(self._last_id, article_id)
+
+    def _match(self, signature, keys, published_at):
+        candidates = {
+            p for buckets, key in zip(self._buckets, keys) for p in buckets.get(key, ())
+        }
+        candidates = [
+            p for p in candidates if abs(self._published[p] - published_at) <= self.window
+        ]
+        if not candidates:
+            return None
+        similarity = (self._signatures[candidates] == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            return None
+        return self._clusters[candidates[best]]
+
+    def _expire(self):
+        """Drops articles older than the window, once they are a day past it."""
+        cutoff = self._newest - self.window
+        if not self._published or min(self._published) >= cutoff - timedelta(days=1):
+            return
+        self._keep([p for p, published in enumerate(self._published) if published >= cutoff])
+
+    def _keep(self, kept):
+        """Rebuilds the index from the articles at positions ``kept``."""
+        signatures = self._signatures[kept]
+        ids = [self._ids[p] for p in kept]
+        clusters = [self._clusters[p] for p in kept]
+        published = [self._published[p] for p in kept]
+        last_id = self._last_id
+        self._clear()
+        for article in zip(ids, signatures, self._keys(signatures), clusters, published):
+            self._add(*article)
+        self._last_id = last_id
+
+    def assign(self, articles):
+        """
+        Assigns new articles to clusters and adds them to the index.
+
+        Articles that end up not stored must be taken out again with
+        ``forget``, or later articles could join their clusters.
+
+        Args:
+            articles (list): (id, title, description, published_at) tuples,
+                with ``published_at`` a datetime. An article can join the
+                cluster of one earlier in the list.
+
+        Returns:
+            list: The cluster id of every article.
+        """
+        started = time.perf_counter()
+        signatures = self.signatures([(title, description) for _, title, description, _ in articles])
+        clusters = []
+        with self._lock:
+            for (article_id, _, _, published_at), signature, keys in zip(
+                articles, signatures, self._keys(signatures)
+            ):
+                cluster_id = self._match(signature, keys, published_at)
+                if cluster_id is None:
+                    cluster_id = article_id
+                else:
+                    self.matched += 1
+                self._add(article_id, signature, keys, cluster_id, published_at)
+                clusters.append(cluster_id)
+            if self._newest is not None:
+                self._expire()
+            self.assigned += len(articles)
+            self.assign_seconds += time.perf_counter() - started
+        return clusters
+
+    def sync(self, cursor, now=None):
+        """
+        Adds the recent stored articles the index has not seen yet.
+
+        Covers articles written before the process started or by another
+        process; call it before ``assign`` with the cursor of the insert.
+
+        Args:
+            cursor: Database cursor.
+            now (datetime): End of the window (optional, current UTC time).
+
+        Returns:
+            int: Number of articles added.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        cursor.execute(SYNC_SQL, (self._last_id, now - self.window))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+        signatures = self.signatures([(title, description) for _, title, description, _, _ in rows])
+        with self._lock:
+            for (article_id, _, _, published_at, cluster_id), signature, keys in zip(
+                rows, signatures, self._keys(signatures)
+            ):
+                if article_id > self._last_id:
+                    self._add(article_id, signature, keys, cluster_id, published_at)
+            self._expire()
+        return len(rows)
+
+    def forget(self, ids):
+        """
+        Takes articles out of the index, e.g. after their insert failed.
+
+        Args:
+            ids (iterable): Ids of articles added by ``assign``.
+        """
+        ids = set(ids)
+        with self._lock:
+            kept = [p for p, article_id in enumerate(self._ids) if article_id not in ids]
+            if len(kept) < len(self._ids):
+                self._keep(kept)
+
+    def reset(self):
+        """Forgets all articles."""
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """Returns the number of indexed articles and how many new ones were near-duplicates."""
+        with self._lock:
+            return {
+                "articles": len(self._ids),
+                "buckets": sum(len(buckets) for buckets in self._buckets),
+                "assigned": self.assigned,
+                "near_duplicates": self.matched,
+                "avg_assign_ms": (
+                    round(self.assign_seconds / self.assigned * 1000, 3)
+                    if self.assigned
+                    else None
+                ),
+            }
+
+
+def cluster_news(pool, index, chunk_size=5000, on_change=None):
+    """
+    Clusters all stored articles again, oldest first.
+
+    Used after enabling clustering on a table that already holds articles,
+    or after changing the threshold. Articles are read from a server-side
+    cursor; only changed cluster ids are written back.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connections from.
+        index (NearDuplicateIndex): Index to cluster with; it is emptied
+            first and holds the newest articles afterwards.
+        chunk_size (int): Articles clustered per batch.
+        on_change (callable): Called after each commit with the
+            (publication date, category) of every article whose cluster
+            changed, e.g. to invalidate cached listings.
+
+    Returns:
+        dict: Number of ``articles`` read and of ``changed`` cluster ids.
+    """
+    index.reset()
+    articles = changed = 0
+    with pool.connection() as read_conn, pool.connection() as write_conn:
+        with read_conn.cursor(name="cluster_news") as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(
+                """SELECT id, title, description, published_at, cluster_id, category
+                   FROM news ORDER BY published_at, id"""
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                clusters = index.assign([row[:4] for row in rows])
+                changed_rows = [
+                    (row, cluster_id) for row, cluster_id in zip(rows, clusters) if row[4] != cluster_id
+                ]
+                updates = [(row[0], cluster_id) for row, cluster_id in changed_rows]
+                if updates:
+                    with write_conn.cursor() as write_cursor:
+                        execute_values(
+                            write_cursor,
+                            """UPDATE news SET cluster_id = v.cluster_id
+                               FROM (VALUES %s) AS v (id, cluster_id)
+                               WHERE news.id = v.id""",
+                            updates,
+                        )
+                    write_conn.commit()
+                    if on_change is not None:
+                        on_change({(row[3].date(), row[5]) for row, _ in changed_rows})
+                articles += len(rows)
+                changed += len(updates)
+    return {"articles": articles, "changed": changed}
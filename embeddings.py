@@ -0,0 +1,478 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only locked within the process
+    fcntl = None
+
+import numpy as np
+
+from context import words
+
+# Files of an index directory; every one holds one fixed-size record per
+# article, in the same order. ids is written last, so its length is the
+# number of complete records.
+VECTORS_FILE = "vectors.i1"
+SCALES_FILE = "scales.f4"
+PUBLISHED_FILE = "published.i8"
+CATEGORIES_FILE = "categories.u1"
+IDS_FILE = "ids.i8"
+META_FILE = "meta.json"
+# Locked by every append, so writers in several processes take turns
+LOCK_FILE = ".lock"
+
+
+@lru_cache(maxsize=200_000)
+def _feature_slot(feature, dim):
+    """Stable (slot, sign) of a feature; unlike hash() it is the same in every process."""
+    digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedding of texts, without a model or network.
+
+    Stemmed words and pairs of consecutive words are hashed into a fixed
+    number of dimensions with a random sign (the "hashing trick"), weighted
+    by ``1 + log(count)`` and normalized to unit length. Texts sharing words
+    get a high cosine similarity; it does not know synonyms.
+
+    Args:
+        dim (int): Number of dimensions.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts, query=False):
+        """
+        Embeds texts.
+
+        Args:
+            texts (list): Strings to embed.
+            query (bool): Whether the texts are search queries (unused here,
+                queries and documents are embedded the same way).
+
+        Returns:
+            numpy.ndarray: float32 array of shape ``(len(texts), dim)``.
+        """
+        rows, slots, values = [], [], []
+        for row, text in enumerate(texts):
+            tokens = words(text)
+            features = Counter(tokens)
+            features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+            for feature, count in features.items():
+                slot, sign = _feature_slot(feature, self.dim)
+                rows.append(row)
+                slots.append(slot)
+                values.append(sign * (1.0 + math.log(count)))
+        # Filled in one call; item by item assignment is slow in NumPy
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (rows, slots), values)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class GeminiEmbedder:
+    """
+    Google embedding model (needs the ``google-generativeai`` package).
+
+    Args:
+        name (str): Embedding model name.
+        api_key (str): Google API key.
+        batch_size (int): Texts sent per request.
+    """
+
+    def __init__(self, name="models/text-embedding-004", api_key=None, batch_size=100):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self.model = name
+        self.batch_size = batch_size
+        self.dim = 768
+        self.name = name
+
+    def embed(self, texts, query=False):
+        """Embeds texts; see ``HashingEmbedder.embed``."""
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            result = self._genai.embed_content(
+                model=self.model,
+                content=list(texts[start : start + self.batch_size]),
+                task_type="retrieval_query" if query else "retrieval_document",
+            )
+            vectors.extend(result["embedding"])
+        vectors = np.array(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+def create_embedder(name, **options):
+    """
+    Creates the embedding model of the retrieval index.
+
+    Args:
+        name (str): ``hashing`` or ``gemini``.
+        **options: Arguments of the embedder class.
+
+    Returns:
+        HashingEmbedder | GeminiEmbedder: Object with ``embed(texts, query)``.
+
+    Raises:
+        ValueError: If the embedder is unknown.
+    """
+    embedders = {"hashing": HashingEmbedder, "gemini": GeminiEmbedder}
+    if name not in embedders:
+        raise ValueError(f"Unknown embedder {name!r}, use one of {', '.join(embedders)}")
+    return embedders[name](**options)
+
+
+def article_text(title, description):
+    """Text of an article that gets embedded; the title counts twice."""
+    return f"{title}\n{title}\n{description or ''}"
+
+
+def _timestamp(value):
+    """Seconds since the epoch of a naive datetime, as stored in the index."""
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+class EmbeddingIndex:
+    """
+    Append-only vector index of the stored articles for semantic retrieval.
+
+    The unit-length vectors are quantized to int8 with one float32 scale per
+    article (a quarter of float32, and faster to score than float16). They
+    are kept with the publication time and the category of every article in
+    flat binary files that are memory-mapped for searching, so the index
+    costs little memory and is shared with other processes through the page
+    cache. New articles are appended during
+    ingest; readers map the files again when they grew, so a separate
+    ingest process is picked up. Appends hold an exclusive lock on a file
+    of the index directory, so writers in several processes take turns.
+
+    Args:
+        root (str): Directory of the index files.
+        embedder: Embedding model (see ``create_embedder``).
+        batch_rows (int): Vectors scored per step of a search.
+    """
+
+    def __init__(self, root, embedder, batch_rows=4096):
+        self.root = root
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        self._maps = None
+        self.searches = 0
+        self.search_seconds = 0.0
+        self._meta = self._load_meta()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _load_meta(self):
+        meta = {"embedder": self.embedder.name, "dim": self.dim, "categories": []}
+        try:
+            with open(self._path(META_FILE), encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return meta  # written with the first articles
+        if (stored["embedder"], stored["dim"]) == (meta["embedder"], meta["dim"]):
+            return stored
+        print(
+            f"⚠️ Index in {self.root} was built with {stored['embedder']}, "
+            f"starting over with {self.embedder.name}; run `flask build-index`"
+        )
+        self._truncate(0)
+        self._save_meta(meta)
+        return meta
+
+    def _save_meta(self, meta):
+        tmp_path = self._path(f".{META_FILE}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path(META_FILE))
+
+    @contextmanager
+    def _write_lock(self):
+        """Holds the thread lock and the index directory's file lock."""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(LOCK_FILE), "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _record_sizes(self):
+        return {
+            VECTORS_FILE: self.dim,
+            SCALES_FILE: 4,
+            PUBLISHED_FILE: 8,
+            CATEGORIES_FILE: 1,
+            IDS_FILE: 8,
+        }
+
+    def _complete_records(self):
+        """Number of articles whose records made it into every file."""
+        count = None
+        for name, size in self._record_sizes().items():
+            try:
+                records = os.path.getsize(self._path(name)) // size
+            except FileNotFoundError:
+                records = 0
+            count = records if count is None else min(count, records)
+        return count
+
+    def _truncate(self, count):
+        """Cuts every file to ``count`` records, dropping a partly written append."""
+        if not os.path.isdir(self.root):
+            return
+        for name, size in self._record_sizes().items():
+            with open(self._path(name), "ab") as f:
+                f.truncate(count * size)
+
+    def __len__(self):
+        return self._complete_records()
+
+    def add(self, ids, titles, descriptions, published, categories):
+        """
+        Embeds articles and appends them to the index.
+
+        Args:
+            ids (list): ``news.id`` of the articles.
+            titles (list): Titles.
+            descriptions (list): Descriptions (may contain None).
+            published (list): Publication datetimes.
+            categories (list): Category names.
+
+        Returns:
+            int: Number of articles added.
+        """
+        if not ids:
+            return 0
+        vectors = self.embedder.embed(
+            [article_text(t, d) for t, d in zip(titles, descriptions)]
+        )
+        scales = np.abs(vectors).max(axis=1) / 127
+        quantized = np.rint(
+            np.divide(vectors, scales[:, None], out=np.zeros_like(vectors), where=scales[:, None] > 0)
+        ).astype(np.int8)
+        with self._write_lock():
+            # Another process may have added categories since they were read
+            try:
+                with open(self._path(META_FILE), encoding="utf-8") as f:
+                    self._meta = json.load(f)
+            except FileNotFoundError:
+                pass
+            names = self._meta["categories"]
+            new = sorted(set(categories) - set(names))
+            if new or not os.path.exists(self._path(META_FILE)):
+                meta = dict(self._meta, categories=names + new)
+                self._save_meta(meta)
+                self._meta = meta
+            codes = {name: code for code, name in enumerate(self._meta["categories"])}
+
+            self._truncate(self._complete_records())
+            columns = [
+                (VECTORS_FILE, quantized),
+                (SCALES_FILE, scales.astype(np.float32)),
+                (PUBLISHED_FILE, np.array([_timestamp(p) for p in published], dtype=np.int64)),
+                (CATEGORIES_FILE, np.array([codes[c] for c in categories], dtype=np.uint8)),
+                (IDS_FILE, np.asarray(ids, dtype=np.int64)),
+            ]
+            for name, column in columns:
+                with open(self._path(name), "ab") as f:
+                    f.write(column.tobytes())
+        return len(ids)
+
+    def ids(self):
+        """Ids of the indexed articles, as an int64 array."""
+        maps = self._mapped()
+        return np.array(maps["ids"]) if maps["count"] else np.empty(0, dtype=np.int64)
+
+    def clear(self):
+        """Removes all articles from the index."""
+        with self._write_lock():
+            self._maps = None
+            self._truncate(0)
+
+    def _mapped(self):
+        """Memory maps of the complete records, mapped again when the files grew."""
+        count = self._complete_records()
+        maps = self._maps
+        if maps is not None and maps["count"] == count:
+            return maps
+        maps = {"count": count}
+        if count:
+            # Another process may have added categories along with the articles
+            with open(self._path(META_FILE), encoding="utf-8") as f:
+                self._meta = json.load(f)
+            for key, name, dtype, shape in (
+                ("vectors", VECTORS_FILE, np.int8, (count, self.dim)),
+                ("scales", SCALES_FILE, np.float32, (count,)),
+                ("published", PUBLISHED_FILE, np.int64, (count,)),
+                ("categories", CATEGORIES_FILE, np.uint8, (count,)),
+                ("ids", IDS_FILE, np.int64, (count,)),
+            ):
+                maps[key] = np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+        self._maps = maps
+        return maps
+
+    def search(self, query, k=50, start=None, end=None, category=None):
+        """
+        Returns the articles most similar to a query.
+
+        Args:
+            query (str): Text to search for.
+            k (int): Maximum number of articles.
+            start (datetime): Only articles published from then on (optional).
+            end (datetime): Only articles published before then (optional).
+            category (str): Only this category (optional).
+
+        Returns:
+            list: (article id, cosine similarity) pairs, most similar first.
+        """
+        return self.search_many([query], k, start, end, category)[0]
+
+    def search_many(self, queries, k=50, start=None, end=None, category=None):
+        """
+        Searches several queries in one pass over the vectors.
+
+        The vectors are scored ``batch_rows`` at a time against all queries
+        with one matrix product, keeping only the running top ``k`` per query.
+
+        Args:
+            queries (list): Texts to search for.
+            k (int): Maximum number of articles per query.
+            start (datetime): See ``search``.
+            end (datetime): See ``search``.
+            category (str): See ``search``.
+
+        Returns:
+            list: One list of (article id, cosine similarity) pairs per query.
+        """
+        started = time.perf_counter()
+        maps = self._mapped()
+        query_vectors = self.embedder.embed(list(queries), query=True).T  # dim x q
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+
+        code = None
+        if category is not None:
+            names = self._meta["categories"]
+            code = names.index(category) if category in names else -1
+        low = _timestamp(start) if start is not None else None
+        high = _timestamp(end) if end is not None else None
+
+        for first in range(0, maps["count"] if code != -1 else 0, self.batch_rows):
+            last = min(first + self.batch_rows, maps["count"])
+            rows = np.arange(first, last)
+            mask = np.ones(last - first, dtype=bool)
+            if low is not None:
+                mask &= maps["published"][first:last] >= low
+            if high is not None:
+                mask &= maps["published"][first:last] < high
+            if code is not None:
+                mask &= maps["categories"][first:last] == code
+            if not mask.all():
+                rows = rows[mask]
+                if not len(rows):
+                    continue
+                block, scales = maps["vectors"][rows], maps["scales"][rows]
+            else:
+                block, scales = maps["vectors"][first:last], maps["scales"][first:last]
+            scores = ((block.astype(np.float32) @ query_vectors) * scales[:, None]).T
+
+            scores = np.concatenate([best_scores, scores], axis=1)
+            candidates = np.concatenate(
+                [best_rows, np.broadcast_to(rows, (len(queries), len(rows)))], axis=1
+            )
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                candidates = np.take_along_axis(candidates, keep, axis=1)
+            best_scores, best_rows = scores, candidates
+
+        results = []
+        for scores, rows in zip(best_scores, best_rows):
+            order = np.argsort(-scores, kind="stable")
+            results.append(
+                [
+                    (int(maps["ids"][row]), float(score))
+                    for row, score in zip(rows[order], scores[order])
+                    if score > 0
+                ]
+            )
+        self.searches += len(queries)
+        self.search_seconds += time.perf_counter() - started
+        return results
+
+    def stats(self):
+        """Returns the number and size of the indexed articles and search timings."""
+        count = self._complete_records()
+        return {
+            "articles": count,
+            "bytes": count * sum(self._record_sizes().values()),
+            "embedder": self.embedder.name,
+            "searches": self.searches,
+            "avg_search_ms": (
+                round(self.search_seconds / self.searches * 1000, 2) if self.searches else None
+            ),
+        }
+
+
+def build_index(pool, index, rebuild=False, chunk_size=1000):
+    """
+    Adds the stored articles that are missing from the index.
+
+    The ids of all stored articles are compared with the indexed ones, so
+    articles skipped by a failed append are found wherever they are, not
+    only above the highest indexed id. The missing articles are then read
+    ``chunk_size`` at a time.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        index (EmbeddingIndex): Index to fill.
+        rebuild (bool): Empty the index first and add every article.
+        chunk_size (int): Articles embedded per batch.
+
+    Returns:
+        int: Number of articles added.
+    """
+    if rebuild:
+        index.clear()
+    added = 0
+    with pool.connection() as conn:
+        with conn.cursor(name="index_news_ids") as cursor:
+            cursor.itersize = 100_000
+            cursor.execute("SELECT id FROM news")
+            stored = np.fromiter((article_id for (article_id,) in cursor), dtype=np.int64)
+        missing = np.setdiff1d(stored, index.ids()).tolist()
+        with conn.cursor() as cursor:
+            for start in range(0, len(missing), chunk_size):
+                cursor.execute(
+                    """SELECT id, title, description, published_at, category
+                       FROM news WHERE id = ANY(%s) ORDER BY id""",
+                    (missing[start : start + chunk_size],),
+                )
+                added += index.add(*map(list, zip(*cursor.fetchall())))
+    return added
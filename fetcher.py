@@ -0,0 +1,249 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+# Answers worth another attempt: rate limiting and temporary server trouble
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(value):
+    """
+    Parses a ``Retry-After`` header.
+
+    Args:
+        value (str): Seconds, or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket spacing out requests to stay within an API quota.
+
+    Every request takes a token; tokens come back at ``rate`` per second up
+    to ``burst``. Reserving never awaits between reading and updating the
+    state, so it needs no lock inside one event loop.
+
+    Args:
+        rate (float): Sustained requests per second.
+        burst (int): Requests that may be sent at once after a quiet period.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def reserve(self):
+        """Takes a token and returns how many seconds to wait before using it."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        return max(wait, self._paused_until - now)
+
+    async def acquire(self):
+        """Waits until a request may be sent; returns the seconds waited."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def pause(self, seconds):
+        """Holds back all requests for a while, e.g. after a ``Retry-After``."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class Fetcher:
+    """
+    HTTP client for rate-limited JSON APIs.
+
+    Requests are limited to ``concurrency`` at a time and spaced out by a
+    token bucket. Rate limiting (429), temporary server errors, timeouts and
+    connection errors are retried with exponential backoff and full jitter;
+    a ``Retry-After`` header pauses every request to the API for that long.
+
+    The HTTP session and the concurrency limit belong to the event loop of
+    an ``async with fetcher:`` block, while the rate limit and the metrics
+    outlive it, so one fetcher can serve every ingest run. A server with a
+    long-lived event loop calls ``open`` once instead: the session and its
+    keep-alive connections are then shared by all later blocks until
+    ``close``.
+
+    Args:
+        concurrency (int): Maximum requests in flight.
+        rate (float): Sustained requests per second.
+        burst (int): Requests that may be sent at once.
+        timeout (float): Seconds before a request is abandoned.
+        max_attempts (int): Attempts per request, including the first.
+        backoff (float): Base delay in seconds; attempt ``n`` waits up to
+            ``backoff * 2 ** (n - 1)``.
+        max_backoff (float): Cap of the delay between attempts.
+    """
+
+    def __init__(
+        self,
+        concurrency=4,
+        rate=5.0,
+        burst=10,
+        timeout=15.0,
+        max_attempts=4,
+        backoff=0.5,
+        max_backoff=30.0,
+    ):
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._session = None
+        self._semaphore = None
+        self._long_lived = False
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+        self.statuses = {}
+
+    def _open_session(self):
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def open(self):
+        """Opens a session on the running event loop that stays open until ``close``."""
+        self._open_session()
+        self._long_lived = True
+
+    async def close(self):
+        """Closes the session opened by ``open``."""
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._long_lived = False
+
+    async def __aenter__(self):
+        if not self._long_lived:
+            self._open_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if not self._long_lived:
+            await self._session.close()
+            self._session = None
+
+    def _delay(self, attempt, retry_after=None):
+        jitter = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        return max(jitter, retry_after or 0.0)
+
+    async def get_json(self, url, params=None):
+        """
+        Sends a GET request and decodes the JSON answer, retrying if needed.
+
+        Args:
+            url (str): Address to request.
+            params (dict): Query parameters.
+
+        Returns:
+            tuple: (HTTP status, decoded JSON) of the last attempt; the
+            status is not 200 if the API kept failing or refused the request.
+
+        Raises:
+            aiohttp.ClientError: If the last attempt could not connect.
+            asyncio.TimeoutError: If the last attempt timed out.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            async with self._semaphore:
+                throttled = await self.bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    async with self._session.get(url, params=params) as response:
+                        data = await response.json(content_type=None)
+                        status = response.status
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    self._record(time.perf_counter() - started, throttled, error=True)
+                    if attempt == self.max_attempts:
+                        with self._lock:
+                            self.failures += 1
+                        raise
+                    print(f"⚠️ {type(e).__name__} for {url}, retrying (attempt {attempt})")
+                    delay = self._delay(attempt)
+                else:
+                    self._record(time.perf_counter() - started, throttled, status=status)
+                    if status not in RETRY_STATUSES or attempt == self.max_attempts:
+                        if status != 200:
+                            with self._lock:
+                                self.failures += 1
+                        return status, data
+                    if status == 429:
+                        # Everybody waits, not just this request
+                        self.bucket.pause(retry_after or self._delay(attempt))
+                    delay = self._delay(attempt, retry_after)
+            with self._lock:
+                self.retries += 1
+            await asyncio.sleep(delay)
+
+    def _record(self, seconds, throttled, status=None, error=False):
+        with self._lock:
+            self.requests += 1
+            self.throttled_seconds += throttled
+            self._latencies.append(seconds)
+            if error:
+                self.errors += 1
+            else:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                if status == 429:
+                    self.rate_limited += 1
+
+    def stats(self):
+        """
+        Returns request counters and latency percentiles.
+
+        ``requests`` counts every attempt; ``errors`` are attempts without
+        an answer (timeouts, connection errors) and ``failures`` requests
+        that still failed after all attempts.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "errors": self.errors,
+                "failures": self.failures,
+                "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+                "throttled_seconds": round(self.throttled_seconds, 3),
+            }
+        if latencies:
+            stats["latency_p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 1)
+            stats["latency_p99_ms"] = round(
+                latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1
+            )
+        return stats
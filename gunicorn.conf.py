@@ -0,0 +1,45 @@
+"""
+Gunicorn settings, overridable through the environment.
+
+WEB_MODE picks the entry point: "wsgi" (wsgi.py, threaded workers) or
+"asgi" (asgi.py on uvicorn workers, with async /news-by-date and /chat).
+
+Every worker starts an ingest scheduler, but they share a PostgreSQL
+advisory lock: one worker ingests and the others skip their runs until it
+exits. To keep ingest out of the web workers altogether, set
+RUN_INGEST_SCHEDULER=0 and run `flask ingest --loop` as a separate process.
+So every worker sees what the ingesting one changed, the response cache
+versions must not be local to a worker (CACHE_VERSIONS, see app.py).
+
+Usage:
+    gunicorn -c gunicorn.conf.py
+    WEB_MODE=asgi WEB_WORKERS=4 gunicorn -c gunicorn.conf.py
+"""
+
+import os
+
+WEB_MODE = os.getenv("WEB_MODE", "wsgi")
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_WORKERS", "2"))
+# Report rendering and chat answers can take a while
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.getenv("WEB_ACCESS_LOG") or None
+
+if WEB_MODE == "asgi":
+    wsgi_app = "asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+elif WEB_MODE == "wsgi":
+    wsgi_app = "wsgi:application"
+    worker_class = "gthread"
+    # Requests served at once per worker; each chat stream holds one
+    threads = int(os.getenv("WEB_THREADS", "8"))
+else:
+    raise ValueError(f"Unknown WEB_MODE: {WEB_MODE}")
+
+if workers > 1 and os.getenv("CACHE_VERSIONS") == "local" and not os.getenv("CACHE_REDIS_URL"):
+    # Only the ingesting worker would bump its versions; the others would
+    # answer 304 with stale data
+    raise ValueError("CACHE_VERSIONS=local needs WEB_WORKERS=1 or CACHE_REDIS_URL")
@@ -0,0 +1,358 @@
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+from dedup import canonical_url
+from rollup import add_counts
+
+INSERT_NEWS_SQL = """
+    INSERT INTO news
+        (id, title, description, url, source, published_at, category, cluster_id, url_key)
+    VALUES %s
+    RETURNING DATE(published_at), category, id, title, description, published_at
+"""
+# news_urls is not partitioned, so unlike news it can keep a URL unique
+# across publication times; a URL is claimed there before its row is
+# inserted, in the same transaction
+CLAIM_URLS_SQL = """
+    INSERT INTO news_urls (url_key, published_at) VALUES %s
+    ON CONFLICT (url_key) DO NOTHING
+    RETURNING url_key
+"""
+# Ids are drawn before the insert, so near-duplicates in one batch can
+# point to the cluster of an article inserted with them
+NEW_IDS_SQL = """
+    SELECT nextval(pg_get_serial_sequence('news', 'id')) FROM generate_series(1, %s)
+"""
+
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+# Largest page NewsAPI serves
+MAX_PAGE_SIZE = 100
+
+
+def normalize_article(article, category):
+    """
+    Converts an article dict from the news API into a row for the ``news`` table.
+
+    Args:
+        article (dict): Article as returned by NewsAPI.
+        category (str): The category the article was fetched for.
+
+    Returns:
+        tuple: (title, description, url, source, published_at, category), or
+        None if a required field is missing or the article was removed.
+    """
+    title = (article.get("title") or "").strip()
+    description = (article.get("description") or "").strip() or None
+    url = (article.get("url") or "").strip()
+    source = ((article.get("source") or {}).get("name") or "").strip()
+    published_at = article.get("publishedAt")
+
+    if not (title and url and source and published_at):
+        return None
+    # NewsAPI keeps deleted articles in results with placeholder fields
+    if title == "[Removed]":
+        return None
+    return (title, description, url, source, published_at, category)
+
+
+def bulk_save_news(pool, rows, batch_size=500, on_insert=None, clusters=None):
+    """
+    Writes normalized news rows in batches, ignoring duplicates based on the URL.
+
+    URLs are compared by their canonical form (``dedup.canonical_url``),
+    stored as ``url_key``, so variants of one link (``www.``, tracking
+    parameters...) are duplicates too; ``url`` keeps the link as published.
+    Each batch first claims its URLs in ``news_urls`` with one
+    ``INSERT ... ON CONFLICT DO NOTHING``; only the rows whose URL it
+    claimed are inserted into ``news`` (so only new articles are
+    clustered), in the same transaction and together with the matching
+    update of the ``news_daily_counts`` rollup. A concurrent ingest of the
+    same URL waits for that transaction and then finds the URL taken, and
+    an article published again with a new time stays a duplicate.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        rows (iterable): Rows produced by ``normalize_article``.
+        batch_size (int): Number of rows per INSERT statement.
+        on_insert (callable): Called after each commit with the rows inserted
+            by the batch, as (publication date, category, id, title,
+            description, published_at) tuples.
+        clusters (dedup.NearDuplicateIndex): Groups near-duplicate articles
+            into clusters (optional; without it every article is a cluster
+            of its own). Articles that are not stored in the end are taken
+            out of it again.
+
+    Returns:
+        dict: Number of ``inserted`` rows and of ``duplicates`` (rows whose URL
+        was already stored or repeated in the input).
+    """
+    unique = {}
+    total = 0
+    for row in rows:
+        total += 1
+        unique.setdefault(canonical_url(row[2]), row)
+    keyed = list(unique.items())
+
+    inserted = 0
+    with pool.connection() as conn:
+        if clusters is not None:
+            with conn.cursor() as cursor:
+                clusters.sync(cursor)
+        for start in range(0, len(keyed), batch_size):
+            batch = keyed[start : start + batch_size]
+            with conn.cursor() as cursor:
+                # In key order, so concurrent batches lock the keys in the same order
+                claimed = execute_values(
+                    cursor,
+                    CLAIM_URLS_SQL,
+                    sorted((key, row[4]) for key, row in batch),
+                    page_size=len(batch),
+                    fetch=True,
+                )
+                claimed = {key for (key,) in claimed}
+                keys = [key for key, _ in batch if key in claimed]
+                batch = [row for key, row in batch if key in claimed]
+                if not batch:
+                    conn.commit()
+                    continue
+                cursor.execute(NEW_IDS_SQL, (len(batch),))
+                ids = [article_id for (article_id,) in cursor.fetchall()]
+                if clusters is None:
+                    cluster_ids = [None] * len(batch)
+                else:
+                    cluster_ids = clusters.assign(
+                        [
+                            (article_id, row[0], row[1], parse_published_at(row[4]))
+                            for article_id, row in zip(ids, batch)
+                        ]
+                    )
+                try:
+                    returned = execute_values(
+                        cursor,
+                        INSERT_NEWS_SQL,
+                        [
+                            (article_id, *row, cluster_id, key)
+                            for article_id, row, cluster_id, key in zip(
+                                ids, batch, cluster_ids, keys
+                            )
+                        ],
+                        page_size=len(batch),
+                        fetch=True,
+                    )
+                    add_counts(cursor, [row[:2] for row in returned])
+                    conn.commit()
+                except Exception:
+                    if clusters is not None:
+                        clusters.forget(ids)  # none of the batch was stored
+                    raise
+            inserted += len(returned)
+            if on_insert is not None and returned:
+                on_insert(returned)
+
+    return {"inserted": inserted, "duplicates": total - inserted}
+
+
+def parse_published_at(value):
+    """
+    Parses a NewsAPI ``publishedAt`` value like PostgreSQL stores it.
+
+    Args:
+        value (str): ISO 8601 time such as ``2025-04-12T10:30:00Z``.
+
+    Returns:
+        datetime: Naive UTC datetime.
+    """
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def ingest_progress(since, gap, fresh, backlog=None):
+    """
+    Works out how far a category got in a run of the ingest.
+
+    The run fetched the articles since the high-water mark (``fresh``) and,
+    if earlier runs were truncated, those of the gap they left (``backlog``).
+    The mark moves to the newest fetched article even if ``fresh`` was
+    truncated, so new articles keep coming in; what a truncated fetch
+    skipped (from its start to its oldest article) becomes a gap that later
+    runs fetch until it is closed. Two gaps are merged into the range
+    covering both, so some already stored articles may be fetched again
+    and are then dropped as duplicates.
+
+    Args:
+        since (datetime): Start of the ``fresh`` fetch.
+        gap (tuple): (start, end) of the articles skipped so far, or None.
+        fresh (dict): ``fetch_new_articles`` result from ``since`` on.
+        backlog (dict): ``fetch_new_articles`` result for ``gap``, or None
+            if it was not fetched.
+
+    Returns:
+        tuple: (publication time of the newest fetched article, or None,
+        remaining gap or None).
+    """
+
+    def times(result):
+        return [
+            parse_published_at(a["publishedAt"])
+            for a in result["articles"]
+            if a.get("publishedAt")
+        ]
+
+    gaps = []
+    if gap is not None:
+        if backlog is None or not backlog["ok"]:
+            gaps.append(gap)
+        elif backlog["truncated"]:
+            fetched = times(backlog)
+            gaps.append((gap[0], min(fetched)) if fetched else gap)
+    newest = None
+    if fresh["ok"]:
+        fetched = times(fresh)
+        if fetched:
+            newest = max(fetched)
+            if fresh["truncated"]:
+                gaps.append((since, min(fetched)))
+    if not gaps:
+        return newest, None
+    return newest, (min(start for start, _ in gaps), max(end for _, end in gaps))
+
+
+def load_high_water_marks(pool):
+    """
+    Returns how far every category has been ingested.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+
+    Returns:
+        dict: Category -> publication time of the newest ingested article.
+    """
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT category, high_water FROM ingest_state")
+        return dict(cursor.fetchall())
+
+
+def load_ingest_gaps(pool):
+    """
+    Returns the articles that truncated runs skipped and are still to fetch.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+
+    Returns:
+        dict: Category -> (start, end) publication times of its gap.
+    """
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT category, gap_from, gap_to FROM ingest_state WHERE gap_from IS NOT NULL"
+        )
+        return {category: (start, end) for category, start, end in cursor.fetchall()}
+
+
+def save_high_water_marks(pool, marks):
+    """
+    Records ingest progress; a mark never moves backwards.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        marks (dict): Category -> (high-water mark, articles fetched by
+            the run, whether the run had to skip older articles, and the
+            gap still to fetch as (start, end) or None).
+    """
+    if not marks:
+        return
+    with pool.connection() as conn, conn.cursor() as cursor:
+        execute_values(
+            cursor,
+            """
+            INSERT INTO ingest_state
+                (category, high_water, fetched, truncated, gap_from, gap_to, updated_at)
+            VALUES %s
+            ON CONFLICT (category) DO UPDATE SET
+                high_water = GREATEST(ingest_state.high_water, EXCLUDED.high_water),
+                fetched = EXCLUDED.fetched,
+                truncated = EXCLUDED.truncated,
+                gap_from = EXCLUDED.gap_from,
+                gap_to = EXCLUDED.gap_to,
+                updated_at = EXCLUDED.updated_at
+            """,
+            [
+                (category, mark, fetched, truncated, *(gap or (None, None)))
+                for category, (mark, fetched, truncated, gap) in sorted(marks.items())
+            ],
+            template="(%s, %s, %s, %s, %s, %s, now())",
+        )
+
+
+async def fetch_new_articles(
+    fetcher,
+    category,
+    since,
+    api_key,
+    url=NEWS_API_URL,
+    page_size=MAX_PAGE_SIZE,
+    max_pages=5,
+    until=None,
+):
+    """
+    Fetches the articles of a category published since a point in time.
+
+    Pages are requested newest first until the API has no more, so a day
+    that was still in progress at the last run is topped up. Articles older
+    than ``max_pages`` pages (or beyond the API's result limit) are skipped
+    and the result is marked ``truncated``; ``ingest_progress`` keeps them
+    as a gap for the next runs.
+
+    Args:
+        fetcher (fetcher.Fetcher): Open fetcher; it limits, spaces out and
+            retries the requests.
+        category (str): The category, used as the search query.
+        since (datetime): Only articles published from then on (UTC).
+        api_key (str): NewsAPI key.
+        url (str): Address of the ``everything`` endpoint.
+        page_size (int): Articles per request, at most 100.
+        max_pages (int): Maximum requests for the category.
+        until (datetime): Only articles published until then (UTC), if given.
+
+    Returns:
+        dict: ``articles`` (NewsAPI dicts), number of ``requests``,
+        ``truncated``, and ``ok`` (False if a request failed, in which case
+        the high-water mark must not move).
+    """
+    result = {"articles": [], "requests": 0, "truncated": False, "ok": True}
+    params = {
+        "q": category,
+        "from": since.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sortBy": "publishedAt",
+        "language": "en",
+        "pageSize": min(page_size, MAX_PAGE_SIZE),
+        "apiKey": api_key or "",
+    }
+    if until is not None:
+        params["to"] = until.strftime("%Y-%m-%dT%H:%M:%S")
+    for page in range(1, max_pages + 1):
+        result["requests"] += 1
+        try:
+            status, data = await fetcher.get_json(url, {**params, "page": page})
+        except Exception as e:
+            print(f"❌ Request is broken for {category}: {e}")
+            result["ok"] = False
+            return result
+
+        if data.get("code") == "maximumResultsReached":
+            result["truncated"] = True  # the plan's result limit
+            return result
+        if status != 200:
+            print(f"❌ API error for {category}: {status} {data.get('message', '')}")
+            result["ok"] = False
+            return result
+
+        articles = data.get("articles", [])
+        result["articles"].extend(articles)
+        if len(articles) < params["pageSize"] or page * params["pageSize"] >= data.get(
+            "totalResults", 0
+        ):
+            return result
+    result["truncated"] = True
+    return result
@@ -0,0 +1,200 @@
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+ACTIVE = (QUEUED, RUNNING, RETRYING)
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are already waiting."""
+
+
+class Job:
+    """
+    A unit of background work and its current state.
+
+    Attributes:
+        id (str): Public job identifier.
+        key (tuple): Deduplication key; identical active jobs share one Job.
+        status (str): One of queued, running, retrying, done, failed.
+        attempts (int): Number of times the job has started.
+        result: Return value of the job function once done.
+        error (str): Last error message, if any.
+    """
+
+    def __init__(self, key, func, args, retry_on):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.func = func
+        self.args = args
+        self.retry_on = retry_on
+        self.status = QUEUED
+        self.attempts = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.updated_at = self.created_at
+        self.next_attempt_at = None
+
+    def to_dict(self):
+        """Returns the job state for the status endpoint."""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(timespec="seconds"),
+            "updated_at": self.updated_at.isoformat(timespec="seconds"),
+            "next_attempt_at": (
+                self.next_attempt_at.isoformat(timespec="seconds")
+                if self.next_attempt_at
+                else None
+            ),
+        }
+
+
+class JobQueue:
+    """
+    In-process job queue with a bounded worker pool, retries and deduplication.
+
+    Jobs run on a ``ThreadPoolExecutor``. A job raising one of its
+    ``retry_on`` exceptions is retried with exponential backoff and jitter;
+    the worker is released while the job waits for its next attempt.
+
+    Args:
+        workers (int): Number of worker threads.
+        max_pending (int): Maximum number of jobs waiting to run.
+        max_attempts (int): Attempts before a job is marked as failed.
+        backoff (float): Delay in seconds before the first retry; doubled
+            for every following one.
+        keep_finished (float): Seconds finished jobs stay queryable.
+    """
+
+    def __init__(
+        self, workers=2, max_pending=100, max_attempts=4, backoff=5.0, keep_finished=3600
+    ):
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}  # id -> Job
+        self._active = {}  # key -> Job
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._deduplicated = 0
+
+    def submit(self, key, func, *args, retry_on=()):
+        """
+        Enqueues a job unless an identical one is still queued or running.
+
+        Args:
+            key (tuple): Deduplication key.
+            func (callable): The job function, called with ``args``.
+            *args: Arguments for ``func``.
+            retry_on (tuple): Exception types that trigger a retry.
+
+        Returns:
+            Job: The new job, or the already active job with the same key.
+
+        Raises:
+            QueueFull: If ``max_pending`` jobs are already waiting.
+        """
+        with self._lock:
+            self._prune()
+            active = self._active.get(key)
+            if active is not None:
+                self._deduplicated += 1
+                return active
+            pending = sum(1 for job in self._active.values() if job.status != RUNNING)
+            if pending >= self.max_pending:
+                raise QueueFull("Too many jobs are waiting, try again later.")
+
+            job = Job(key, func, args, retry_on)
+            self._jobs[job.id] = job
+            self._active[key] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """Returns the job with the given id, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        with self._lock:
+            job.status = RUNNING
+            job.attempts += 1
+            job.next_attempt_at = None
+            job.updated_at = datetime.now()
+        try:
+            result = job.func(*job.args)
+        except job.retry_on as e:
+            if job.attempts < self.max_attempts:
+                self._schedule_retry(job, e)
+                return
+            self._finish(job, FAILED, error=str(e))
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._finish(job, DONE, result=result)
+
+    def _schedule_retry(self, job, error):
+        delay = self.backoff * 2 ** (job.attempts - 1)
+        delay *= random.uniform(0.5, 1.5)  # jitter, so retries do not align
+        with self._lock:
+            self._retries += 1
+            job.status = RETRYING
+            job.error = str(error)
+            job.updated_at = datetime.now()
+            job.next_attempt_at = datetime.fromtimestamp(time.time() + delay)
+        print(f"🔁 Job {job.id} failed ({error}), retry in {delay:.1f}s")
+        timer = threading.Timer(delay, self._executor.submit, args=(self._run, job))
+        timer.daemon = True
+        timer.start()
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.updated_at = datetime.now()
+            self._active.pop(job.key, None)
+            if status == DONE:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    def _prune(self):
+        now = datetime.now()
+        for job_id, job in list(self._jobs.items()):
+            if (
+                job.status not in ACTIVE
+                and (now - job.updated_at).total_seconds() > self.keep_finished
+            ):
+                del self._jobs[job_id]
+
+    def stats(self):
+        """Returns queue counters."""
+        with self._lock:
+            statuses = [job.status for job in self._active.values()]
+            return {
+                "queued": statuses.count(QUEUED),
+                "running": statuses.count(RUNNING),
+                "retrying": statuses.count(RETRYING),
+                "completed": self._completed,
+                "failed": self._failed,
+                "retries": self._retries,
+                "deduplicated": self._deduplicated,
+            }
@@ -0,0 +1,120 @@
+from datetime import datetime
+
+from db import decode_cursor, encode_cursor, first_of_cluster
+
+# Columns an article listing can return, in output order
+ARTICLE_FIELDS = ("id", "title", "description", "url", "source", "published_at", "category")
+
+LIST_SQL = """
+    SELECT {columns}
+    FROM news
+    WHERE true {filters}
+    ORDER BY published_at DESC, id DESC
+    LIMIT %(limit)s
+"""
+
+
+def parse_fields(value):
+    """
+    Parses a comma-separated ``fields`` parameter.
+
+    Args:
+        value (str): E.g. ``"title,url"``; all fields if empty or None.
+
+    Returns:
+        tuple: Field names, in ``ARTICLE_FIELDS`` order.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+    if not value:
+        return ARTICLE_FIELDS
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested - set(ARTICLE_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown))}; use {', '.join(ARTICLE_FIELDS)}"
+        )
+    return tuple(name for name in ARTICLE_FIELDS if name in requested)
+
+
+def list_articles(
+    pool,
+    start=None,
+    end=None,
+    categories=None,
+    sources=None,
+    fields=ARTICLE_FIELDS,
+    limit=50,
+    cursor=None,
+    collapse=False,
+):
+    """
+    Lists news articles newest first, one page at a time.
+
+    Pages are cut with a keyset cursor on ``(published_at, id)``, so every
+    page costs the same however deep it is and articles inserted meanwhile
+    neither repeat nor skip rows. Only the requested columns are read.
+    With ``collapse``, syndicated copies of a story are left out: of every
+    near-duplicate cluster only the first article matching the filters is
+    listed.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        start (datetime): Optional inclusive lower bound of ``published_at``.
+        end (datetime): Optional exclusive upper bound of ``published_at``.
+        categories (list): Optional categories to keep.
+        sources (list): Optional source names to keep.
+        fields (tuple): Fields of every result, from ``ARTICLE_FIELDS``.
+        limit (int): Page size.
+        cursor (str): ``next_cursor`` from the previous page.
+        collapse (bool): List one article per near-duplicate cluster.
+
+    Returns:
+        dict: ``results`` (articles with the requested fields) and
+        ``next_cursor`` (None on the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    filters = []
+    params = {"limit": limit}
+    if start is not None:
+        filters.append("published_at >= %(start)s")
+        params["start"] = start
+    if end is not None:
+        filters.append("published_at < %(end)s")
+        params["end"] = end
+    if categories:
+        filters.append("category = ANY(%(categories)s)")
+        params["categories"] = list(categories)
+    if sources:
+        filters.append("source = ANY(%(sources)s)")
+        params["sources"] = list(sources)
+    if collapse:
+        filters.append(first_of_cluster("".join(f" AND {f}" for f in filters)))
+    if cursor:
+        try:
+            published_at, last_id = decode_cursor(cursor)
+            params["cursor_published_at"] = datetime.fromisoformat(published_at)
+            params["cursor_id"] = int(last_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
+        filters.append("(published_at, id) < (%(cursor_published_at)s, %(cursor_id)s)")
+
+    # The sort key is always read, to build the next cursor
+    columns = list(fields) + [name for name in ("published_at", "id") if name not in fields]
+    sql = LIST_SQL.format(
+        columns=", ".join(columns),
+        filters="".join(f" AND {f}" for f in filters),
+    )
+    with pool.connection() as conn, conn.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+
+    results = [dict(zip(fields, row)) for row in rows]
+    next_cursor = None
+    if len(rows) == limit:
+        last = dict(zip(columns, rows[-1]))
+        next_cursor = encode_cursor([last["published_at"].isoformat(), last["id"]])
+    return {"results": results, "next_cursor": next_cursor}
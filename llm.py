@@ -0,0 +1,281 @@
+import hashlib
+import re
+import threading
+import time
+
+from cache import LRUCache
+
+
+class GeminiModel:
+    """
+    Google Gemini model (needs the ``google-generativeai`` package).
+
+    Args:
+        name (str): Model name, e.g. ``gemini-1.5-flash``.
+        api_key (str): Google API key.
+    """
+
+    def __init__(self, name="gemini-1.5-flash", api_key=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(name)
+
+    def generate(self, prompt):
+        """Returns the whole answer to a prompt."""
+        return self._model.generate_content(prompt).text
+
+    def stream(self, prompt):
+        """
+        Yields the answer to a prompt in chunks, as the model produces them.
+
+        Closing the generator stops reading the response.
+        """
+        response = self._model.generate_content(prompt, stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeModel:
+    """
+    Offline stand-in for a language model, for development and benchmarks.
+
+    Answers deterministically by restating the user's question and how many
+    news items the prompt contains, word by word, with configurable delays
+    that mimic a real model's latency.
+
+    Args:
+        first_token_delay (float): Seconds before the first chunk.
+        token_delay (float): Seconds between the following chunks.
+    """
+
+    def __init__(self, first_token_delay=0.3, token_delay=0.02):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    def answer(self, prompt):
+        """Returns the deterministic answer for a prompt."""
+        questions = re.findall(r"User: (.*)", prompt)
+        question = questions[-1].strip() if questions else ""
+        stories = len(re.findall(r"^\s*Title: ", prompt, re.MULTILINE))
+        return (
+            f"You asked: \"{question}\". The context holds {stories} news stories. "
+            "This answer comes from the offline fake model, so it does not "
+            "actually summarize them."
+        )
+
+    def generate(self, prompt):
+        """Returns the whole answer after the simulated generation time."""
+        text = self.answer(prompt)
+        time.sleep(self.first_token_delay + self.token_delay * len(text.split()))
+        return text
+
+    def stream(self, prompt):
+        """Yields the answer word by word after the simulated delays."""
+        time.sleep(self.first_token_delay)
+        for i, word in enumerate(self.answer(prompt).split(" ")):
+            if i:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+def create_model(backend, **options):
+    """
+    Creates the chat model.
+
+    Args:
+        backend (str): ``gemini`` or ``fake``.
+        **options: Arguments of the model class.
+
+    Returns:
+        GeminiModel | FakeModel: Object with ``generate(prompt)`` and
+        ``stream(prompt)``.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backends = {"gemini": GeminiModel, "fake": FakeModel}
+    if backend not in backends:
+        raise ValueError(f"Unknown LLM backend {backend!r}, use one of {', '.join(backends)}")
+    return backends[backend](**options)
+
+
+def cache_key(message, *context):
+    """
+    Returns the answer cache key of a question.
+
+    The message is compared without case, punctuation or extra spaces, so
+    "What happened in sports today?" and "what happened in sports today"
+    share an answer.
+
+    Args:
+        message (str): The user's question.
+        *context: Everything else the answer depends on (date, category,
+            news context, chat history, ...).
+
+    Returns:
+        str: Hex digest.
+    """
+    normalized = " ".join(re.findall(r"\w+", message.lower()))
+    parts = [normalized, *(str(part) for part in context)]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+class _Flight:
+    """One upstream generation, shared by every request for the same key."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.cancelled = False
+        self.seconds = 0.0
+        self.condition = threading.Condition()
+
+
+class CachingModel:
+    """
+    Chat model wrapper that caches answers and coalesces identical requests.
+
+    Answers are cached by key (see ``cache_key``) with a TTL and LRU
+    eviction. While an answer is being generated, further requests for the
+    same key read the same upstream stream instead of calling the model
+    again; the generation runs in its own thread and is stopped once every
+    reader has gone away. Requests without a key go straight to the model.
+
+    Args:
+        model: Chat model (see ``create_model``).
+        max_entries (int): Maximum number of cached answers.
+        ttl (float): Seconds a cached answer is reused.
+    """
+
+    def __init__(self, model, max_entries=1000, ttl=600):
+        self.model = model
+        self._cache = LRUCache(max_entries=max_entries, ttl=ttl)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def generate(self, prompt, key=None):
+        """Returns the whole answer to a prompt, cached under ``key``."""
+        if key is None:
+            return self.model.generate(prompt)
+        return "".join(self.stream(prompt, key))
+
+    def stream(self, prompt, key=None):
+        """
+        Yields the answer to a prompt in chunks, cached under ``key``.
+
+        A cached answer is yielded as one chunk. Closing the generator stops
+        reading; the upstream call is cancelled if nobody else reads it.
+        """
+        if key is None:
+            yield from self.model.stream(prompt)
+            return
+
+        with self._lock:
+            # Checked under the lock: a finished flight caches its answer
+            # in the same step as it stops being in flight
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                self.saved_seconds += cached["seconds"]
+            else:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    self.misses += 1
+                    threading.Thread(
+                        target=self._generate, args=(key, prompt, flight), daemon=True
+                    ).start()
+                else:
+                    self.coalesced += 1
+                flight.readers += 1
+                follower = flight.readers > 1
+        if cached is not None:
+            yield cached["text"]
+            return
+
+        read = 0
+        try:
+            while True:
+                with flight.condition:
+                    while read == len(flight.chunks) and not flight.done:
+                        flight.condition.wait()
+                    chunks = flight.chunks[read:]
+                    done, error = flight.done, flight.error
+                read += len(chunks)
+                yield from chunks
+                if done:
+                    if error is not None:
+                        raise error
+                    if follower:
+                        with self._lock:
+                            self.saved_seconds += flight.seconds
+                    return
+        finally:
+            with self._lock:
+                flight.readers -= 1
+                if flight.readers == 0 and not flight.done:
+                    # Nobody reads it any more; later requests start afresh
+                    flight.cancelled = True
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+
+    def _generate(self, key, prompt, flight):
+        started = time.perf_counter()
+        error = None
+        try:
+            chunks = self.model.stream(prompt)
+            try:
+                for chunk in chunks:
+                    with flight.condition:
+                        flight.chunks.append(chunk)
+                        flight.condition.notify_all()
+                    if flight.cancelled:
+                        break
+            finally:
+                chunks.close()
+        except Exception as e:
+            error = e
+
+        seconds = time.perf_counter() - started
+        with self._lock:
+            self.upstream_seconds += seconds
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if error is None and not flight.cancelled:
+                text = "".join(flight.chunks)
+                self._cache.set(key, {"text": text, "seconds": seconds}, size=len(text))
+        with flight.condition:
+            flight.error = error
+            flight.seconds = seconds
+            flight.done = True
+            flight.condition.notify_all()
+
+    def stats(self):
+        """
+        Returns cache and coalescing counters and the upstream time saved.
+
+        Every miss is one upstream call; ``hit_rate`` counts coalesced
+        requests as hits. ``saved_seconds`` adds up how long the upstream
+        calls took whose answer was reused by a hit or a coalesced request.
+        """
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / requests, 3) if requests else None,
+                "in_flight": len(self._flights),
+                "upstream_seconds": round(self.upstream_seconds, 3),
+                "saved_seconds": round(self.saved_seconds, 3),
+                "cache": self._cache.stats(),
+            }
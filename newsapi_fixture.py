@@ -0,0 +1,234 @@
+"""
+Local stand-in for the NewsAPI ``/v2/everything`` endpoint.
+
+It serves a fixed set of articles with NewsAPI's paging, ``from``/``to``
+filtering, newest-first order and result limit, so the ingest can be run,
+replayed and benchmarked offline. Point the app at it with
+``NEWS_API_URL=http://127.0.0.1:8800/v2/everything``.
+
+Usage:
+    python newsapi_fixture.py fixture.json --port 8800
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from aiohttp import web
+
+from ingest import MAX_PAGE_SIZE, parse_published_at
+
+
+class NewsAPIFixture:
+    """
+    Serves articles the way NewsAPI's ``everything`` endpoint does.
+
+    The ``q`` parameter is matched against the category an article was
+    stored under. Every request is recorded in ``requests``. The HTTP server
+    can also misbehave like the real API: answer slowly, fail at random and
+    rate limit with ``429`` and ``Retry-After``.
+
+    Args:
+        articles (iterable): (article, category) pairs, articles as NewsAPI
+            dicts.
+        max_results (int): Results reachable by paging before the API answers
+            ``maximumResultsReached`` (100 on NewsAPI's developer plan).
+        api_key (str): Required ``apiKey`` (optional, anything goes if None).
+        latency (float): Seconds every HTTP answer takes.
+        error_rate (float): Share of HTTP requests answered with a 503.
+        rate_limit (float): Requests per second above which the server
+            answers 429 (optional, unlimited by default).
+        seed (int): Random seed of the injected errors.
+    """
+
+    def __init__(
+        self,
+        articles=(),
+        max_results=100,
+        api_key=None,
+        latency=0.0,
+        error_rate=0.0,
+        rate_limit=None,
+        seed=0,
+    ):
+        self.max_results = max_results
+        self.api_key = api_key
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._random = random.Random(seed)
+        self._recent = []  # times of the requests in the last second
+        self.faults = {"errors": 0, "rate_limited": 0}
+        self.requests = []
+        self._by_category = {}  # category -> [(published_at, article)], oldest first
+        self._lock = threading.Lock()
+        self._loop = None
+        self._runner = None
+        self.add(articles)
+
+    def add(self, articles):
+        """Adds (article, category) pairs, e.g. to simulate news arriving."""
+        with self._lock:
+            for article, category in articles:
+                entries = self._by_category.setdefault(category, [])
+                entries.append((parse_published_at(article["publishedAt"]), article))
+            for entries in self._by_category.values():
+                entries.sort(key=lambda entry: entry[0])
+
+    def search(self, params):
+        """
+        Answers one request.
+
+        Args:
+            params (dict): Query parameters.
+
+        Returns:
+            tuple: (HTTP status, JSON body).
+        """
+        self.requests.append(dict(params))
+        if self.api_key is not None and params.get("apiKey") != self.api_key:
+            return 401, {"status": "error", "code": "apiKeyInvalid", "message": "Bad key"}
+        try:
+            page = int(params.get("page", 1))
+            page_size = min(int(params.get("pageSize", MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return 400, {"status": "error", "code": "parameterInvalid", "message": "Bad paging"}
+        if page * page_size > self.max_results and page > 1:
+            return 426, {
+                "status": "error",
+                "code": "maximumResultsReached",
+                "message": f"Only {self.max_results} results are available",
+            }
+
+        with self._lock:
+            entries = self._by_category.get(params.get("q"), [])
+            times = [published for published, _ in entries]
+            low = 0
+            high = len(entries)
+            if params.get("from"):
+                low = bisect_left(times, parse_published_at(params["from"]))
+            if params.get("to"):
+                high = bisect_right(times, parse_published_at(params["to"]))
+            matches = entries[low:high]
+
+        newest_first = matches[::-1]
+        start = (page - 1) * page_size
+        return 200, {
+            "status": "ok",
+            "totalResults": len(matches),
+            "articles": [article for _, article in newest_first[start : start + page_size]],
+        }
+
+    async def _handle(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        self._recent = [t for t in self._recent if t > now - 1] + [now]
+        if self.rate_limit is not None and len(self._recent) > self.rate_limit:
+            self.faults["rate_limited"] += 1
+            return web.json_response(
+                {"status": "error", "code": "rateLimited", "message": "Too many requests"},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+        if self._random.random() < self.error_rate:
+            self.faults["errors"] += 1
+            return web.json_response(
+                {"status": "error", "code": "unexpectedError", "message": "Try again"},
+                status=503,
+            )
+        status, body = self.search(request.query)
+        return web.json_response(body, status=status)
+
+    def application(self):
+        """Returns the aiohttp application serving the fixture."""
+        app = web.Application()
+        app.router.add_get("/v2/everything", self._handle)
+        return app
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Serves the fixture from a background thread.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port, or 0 for any free one.
+
+        Returns:
+            str: URL of the ``everything`` endpoint.
+        """
+        started = threading.Event()
+        address = {}
+
+        async def serve():
+            self._runner = web.AppRunner(self.application())
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, host, port)
+            await site.start()
+            address["port"] = self._runner.addresses[0][1]
+            started.set()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="newsapi-fixture", daemon=True).start()
+        started.wait()
+        return f"http://{host}:{address['port']}/v2/everything"
+
+    def stop(self):
+        """Stops a server started with ``start``."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    def save(self, path):
+        """Writes the articles to a JSON file that ``load`` replays."""
+        with self._lock:
+            data = [
+                {"category": category, "article": article}
+                for category, entries in sorted(self._by_category.items())
+                for _, article in entries
+            ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, **options):
+        """Creates a fixture from a file written by ``save``."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(((item["article"], item["category"]) for item in data), **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("fixture", help="JSON file written by NewsAPIFixture.save.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--max-results", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float)
+    args = parser.parse_args()
+
+    fixture = NewsAPIFixture.load(
+        args.fixture,
+        max_results=args.max_results,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    print(f"Serving {args.fixture} on http://{args.host}:{args.port}/v2/everything")
+    web.run_app(fixture.application(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
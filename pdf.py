@@ -0,0 +1,833 @@
+"""
+PDF rendering backends for the news reports.
+
+Every backend implements ``render(report, pdf_path)``, where ``report`` is
+the dict built by ``app.generate_pdf``:
+
+- ``date``, ``locale`` and ``t`` (the translations of that locale),
+- ``chart_png`` / ``chart_base64``: the bar chart of the day,
+- ``categories``: sorted category names,
+- ``news_by_category``: iterable of (category, items) pairs in category
+  order, where items is an iterable of dicts with ``title``, ``url``,
+  ``time`` and ``source``. Both may be generators: the in-process
+  backends consume them once, while writing, so a report of any size is
+  rendered in bounded memory.
+
+Available backends (see ``create_backend``):
+
+- ``native``: writes the PDF directly from Python, embedding a subset of the
+  DejaVu font that ships with matplotlib. No external program is needed.
+- ``wkhtmltopdf``: renders ``report_template.html`` (or its variant for the
+  locale) and converts it with the ``wkhtmltopdf`` program, one process per
+  report.
+- ``pool``: runs another backend in a pool of long-lived worker processes,
+  so reports render in parallel and workers keep their fonts loaded.
+"""
+
+import hashlib
+import io
+import multiprocessing
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from urllib.parse import quote
+
+# TrueType tables a PDF viewer needs besides glyf/loca (cmap is not used by
+# CID fonts with an identity glyph mapping)
+COPIED_TABLES = ("head", "hhea", "hmtx", "maxp", "cvt ", "fpgm", "prep")
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89  # A4 in points
+MARGIN = 50
+BODY_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+# Colors of the HTML template
+TEXT_COLOR = "#333333"
+TITLE_COLOR = "#2c3e50"
+HEADING_COLOR = "#34495e"
+LINK_COLOR = "#007bff"
+META_COLOR = "#808080"
+RULE_COLOR = "#cccccc"
+FOOTER_COLOR = "#aaaaaa"
+
+
+@lru_cache(maxsize=None)
+def _rgb(color):
+    """Converts ``#rrggbb`` to the three PDF color components."""
+    return " ".join(f"{int(color[i:i + 2], 16) / 255:.3f}" for i in (1, 3, 5))
+
+
+def _pdf_string(text):
+    """Encodes text as a PDF string literal (UTF-16 when not plain ASCII)."""
+    if text.isascii():
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        return f"({escaped})"
+    return f"<feff{text.encode('utf-16-be').hex()}>"
+
+
+def _default_font(name):
+    import matplotlib  # the DejaVu fonts are bundled with matplotlib
+
+    return os.path.join(matplotlib.get_data_path(), "fonts", "ttf", name)
+
+
+class _Lookup(dict):
+    """Dict returning a default for missing keys, also from C code like str.translate."""
+
+    def __init__(self, items, default):
+        super().__init__(items)
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default
+
+
+class Font:
+    """
+    Metrics of a TrueType font and its embedding as a PDF CID font.
+
+    Text is written as two-byte glyph ids, so any character the font covers
+    (Latin, Cyrillic, Polish diacritics, ...) can be used; only the glyphs a
+    document uses are embedded.
+
+    Args:
+        path (str): Path of the ``.ttf`` file.
+    """
+
+    def __init__(self, path):
+        from fontTools.ttLib import TTFont
+
+        font = TTFont(path)
+        scale = 1000 / font["head"].unitsPerEm
+        glyph_ids = font.getReverseGlyphMap()
+        metrics = font["hmtx"].metrics
+
+        self.name = font["name"].getDebugName(6) or os.path.basename(path)
+        # Characters the font lacks use glyph 0 (.notdef)
+        cmap = font.getBestCmap()
+        notdef = font.getGlyphOrder()[0]
+        # char -> advance width in 1/1000 em
+        self.advances = _Lookup(
+            {chr(code): round(metrics[glyph][0] * scale) for code, glyph in cmap.items()},
+            round(metrics[notdef][0] * scale),
+        )
+        # code point -> hex glyph id, a translation table for str.translate
+        self.codes = _Lookup(
+            {code: f"{glyph_ids[glyph]:04x}" for code, glyph in cmap.items()}, "0000"
+        )
+        head, hhea = font["head"], font["hhea"]
+        self.bbox = [round(v * scale) for v in (head.xMin, head.yMin, head.xMax, head.yMax)]
+        self.ascent = round(hhea.ascent * scale)
+        self.descent = round(hhea.descent * scale)
+        self.cap_height = round(getattr(font["OS/2"], "sCapHeight", hhea.ascent) * scale)
+
+        # Raw tables copied into every embedded subset; only glyf and loca
+        # are rebuilt per document
+        self.tables = {tag: font.reader[tag] for tag in COPIED_TABLES if tag in font.reader}
+        self.glyf = font.reader["glyf"]
+        self.loca = list(font["loca"])
+
+    def width(self, text, size):
+        """Returns the width of ``text`` in points at the given font size."""
+        return sum(map(self.advances.__getitem__, text)) * size / 1000
+
+    def encode(self, text):
+        """Returns ``text`` as a hex string of glyph ids."""
+        return text.translate(self.codes)
+
+    def wrap(self, text, size, width):
+        """
+        Splits text into lines no wider than ``width`` points.
+
+        Returns:
+            list: The lines; words longer than a line are broken.
+        """
+        lines, line, line_width = [], "", 0
+        space = self.width(" ", size)
+        for word in text.split():
+            word_width = self.width(word, size)
+            if line and line_width + space + word_width <= width:
+                line += " " + word
+                line_width += space + word_width
+                continue
+            if line:
+                lines.append(line)
+            while word_width > width and len(word) > 1:
+                cut = len(word) - 1
+                while cut > 1 and self.width(word[:cut], size) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+                word_width = self.width(word, size)
+            line, line_width = word, word_width
+        if line:
+            lines.append(line)
+        return lines or [""]
+
+    def embed(self, writer, font_id, chars):
+        """
+        Writes the font objects, subset to the glyphs of ``chars``.
+
+        Args:
+            writer (PdfWriter): The document being written.
+            font_id (int): Object id reserved for the font dictionary.
+            chars (set): Characters used with this font.
+        """
+        used = {}  # glyph id -> char
+        for char in sorted(chars):
+            used.setdefault(int(self.codes[ord(char)], 16), char)
+        data = self.subset(used)
+
+        digest = hashlib.sha1("".join(sorted(chars)).encode()).digest()
+        tag = "".join(chr(ord("A") + b % 26) for b in digest[:6])
+        base_font = f"{tag}+{self.name.replace(' ', '')}"
+
+        file_id = writer.add_stream(data, f"/Length1 {len(data)}")
+        descriptor_id = writer.add(
+            f"<< /Type /FontDescriptor /FontName /{base_font} /Flags 32"
+            f" /FontBBox [{' '.join(map(str, self.bbox))}] /ItalicAngle 0"
+            f" /Ascent {self.ascent} /Descent {self.descent}"
+            f" /CapHeight {self.cap_height} /StemV 80 /FontFile2 {file_id} 0 R >>"
+        )
+        widths = " ".join(
+            f"{gid} [{self.advances[char]}]"
+            for gid, char in sorted(used.items())
+        )
+        cid_font_id = writer.add(
+            f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{base_font}"
+            " /CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >>"
+            f" /FontDescriptor {descriptor_id} 0 R /W [{widths}] /CIDToGIDMap /Identity >>"
+        )
+        to_unicode_id = writer.add_stream(self._to_unicode(used))
+        writer.write_object(
+            font_id,
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{base_font} /Encoding /Identity-H"
+            f" /DescendantFonts [{cid_font_id} 0 R] /ToUnicode {to_unicode_id} 0 R >>",
+        )
+
+    def subset(self, glyph_ids):
+        """
+        Returns a TrueType font containing only the given glyphs.
+
+        Glyph ids are kept (other glyphs are left empty), so text encoded with
+        ``encode`` works unchanged. Components of composite glyphs are added.
+
+        Args:
+            glyph_ids (iterable): Glyphs used by the document.
+
+        Returns:
+            bytes: The font file.
+        """
+        pending, used = list(glyph_ids) + [0], set()
+        while pending:
+            gid = pending.pop()
+            if gid in used:
+                continue
+            used.add(gid)
+            pending += self._components(gid)
+
+        glyf, loca = [], [0]
+        size = 0
+        for gid in range(len(self.loca) - 1):
+            if gid in used:
+                data = self.glyf[self.loca[gid] : self.loca[gid + 1]]
+                data += b"\0" * (-len(data) % 4)
+                glyf.append(data)
+                size += len(data)
+            loca.append(size)
+
+        tables = dict(self.tables)
+        # Long loca offsets and no whole-font checksum adjustment
+        tables["head"] = tables["head"][:8] + b"\0\0\0\0" + tables["head"][12:50] + b"\0\1" + tables["head"][52:]
+        tables["glyf"] = b"".join(glyf)
+        tables["loca"] = struct.pack(f">{len(loca)}I", *loca)
+
+        tags = sorted(tables)
+        entry_selector = len(tags).bit_length() - 1
+        search_range = 16 << entry_selector
+        header = struct.pack(
+            ">IHHHH", 0x00010000, len(tags), search_range, entry_selector,
+            len(tags) * 16 - search_range,
+        )
+        offset = len(header) + 16 * len(tags)
+        directory, body = [], []
+        for tag in tags:
+            data = tables[tag] + b"\0" * (-len(tables[tag]) % 4)
+            checksum = sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+            directory.append(struct.pack(">4sIII", tag.encode(), checksum, offset, len(tables[tag])))
+            body.append(data)
+            offset += len(data)
+        return header + b"".join(directory) + b"".join(body)
+
+    def _components(self, gid):
+        """Returns the glyph ids a composite glyph is built from."""
+        data = self.glyf[self.loca[gid] : self.loca[gid + 1]]
+        if len(data) < 10 or struct.unpack(">h", data[:2])[0] >= 0:
+            return []
+        components, pos = [], 10
+        while True:
+            flags, component = struct.unpack(">HH", data[pos : pos + 4])
+            components.append(component)
+            pos += 4 + (4 if flags & 0x0001 else 2)  # arguments as words or bytes
+            if flags & 0x0008:  # one scale
+                pos += 2
+            elif flags & 0x0040:  # x and y scale
+                pos += 4
+            elif flags & 0x0080:  # 2x2 transformation
+                pos += 8
+            if not flags & 0x0020:  # no more components
+                return components
+
+    @staticmethod
+    def _to_unicode(used):
+        """Returns the CMap that lets viewers copy and search the text."""
+        entries = [f"<{gid:04x}> <{char.encode('utf-16-be').hex()}>" for gid, char in sorted(used.items())]
+        chunks = [
+            f"{len(entries[i:i + 100])} beginbfchar\n" + "\n".join(entries[i : i + 100]) + "\nendbfchar"
+            for i in range(0, len(entries), 100)
+        ]
+        return (
+            "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+            "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+            "1 begincodespacerange\n<0000> <ffff>\nendcodespacerange\n"
+            + "\n".join(chunks)
+            + "\nendcmap\nCMapName currentdict /CMapResource defineresource pop\nend\nend"
+        ).encode()
+
+
+class PdfWriter:
+    """
+    Writes PDF objects to a binary stream as soon as they are added.
+
+    Only the byte offsets of the objects are kept until ``finish`` writes
+    the cross-reference table, so memory does not grow with the document.
+
+    Args:
+        stream: Binary file object to write to.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = {}
+        self.position = 0
+        self.next_id = 1
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.stream.write(data)
+        self.position += len(data)
+
+    def reserve(self):
+        """Returns a new object id whose object is written later."""
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id, body):
+        """Writes the object with a reserved id."""
+        self.offsets[obj_id] = self.position
+        if isinstance(body, str):
+            body = body.encode("latin-1")
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (obj_id, body))
+
+    def add(self, body):
+        """Writes a new object and returns its id."""
+        obj_id = self.reserve()
+        self.write_object(obj_id, body)
+        return obj_id
+
+    def add_stream(self, data, entries=""):
+        """Writes a Flate-compressed stream object and returns its id."""
+        data = zlib.compress(data, 6)
+        header = f"<< /Length {len(data)} /Filter /FlateDecode {entries}>>\nstream\n"
+        return self.add(header.encode("latin-1") + data + b"\nendstream")
+
+    def finish(self, root_id, info_id):
+        """Writes the cross-reference table and the trailer."""
+        xref = self.position
+        lines = [f"xref\n0 {self.next_id}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, self.next_id):
+            if obj_id in self.offsets:
+                lines.append(f"{self.offsets[obj_id]:010d} 00000 n \n")
+            else:
+                lines.append("0000000000 65535 f \n")
+        lines.append(
+            f"trailer\n<< /Size {self.next_id} /Root {root_id} 0 R /Info {info_id} 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n"
+        )
+        self._write("".join(lines).encode("latin-1"))
+
+
+class ReportDocument:
+    """
+    Lays out a report page by page, top to bottom.
+
+    Args:
+        stream: Binary file object the PDF is written to.
+        fonts (dict): ``regular`` and ``bold`` ``Font`` objects.
+        title (str): Document title shown by PDF viewers.
+    """
+
+    def __init__(self, stream, fonts, title):
+        self.writer = PdfWriter(stream)
+        self.fonts = fonts
+        self.title = title
+        self.font_ids = {key: self.writer.reserve() for key in fonts}
+        self.font_names = {key: f"/F{i}" for i, key in enumerate(fonts, start=1)}
+        self.used_chars = {key: set() for key in fonts}
+        self.pages_id = self.writer.reserve()
+        self.resources_id = self.writer.reserve()
+        self.images = {}  # resource name -> object id
+        self.page_ids = []
+        self.destinations = {}  # name -> (page id, y)
+        self.ops = []
+        self.annotations = []
+        self.y = None
+
+    # Pages
+
+    def _start_page(self):
+        self.page_ids.append(self.writer.reserve())
+        self.ops = []
+        self.annotations = []
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def _finish_page(self):
+        content_id = self.writer.add_stream("\n".join(self.ops).encode("latin-1"))
+        annotations = f" /Annots [{' '.join(self.annotations)}]" if self.annotations else ""
+        self.writer.write_object(
+            self.page_ids[-1],
+            f"<< /Type /Page /Parent {self.pages_id} 0 R"
+            f" /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}]"
+            f" /Resources {self.resources_id} 0 R /Contents {content_id} 0 R{annotations} >>",
+        )
+
+    def ensure_space(self, height):
+        """Starts a new page unless ``height`` points fit above the bottom margin."""
+        if self.y is None:
+            self._start_page()
+        elif self.y - height < MARGIN:
+            self._finish_page()
+            self._start_page()
+
+    def skip(self, height):
+        """Leaves vertical space."""
+        self.y -= height
+
+    # Drawing
+
+    def text(self, x, text, size, font="regular", color=TEXT_COLOR):
+        """
+        Draws text on the current line (the caller moves to the next one).
+
+        Returns:
+            float: Width of the text in points.
+        """
+        face = self.fonts[font]
+        self.used_chars[font].update(text)
+        self.ops.append(
+            f"BT {self.font_names[font]} {size} Tf {_rgb(color)} rg"
+            f" 1 0 0 1 {x:.2f} {self.y - size:.2f} Tm <{face.encode(text)}> Tj ET"
+        )
+        return face.width(text, size)
+
+    def link(self, x, width, height, url=None, destination=None):
+        """Makes a rectangle of the current line clickable."""
+        rect = f"[{x:.2f} {self.y - height:.2f} {x + width:.2f} {self.y:.2f}]"
+        if url is not None:
+            uri = quote(url, safe=":/?#[]@!$&'()*+,;=%~")
+            action = f"/A << /S /URI /URI {_pdf_string(uri)} >>"
+        else:
+            action = f"/Dest {_pdf_string(destination)}"
+        self.annotations.append(
+            f"<< /Type /Annot /Subtype /Link /Rect {rect} /Border [0 0 0] {action} >>"
+        )
+
+    def rule(self, color=RULE_COLOR, width=1.5):
+        """Draws a horizontal line across the body."""
+        self.ops.append(
+            f"{_rgb(color)} RG {width} w {MARGIN} {self.y:.2f} m"
+            f" {PAGE_WIDTH - MARGIN} {self.y:.2f} l S"
+        )
+
+    def image(self, png, width):
+        """Draws a PNG image centered, scaled to ``width`` points."""
+        from PIL import Image
+
+        picture = Image.open(io.BytesIO(png))
+        background = Image.new("RGB", picture.size, "white")
+        background.paste(picture, mask=picture.getchannel("A") if "A" in picture.getbands() else None)
+        name = f"/Im{len(self.images) + 1}"
+        self.images[name] = self.writer.add_stream(
+            background.tobytes(),
+            f"/Type /XObject /Subtype /Image /Width {picture.width} /Height {picture.height}"
+            " /ColorSpace /DeviceRGB /BitsPerComponent 8 ",
+        )
+
+        height = width * picture.height / picture.width
+        self.ensure_space(height)
+        x = (PAGE_WIDTH - width) / 2
+        self.ops.append(
+            f"q {width:.2f} 0 0 {height:.2f} {x:.2f} {self.y - height:.2f} cm {name} Do Q"
+            f" {_rgb(RULE_COLOR)} RG 1 w {x:.2f} {self.y - height:.2f} {width:.2f} {height:.2f} re S"
+        )
+        self.skip(height)
+
+    def destination(self, name):
+        """Marks the current position as the target of internal links."""
+        self.destinations[name] = (self.page_ids[-1], self.y)
+
+    # Document
+
+    def close(self):
+        """Finishes the last page and writes fonts, page tree and catalog."""
+        self.ensure_space(0)
+        self._finish_page()
+        writer = self.writer
+
+        for key, font in self.fonts.items():
+            font.embed(writer, self.font_ids[key], self.used_chars[key] or {" "})
+        fonts = " ".join(f"{self.font_names[k]} {self.font_ids[k]} 0 R" for k in self.fonts)
+        images = " ".join(f"{name} {obj_id} 0 R" for name, obj_id in self.images.items())
+        writer.write_object(
+            self.resources_id, f"<< /Font << {fonts} >> /XObject << {images} >> >>"
+        )
+        writer.write_object(
+            self.pages_id,
+            f"<< /Type /Pages /Count {len(self.page_ids)}"
+            f" /Kids [{' '.join(f'{p} 0 R' for p in self.page_ids)}] >>",
+        )
+        destinations = " ".join(
+            f"{_pdf_string(name)} [{page} 0 R /XYZ 0 {y:.2f} null]"
+            for name, (page, y) in sorted(self.destinations.items())
+        )
+        names_id = writer.add(f"<< /Names [{destinations}] >>")
+        root_id = writer.add(
+            f"<< /Type /Catalog /Pages {self.pages_id} 0 R /Names << /Dests {names_id} 0 R >> >>"
+        )
+        info_id = writer.add(f"<< /Title {_pdf_string(self.title)} /Producer (DataNewsHub) >>")
+        writer.finish(root_id, info_id)
+
+
+class PdfBackend:
+    """Interface of the report renderers."""
+
+    name = None
+
+    def render(self, report, pdf_path):
+        """
+        Writes the report as a PDF.
+
+        Args:
+            report (dict): Report data (see the module docstring).
+            pdf_path (str): Where to write the PDF.
+
+        Returns:
+            str: ``pdf_path``.
+        """
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Prepares the backend so the first report is not slower."""
+
+    def close(self):
+        """Releases the resources held by the backend."""
+
+
+class NativeBackend(PdfBackend):
+    """
+    Writes reports directly as PDF, without an HTML engine or subprocess.
+
+    The layout follows ``report_template.html``: title, table of contents
+    linking to the categories, chart, and the numbered news of every
+    category with their links, sources and times.
+
+    Args:
+        font_path (str): Regular TrueType font (DejaVu Sans by default).
+        bold_font_path (str): Bold TrueType font (DejaVu Sans Bold by default).
+    """
+
+    name = "native"
+
+    def __init__(self, font_path=None, bold_font_path=None):
+        self.fonts = {
+            "regular": Font(font_path or _default_font("DejaVuSans.ttf")),
+            "bold": Font(bold_font_path or _default_font("DejaVuSans-Bold.ttf")),
+        }
+
+    def render(self, report, pdf_path):
+        t = report["t"]
+        title = f"{t['report_title']} {report['date']}"
+        with open(pdf_path, "wb") as f:
+            doc = ReportDocument(f, self.fonts, title)
+            regular = self.fonts["regular"]
+
+            doc.ensure_space(40)
+            width = self.fonts["bold"].width(title, 20)
+            doc.text((PAGE_WIDTH - width) / 2, title, 20, "bold", TITLE_COLOR)
+            doc.skip(44)
+
+            self._heading(doc, t["contents"])
+            for category in report["categories"]:
+                doc.ensure_space(16)
+                doc.text(MARGIN + 15, "•", 11)
+                width = doc.text(MARGIN + 28, category, 11, color=LINK_COLOR)
+                doc.link(MARGIN + 28, width, 14, destination=f"category-{category}")
+                doc.skip(16)
+
+            self._heading(doc, t["graph_title"])
+            doc.image(report["chart_png"], BODY_WIDTH * 0.8)
+            doc.skip(10)
+
+            self._heading(doc, t["news_list"])
+            for category, items in report["news_by_category"]:
+                doc.ensure_space(60)
+                doc.skip(12)
+                doc.destination(f"category-{category}")
+                doc.text(MARGIN, f"{t['category_label']}: {category}", 13, "bold", TITLE_COLOR)
+                doc.skip(22)
+                for number, item in enumerate(items, start=1):
+                    self._item(doc, regular, number, item)
+
+            doc.ensure_space(60)
+            doc.skip(40)
+            width = regular.width(t["footer"], 9)
+            doc.text((PAGE_WIDTH - width) / 2, t["footer"], 9, color=FOOTER_COLOR)
+            doc.close()
+        return pdf_path
+
+    @staticmethod
+    def _heading(doc, text):
+        doc.ensure_space(60)
+        doc.skip(14)
+        doc.text(MARGIN, text, 15, "bold", HEADING_COLOR)
+        doc.skip(21)
+        doc.rule()
+        doc.skip(10)
+
+    @staticmethod
+    def _item(doc, font, number, item):
+        """Draws one numbered news item: wrapped title link, then source and time."""
+        indent = MARGIN + 30
+        width = PAGE_WIDTH - MARGIN - indent
+        lines = font.wrap(item["title"], 10, width)
+        meta = f" — {item['source']}, {item['time']}"
+        meta_width = font.width(meta, 8)
+
+        doc.ensure_space(14 * len(lines) + 4)
+        label = f"{number}."
+        doc.text(indent - 5 - font.width(label, 10), label, 10)
+        for i, line in enumerate(lines):
+            if i:
+                doc.ensure_space(14)
+            line_width = doc.text(indent, line, 10, color=LINK_COLOR)
+            doc.link(indent, line_width, 13, url=item["url"])
+            if i < len(lines) - 1:
+                doc.skip(14)
+        if line_width + meta_width <= width:
+            doc.y -= 2  # puts the smaller text on the title's baseline
+            doc.text(indent + line_width, meta, 8, color=META_COLOR)
+            doc.y += 2
+        else:
+            doc.skip(14)
+            doc.ensure_space(12)
+            doc.text(indent, meta.strip(), 8, color=META_COLOR)
+        doc.skip(18)
+
+
+class ReportTemplates:
+    """
+    Compiled HTML report templates, one per locale.
+
+    Templates are loaded through one Jinja ``Environment`` and compiled once
+    per process; the compiled bytecode is also kept in ``cache_dir``, so
+    other workers and restarts skip compilation too. A locale uses
+    ``report_template.<locale>.html`` when that file exists and the default
+    template otherwise.
+
+    Args:
+        template_dir (str): Directory of the templates.
+        name (str): File name of the default template.
+        cache_dir (str): Directory of the bytecode cache (optional, a
+            per-user temporary directory by default).
+    """
+
+    def __init__(self, template_dir="templates", name="report_template.html", cache_dir=None):
+        from jinja2 import (
+            Environment,
+            FileSystemBytecodeCache,
+            FileSystemLoader,
+            select_autoescape,
+        )
+
+        self.name = name
+        self.environment = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            autoescape=select_autoescape(),
+            auto_reload=False,  # templates only change with a deploy
+        )
+        self._by_locale = {}
+
+    def get(self, locale):
+        """Returns the compiled template for a locale."""
+        template = self._by_locale.get(locale)
+        if template is None:
+            stem, ext = os.path.splitext(self.name)
+            template = self.environment.select_template([f"{stem}.{locale}{ext}", self.name])
+            self._by_locale[locale] = template
+        return template
+
+    def warm_up(self):
+        """Compiles the default template and all locale variants."""
+        stem, ext = os.path.splitext(self.name)
+        for name in self.environment.list_templates():
+            if name == self.name or (name.startswith(f"{stem}.") and name.endswith(ext)):
+                self.environment.get_template(name)
+
+
+class WkhtmltopdfBackend(PdfBackend):
+    """
+    Renders the HTML report template and converts it with wkhtmltopdf.
+
+    Needs the ``pdfkit`` package and the ``wkhtmltopdf`` program; the program
+    is looked up when the first report is rendered.
+
+    Args:
+        template_dir (str): Directory of the Jinja HTML templates.
+        template_name (str): File name of the default report template.
+        cache_dir (str): Directory of the template bytecode cache (optional).
+        wkhtmltopdf_path (str): Path of the program (optional, found on the
+            PATH by default).
+    """
+
+    name = "wkhtmltopdf"
+
+    def __init__(
+        self,
+        template_dir="templates",
+        template_name="report_template.html",
+        cache_dir=None,
+        wkhtmltopdf_path=None,
+    ):
+        self.templates = ReportTemplates(template_dir, template_name, cache_dir)
+        self.wkhtmltopdf_path = wkhtmltopdf_path
+        self._config = None
+
+    def warm_up(self):
+        self.templates.warm_up()
+
+    def render(self, report, pdf_path):
+        import pdfkit  # optional dependency, only needed for this backend
+
+        if self._config is None:
+            self._config = pdfkit.configuration(wkhtmltopdf=self.wkhtmltopdf_path or "")
+        template = self.templates.get(report["locale"])
+
+        # The HTML is streamed to a file next to the PDF instead of being
+        # rendered into one string
+        html_path = f"{pdf_path}.html"
+        try:
+            with open(html_path, "w", encoding="utf-8") as f:
+                for chunk in template.generate(**report):
+                    f.write(chunk)
+            pdfkit.from_file(html_path, pdf_path, configuration=self._config)
+        finally:
+            if os.path.exists(html_path):
+                os.remove(html_path)
+        return pdf_path
+
+
+_worker_backend = None
+
+
+def _start_worker(engine, options):
+    global _worker_backend
+    _worker_backend = create_backend(engine, **options)
+    _worker_backend.warm_up()
+
+
+def _render_in_worker(report, pdf_path):
+    return _worker_backend.render(report, pdf_path)
+
+
+def _occupy_worker(seconds):
+    time.sleep(seconds)
+
+
+class ProcessPoolBackend(PdfBackend):
+    """
+    Renders reports with another backend in long-lived worker processes.
+
+    Workers are started once and keep their backend (and its fonts) loaded,
+    so several reports are rendered in parallel without the per-report
+    start-up cost and without holding the GIL of the web process. The news
+    of a report is collected before it is sent to a worker, so unlike the
+    in-process backends this one holds it in memory.
+
+    Args:
+        engine (str): Backend used by the workers, e.g. ``native``.
+        workers (int): Number of worker processes.
+        timeout (float): Seconds to wait for one report.
+        **options: Arguments of the worker backend.
+    """
+
+    def __init__(self, engine="native", workers=2, timeout=120, **options):
+        self.name = engine  # workers produce the same PDF as the engine itself
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_start_worker,
+            initargs=(engine, options),
+        )
+
+    def render(self, report, pdf_path):
+        # Generators cannot be sent to another process
+        report = {
+            **report,
+            "news_by_category": [
+                (category, list(items)) for category, items in report["news_by_category"]
+            ],
+        }
+        return self._executor.submit(_render_in_worker, report, pdf_path).result(
+            timeout=self.timeout
+        )
+
+    def warm_up(self):
+        # Workers are only started when all running ones are busy, so keep
+        # them busy until every worker process is up
+        tasks = [self._executor.submit(_occupy_worker, 0.5) for _ in range(self.workers)]
+        for task in tasks:
+            task.result(timeout=self.timeout)
+
+    def close(self):
+        self._executor.shutdown()
+
+
+def create_backend(name, **options):
+    """
+    Creates a PDF backend by name.
+
+    Args:
+        name (str): ``native``, ``wkhtmltopdf`` or ``pool``.
+        **options: Arguments of the backend class.
+
+    Returns:
+        PdfBackend: The backend.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    backends = {
+        "native": NativeBackend,
+        "wkhtmltopdf": WkhtmltopdfBackend,
+        "pool": ProcessPoolBackend,
+    }
+    if name not in backends:
+        raise ValueError(f"Unknown PDF backend {name!r}, use one of {', '.join(backends)}")
+    return backends[name](**options)
@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+
+class ReportStore:
+    """
+    Content-addressed store of generated PDF reports.
+
+    A report is stored under ``<root>/<date>/<locale>-<fingerprint>.pdf``,
+    where the fingerprint identifies the news (and template) it was built
+    from. The same (date, locale) is therefore only rendered again once the
+    underlying news changes, and reports in different languages never
+    overwrite each other. Files are written to a temporary name and renamed
+    into place, so readers never see a half-written PDF.
+
+    Args:
+        root (str): Directory holding the reports.
+        max_bytes (int): Total size above which the least recently used
+            reports are deleted.
+        max_age (float): Seconds after which an unused report is deleted.
+        in_use_for (float): Seconds a report returned by ``get`` or
+            ``get_or_create`` is kept even over ``max_bytes``, so it is not
+            deleted while it is being sent.
+    """
+
+    def __init__(
+        self, root="reports", max_bytes=500 * 1024 * 1024, max_age=30 * 86400, in_use_for=600
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.in_use_for = in_use_for
+        self._locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def path_for(self, date, locale, fingerprint):
+        """Returns where the report for this (date, locale, fingerprint) lives."""
+        return os.path.join(self.root, date, f"{locale}-{fingerprint}.pdf")
+
+    def get(self, date, locale, fingerprint):
+        """
+        Returns the path of a stored report, or None if it was never built.
+
+        Reading a report marks it as recently used for eviction.
+        """
+        path = self._touch(self.path_for(date, locale, fingerprint))
+        if path is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return path
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, date, locale, fingerprint, build):
+        """
+        Returns a stored report, building it first if needed.
+
+        Concurrent calls for the same report build it only once.
+
+        Args:
+            date (str): Date in YYYY-MM-DD format.
+            locale (str): Language of the report.
+            fingerprint (str): Fingerprint of the data the report is built from.
+            build (callable): Called with a temporary path to write the PDF to;
+                returns a false value if the report cannot be built.
+
+        Returns:
+            str: Path of the PDF, or None if ``build`` failed.
+        """
+        path = self._touch(self.path_for(date, locale, fingerprint))
+        if path is not None:
+            self.hits += 1
+            return path
+
+        key = (date, locale, fingerprint)
+        with self._locks_guard:
+            lock = self._locks[key]
+        try:
+            with lock:
+                path = self.path_for(date, locale, fingerprint)
+                if self._touch(path) is not None:
+                    self.hits += 1  # built by a concurrent call meanwhile
+                    return path
+
+                self.misses += 1
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Same directory, so the final rename is atomic; the hidden name
+                # keeps eviction away from files still being written
+                tmp_path = os.path.join(
+                    os.path.dirname(path), f".{uuid.uuid4().hex}-{os.path.basename(path)}"
+                )
+                try:
+                    if not build(tmp_path):
+                        return None
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+        finally:
+            # Also after a failed build, or every failed report would keep its lock
+            with self._locks_guard:
+                self._locks.pop(key, None)
+        self.evict()
+        return path
+
+    def evict(self):
+        """
+        Deletes reports older than ``max_age`` and then the least recently
+        used ones until the store fits in ``max_bytes``. Reports used within
+        the last ``in_use_for`` seconds are never deleted, as they may still
+        be on their way to a client or a mailbox.
+
+        Returns:
+            int: Number of files deleted.
+        """
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith(".") or not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        now = time.time()
+        cutoff = now - self.max_age
+        deleted = 0
+        for mtime, size, path in files:
+            if (mtime >= cutoff and total <= self.max_bytes) or mtime >= now - self.in_use_for:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+            try:
+                os.rmdir(os.path.dirname(path))  # only succeeds once empty
+            except OSError:
+                pass
+
+        self.evicted += deleted
+        return deleted
+
+    def stats(self):
+        """Returns hit/miss counters and the number of evicted reports."""
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted}
@@ -0,0 +1,134 @@
+from collections import Counter
+from datetime import timedelta
+
+from psycopg2.extras import execute_values
+
+
+def add_counts(cursor, days_and_categories):
+    """
+    Adds newly inserted articles to the ``news_daily_counts`` rollup.
+
+    Meant to run in the same transaction as the INSERT into ``news`` so the
+    rollup never drifts from the table.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Cursor of the inserting transaction.
+        days_and_categories (iterable): (publication date, category) of every
+            inserted article.
+    """
+    counts = Counter(days_and_categories)
+    if not counts:
+        return
+    execute_values(
+        cursor,
+        """
+        INSERT INTO news_daily_counts (day, category, count) VALUES %s
+        ON CONFLICT (day, category)
+        DO UPDATE SET count = news_daily_counts.count + EXCLUDED.count
+        """,
+        [(day, category, count) for (day, category), count in sorted(counts.items())],
+    )
+
+
+def rebuild_counts(pool, first_day=None, last_day=None):
+    """
+    Recomputes the rollup from the ``news`` table.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        first_day (date): First day to rebuild; from the beginning if None.
+        last_day (date): Last day to rebuild (inclusive); up to the end if None.
+
+    Returns:
+        int: Number of (day, category) rows written.
+    """
+    conditions = []
+    params = []
+    if first_day is not None:
+        conditions.append("day >= %s")
+        params.append(first_day)
+    if last_day is not None:
+        conditions.append("day <= %s")
+        params.append(last_day)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    # Same bounds on news, as timestamps so the published_at index is used
+    news_conditions = []
+    news_params = []
+    if first_day is not None:
+        news_conditions.append("published_at >= %s")
+        news_params.append(first_day)
+    if last_day is not None:
+        news_conditions.append("published_at < %s")
+        news_params.append(last_day + timedelta(days=1))
+    news_where = f"WHERE {' AND '.join(news_conditions)}" if news_conditions else ""
+
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE news_daily_counts IN EXCLUSIVE MODE")
+        cursor.execute(f"DELETE FROM news_daily_counts {where}", params)
+        cursor.execute(
+            f"""
+            INSERT INTO news_daily_counts (day, category, count)
+            SELECT DATE(published_at), category, COUNT(*)
+            FROM news {news_where}
+            GROUP BY DATE(published_at), category
+            """,
+            news_params,
+        )
+        return cursor.rowcount
+
+
+def counts_by_day(pool, first_day, last_day):
+    """
+    Returns the number of news per day, reading only the rollup.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        first_day (date): First day of the range.
+        last_day (date): Last day of the range (inclusive).
+
+    Returns:
+        dict: date -> count for every day of the range (0 for empty days).
+    """
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT day, SUM(count) FROM news_daily_counts
+            WHERE day BETWEEN %s AND %s
+            GROUP BY day
+            """,
+            (first_day, last_day),
+        )
+        found = dict(cursor.fetchall())
+
+    days = (last_day - first_day).days + 1
+    return {
+        first_day + timedelta(days=i): int(found.get(first_day + timedelta(days=i), 0))
+        for i in range(days)
+    }
+
+
+def counts_by_category(pool, first_day, last_day):
+    """
+    Returns the number of news per category over a range of days.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        first_day (date): First day of the range.
+        last_day (date): Last day of the range (inclusive).
+
+    Returns:
+        dict: category -> count for the categories that have news.
+    """
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT category, SUM(count) FROM news_daily_counts
+            WHERE day BETWEEN %s AND %s
+            GROUP BY category
+            HAVING SUM(count) > 0
+            ORDER BY category
+            """,
+            (first_day, last_day),
+        )
+        return {category: int(count) for category, count in cursor.fetchall()}
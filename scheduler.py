@@ -0,0 +1,166 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+# Arbitrary key for pg_try_advisory_lock so only one process ingests
+INGEST_LOCK_ID = 4_815_162_344
+
+
+class IngestScheduler:
+    """
+    Runs the news ingest job periodically in a background thread.
+
+    Only one ingest can be in flight at a time: a call to ``run_once`` made
+    while another run is still going returns immediately instead of hitting
+    the news API a second time.
+
+    With a ``pool``, this also holds across processes, e.g. the workers of
+    a gunicorn server that all start a scheduler. A run first takes a
+    PostgreSQL advisory lock on a connection of its own. The periodic
+    worker keeps the lock between runs, so only one process of all ingests
+    every ``interval``; the others skip their runs, and one of them takes
+    over when that process exits.
+
+    Args:
+        job (callable): Function performing one ingest run. It returns a dict
+            of article counts, e.g. ``{"fetched": 120, "inserted": 35}``.
+        interval (int): Number of seconds between the start of two runs.
+        pool (db.ConnectionPool): Pool whose connection parameters are used
+            for the lock (optional; without it, runs are only exclusive
+            within this process).
+    """
+
+    def __init__(self, job, interval, pool=None):
+        self.job = job
+        self.interval = interval
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_run = None
+        self._next_run_at = None
+        # Connection holding the advisory lock, while this process has it
+        self._lock_conn = None
+
+    def _take_ingest_lock(self):
+        """Returns whether this process holds the ingest lock (taking it if free)."""
+        if self._lock_conn is not None:
+            try:
+                with self._lock_conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                return True
+            except psycopg2.Error:
+                self._release_ingest_lock()  # the lock went with the connection
+
+        conn = psycopg2.connect(**self.pool.dsn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (INGEST_LOCK_ID,))
+            locked = cursor.fetchone()[0]
+        if locked:
+            self._lock_conn = conn
+        else:
+            conn.close()
+        return locked
+
+    def _release_ingest_lock(self):
+        conn, self._lock_conn = self._lock_conn, None
+        if conn is not None:
+            try:
+                conn.close()  # ends the session, which releases the lock
+            except psycopg2.Error:
+                pass
+
+    def run_once(self, keep_lock=False):
+        """
+        Runs the ingest job unless another run is already in progress.
+
+        Args:
+            keep_lock (bool): Keep the cross-process lock after the run, so
+                no other process ingests until this one stops.
+
+        Returns:
+            dict: Summary of the run, or None if the run was skipped.
+        """
+        if not self._lock.acquire(blocking=False):
+            print("⏭ Skip ingest — another run is in progress")
+            return None
+        if self.pool is not None:
+            held = self._lock_conn is not None
+            try:
+                locked = self._take_ingest_lock()
+            except psycopg2.Error as e:
+                print(f"❌ Ingest lock unavailable: {e}")
+                locked = False
+            if not locked:
+                self._lock.release()
+                print("⏭ Skip ingest — another process ingests")
+                return None
+            # A one-off run gives back a lock it did not hold before
+            keep_lock = keep_lock or held
+
+        started_at = datetime.now()
+        start = time.perf_counter()
+        run = {"started_at": started_at.isoformat(timespec="seconds")}
+        try:
+            run["counts"] = self.job() or {}
+            run["ok"] = True
+        except Exception as e:
+            print(f"❌ Ingest failed: {e}")
+            run["counts"] = {}
+            run["ok"] = False
+            run["error"] = str(e)
+        finally:
+            run["duration"] = round(time.perf_counter() - start, 3)
+            self._last_run = run
+            if not keep_lock:
+                self._release_ingest_lock()
+            self._lock.release()
+        return run
+
+    def run_forever(self):
+        """Runs the ingest job every ``interval`` seconds until ``stop`` is called."""
+        while not self._stop.is_set():
+            self.run_once(keep_lock=True)
+            self._next_run_at = datetime.now() + timedelta(seconds=self.interval)
+            self._stop.wait(self.interval)
+        with self._lock:
+            self._release_ingest_lock()
+
+    def start(self):
+        """Starts the periodic worker in a daemon thread (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run_forever, name="ingest-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Asks the periodic worker to exit after the current run."""
+        self._stop.set()
+
+    def status(self):
+        """
+        Returns the scheduler state for the status endpoint.
+
+        Returns:
+            dict: Whether a run is in progress and whether this process
+            holds the ingest lock, the refresh interval, the summary of the
+            last run and the time of the next one.
+        """
+        return {
+            "running": self._lock.locked(),
+            "holds_ingest_lock": self._lock_conn is not None,
+            "worker_alive": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "last_run": self._last_run,
+            "next_run_at": (
+                self._next_run_at.isoformat(timespec="seconds")
+                if self._next_run_at
+                else None
+            ),
+        }
@@ -0,0 +1,351 @@
+import re
+
+import psycopg2.extensions
+
+
+def add_news_url_keys(cursor):
+    """
+    Adds ``news.url_key``, the canonical URL that duplicates are found by.
+
+    ``url`` held the canonical URL for a while, and before that the URL as
+    published without any canonical form, so articles stored then were
+    stored again under another variant of their URL. Those later copies
+    are deleted here, and the daily counts lowered to match.
+    """
+    from dedup import fill_url_keys  # keeps NumPy out of plain schema checks
+
+    cursor.execute("ALTER TABLE news ADD COLUMN IF NOT EXISTS url_key TEXT")
+    fill_url_keys(cursor)
+    cursor.execute("CREATE INDEX news_url_key_idx ON news (url_key, id)")
+    cursor.execute(
+        """
+        WITH deleted AS (
+            DELETE FROM news
+            WHERE EXISTS (
+                SELECT 1 FROM news AS earlier
+                WHERE earlier.url_key = news.url_key AND earlier.id < news.id
+            )
+            RETURNING DATE(published_at) AS day, category
+        ),
+        counted AS (
+            SELECT day, category, count(*) AS deleted FROM deleted GROUP BY day, category
+        )
+        UPDATE news_daily_counts SET count = count - counted.deleted
+        FROM counted
+        WHERE news_daily_counts.day = counted.day
+            AND news_daily_counts.category = counted.category
+        """
+    )
+    cursor.execute(
+        """
+        ALTER TABLE news ALTER COLUMN url_key SET NOT NULL;
+        ALTER TABLE news DROP CONSTRAINT news_url_key;
+        ALTER TABLE news ADD CONSTRAINT news_url_key_published_at_key
+            UNIQUE (url_key, published_at);
+        DROP INDEX news_url_key_idx;
+        """
+    )
+
+
+# Applied in order, each one exactly once. Never edit a migration that has
+# already shipped: append a new one instead. A migration is SQL, or a
+# function of the cursor for changes that need Python.
+MIGRATIONS = [
+    (
+        "0001_create_news",
+        """
+        CREATE TABLE IF NOT EXISTS news (
+            id SERIAL PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            url TEXT NOT NULL UNIQUE,
+            source TEXT NOT NULL,
+            published_at TIMESTAMP NOT NULL,
+            category TEXT NOT NULL
+        );
+        """,
+    ),
+    (
+        "0002_news_published_at_indexes",
+        """
+        CREATE INDEX IF NOT EXISTS news_published_at_idx
+            ON news (published_at);
+        CREATE INDEX IF NOT EXISTS news_category_published_at_idx
+            ON news (category, published_at);
+        """,
+    ),
+    (
+        "0003_news_search_vector",
+        """
+        ALTER TABLE news ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS news_search_vector_idx
+            ON news USING GIN (search_vector);
+        """,
+    ),
+    (
+        "0004_news_daily_counts",
+        """
+        CREATE TABLE IF NOT EXISTS news_daily_counts (
+            day DATE NOT NULL,
+            category TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, category)
+        );
+        INSERT INTO news_daily_counts (day, category, count)
+        SELECT DATE(published_at), category, COUNT(*)
+        FROM news
+        GROUP BY DATE(published_at), category
+        ON CONFLICT (day, category) DO NOTHING;
+        """,
+    ),
+    (
+        "0005_chat_sessions",
+        """
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            turns JSONB NOT NULL DEFAULT '[]',
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS chat_sessions_updated_at_idx
+            ON chat_sessions (updated_at);
+        """,
+    ),
+    (
+        "0006_ingest_state",
+        """
+        CREATE TABLE IF NOT EXISTS ingest_state (
+            category TEXT PRIMARY KEY,
+            high_water TIMESTAMP NOT NULL,
+            fetched INTEGER NOT NULL DEFAULT 0,
+            truncated BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+        """,
+    ),
+    (
+        "0007_news_keyset_indexes",
+        """
+        CREATE INDEX IF NOT EXISTS news_published_at_id_idx
+            ON news (published_at, id);
+        CREATE INDEX IF NOT EXISTS news_category_published_at_id_idx
+            ON news (category, published_at, id);
+        DROP INDEX IF EXISTS news_published_at_idx;
+        DROP INDEX IF EXISTS news_category_published_at_idx;
+        """,
+    ),
+    (
+        "0008_news_clusters",
+        """
+        ALTER TABLE news ADD COLUMN IF NOT EXISTS cluster_id INTEGER;
+        UPDATE news SET cluster_id = id WHERE cluster_id IS NULL;
+        ALTER TABLE news ALTER COLUMN cluster_id SET NOT NULL;
+        -- Rows inserted without a cluster are a cluster of their own
+        CREATE OR REPLACE FUNCTION news_default_cluster() RETURNS trigger AS $$
+        BEGIN
+            NEW.cluster_id := COALESCE(NEW.cluster_id, NEW.id);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER news_default_cluster BEFORE INSERT ON news
+            FOR EACH ROW EXECUTE FUNCTION news_default_cluster();
+        CREATE INDEX IF NOT EXISTS news_cluster_id_idx ON news (cluster_id, id);
+        """,
+    ),
+    (
+        "0009_partition_news_by_month",
+        """
+        -- Unique constraints must include the partition key, so a URL is
+        -- unique per publication time; ingest checks URLs before inserting.
+        CREATE TABLE news_partitioned (
+            id INTEGER NOT NULL DEFAULT nextval('news_id_seq'),
+            title TEXT NOT NULL,
+            description TEXT,
+            url TEXT NOT NULL,
+            source TEXT NOT NULL,
+            published_at TIMESTAMP NOT NULL,
+            category TEXT NOT NULL,
+            search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED,
+            cluster_id INTEGER NOT NULL
+        ) PARTITION BY RANGE (published_at);
+        -- Catches rows of months without a partition yet (see storage.py)
+        CREATE TABLE news_default PARTITION OF news_partitioned DEFAULT;
+        DO $$
+        DECLARE
+            month TIMESTAMP;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', LEAST(min(published_at), now() AT TIME ZONE 'UTC')),
+                    date_trunc('month', now() AT TIME ZONE 'UTC'),
+                    interval '1 month'
+                )
+                FROM news
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF news_partitioned FOR VALUES FROM (%L) TO (%L)',
+                    'news_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END
+        $$;
+        INSERT INTO news_partitioned
+            (id, title, description, url, source, published_at, category, cluster_id)
+        SELECT id, title, description, url, source, published_at, category, cluster_id
+        FROM news;
+        ALTER SEQUENCE news_id_seq OWNED BY news_partitioned.id;
+        DROP TABLE news;
+        ALTER TABLE news_partitioned RENAME TO news;
+        ALTER TABLE news ADD CONSTRAINT news_pkey PRIMARY KEY (id, published_at);
+        ALTER TABLE news ADD CONSTRAINT news_url_key UNIQUE (url, published_at);
+        CREATE INDEX news_search_vector_idx ON news USING GIN (search_vector);
+        CREATE INDEX news_published_at_id_idx ON news (published_at, id);
+        CREATE INDEX news_category_published_at_id_idx ON news (category, published_at, id);
+        CREATE INDEX news_cluster_id_idx ON news (cluster_id, id);
+        CREATE TRIGGER news_default_cluster BEFORE INSERT ON news
+            FOR EACH ROW EXECUTE FUNCTION news_default_cluster();
+        ANALYZE news;
+        """,
+    ),
+    ("0010_news_url_key", add_news_url_keys),
+    (
+        "0011_news_urls",
+        """
+        -- One row per stored URL: news is partitioned by published_at, so
+        -- its own unique keys cannot keep a URL unique across months
+        CREATE TABLE IF NOT EXISTS news_urls (
+            url_key TEXT PRIMARY KEY,
+            published_at TIMESTAMP NOT NULL
+        );
+        INSERT INTO news_urls (url_key, published_at)
+        SELECT url_key, published_at FROM news
+        ON CONFLICT (url_key) DO NOTHING;
+        """,
+    ),
+    (
+        "0012_cache_versions",
+        """
+        -- Data versions of the response cache, shared by all workers
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        """,
+    ),
+    (
+        "0013_chat_sessions_version",
+        """
+        -- Bumped by every write, so a conversation is only written back if
+        -- nobody changed it since it was read
+        ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+        """,
+    ),
+    (
+        "0014_ingest_gaps",
+        """
+        -- Publication times that a truncated run skipped, fetched by the next runs
+        ALTER TABLE ingest_state ADD COLUMN IF NOT EXISTS gap_from TIMESTAMP;
+        ALTER TABLE ingest_state ADD COLUMN IF NOT EXISTS gap_to TIMESTAMP;
+        """,
+    ),
+]
+
+# Arbitrary key for pg_advisory_xact_lock so two migrators never race
+MIGRATION_LOCK_ID = 4_815_162_342
+
+
+def migrate(pool):
+    """
+    Applies all pending migrations.
+
+    Every migration runs in its own transaction together with the row that
+    records it in ``schema_migrations``.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+
+    Returns:
+        list: Names of the migrations applied by this call.
+    """
+    applied = []
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name TEXT PRIMARY KEY,
+                    applied_at TIMESTAMP NOT NULL DEFAULT now()
+                )
+                """
+            )
+        conn.commit()
+
+        for name, sql in MIGRATIONS:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+                cursor.execute("SELECT 1 FROM schema_migrations WHERE name = %s", (name,))
+                if cursor.fetchone() is None:
+                    if callable(sql):
+                        sql(cursor)
+                    else:
+                        cursor.execute(sql)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (name) VALUES (%s)", (name,)
+                    )
+                    applied.append(name)
+            conn.commit()
+    return applied
+
+
+def find_seq_scans(plan, table="news"):
+    """
+    Looks for sequential scans of a table in an ``EXPLAIN (FORMAT JSON)`` plan.
+
+    Args:
+        plan (dict): The plan node (``EXPLAIN`` output ``[0]["Plan"]``).
+        table (str): The relation to look for; scans of its partitions
+            (``news_2025_04``, ``news_default``) count too.
+
+    Returns:
+        list: Plan nodes that scan ``table`` sequentially.
+    """
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and re.fullmatch(
+        rf"{table}(_\d{{4}}_\d{{2}}|_default)?", plan.get("Relation Name", "")
+    ):
+        found.append(plan)
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child, table))
+    return found
+
+
+class PlanRecordingCursor(psycopg2.extensions.cursor):
+    """
+    Cursor that records the ``EXPLAIN`` plan of every query it runs that
+    starts with SELECT or WITH.
+
+    Plans are appended to the class-level ``plans`` list as
+    ``(query, plan)`` pairs; the query itself still runs normally. Queries
+    of named (server-side) cursors are explained on a plain cursor of the
+    same connection.
+    """
+
+    plans = []
+
+    def execute(self, query, vars=None):
+        if query.lstrip().upper().startswith(("SELECT", "WITH")):
+            explain = self if self.name is None else self.connection.cursor()
+            psycopg2.extensions.cursor.execute(explain, "EXPLAIN (FORMAT JSON) " + query, vars)
+            self.plans.append((query, explain.fetchone()[0][0]["Plan"]))
+            if explain is not self:
+                explain.close()
+        return super().execute(query, vars)
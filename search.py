@@ -0,0 +1,144 @@
+import html
+
+from db import decode_cursor, encode_cursor
+
+# Control characters never appear in news text, so they can mark matches
+# before the text is HTML-escaped and the marks are turned into <mark> tags
+START_SEL = "\x02"
+STOP_SEL = "\x03"
+HEADLINE_OPTIONS = f"StartSel={START_SEL}, StopSel={STOP_SEL}"
+
+# The tsquery is spelled out in each clause (rather than in a CTE) so the
+# planner folds it into a constant and can estimate how many rows match
+TSQUERY = "websearch_to_tsquery('english', %(query)s)"
+
+# One match more than the candidates is read to tell whether some were cut off
+SEARCH_SQL = """
+    WITH matches AS (
+        SELECT id, title, description, url, source, published_at, search_vector
+        FROM news
+        WHERE search_vector @@ {tsquery} {filters}
+        ORDER BY published_at DESC, id DESC
+        LIMIT %(candidates)s + 1
+    ),
+    candidates AS (
+        SELECT * FROM matches
+        ORDER BY published_at DESC, id DESC
+        LIMIT %(candidates)s
+    ),
+    page AS (
+        SELECT id, title, description, url, source, published_at,
+               ts_rank(search_vector, {tsquery}) AS rank
+        FROM candidates
+        WHERE true {keyset}
+        ORDER BY rank DESC, id DESC
+        LIMIT %(limit)s
+    )
+    SELECT id, title, description, url, source, published_at, rank,
+           ts_headline('english', title, {tsquery}, %(title_options)s),
+           ts_headline('english', coalesce(description, ''), {tsquery},
+                       %(description_options)s),
+           truncated
+    FROM (SELECT count(*) > %(candidates)s AS truncated FROM matches) AS counted
+    LEFT JOIN page ON true
+    ORDER BY rank DESC, id DESC
+"""
+
+
+def highlight(text):
+    """Escapes a ``ts_headline`` fragment and wraps the matches in ``<mark>``."""
+    return (
+        html.escape(text)
+        .replace(START_SEL, "<mark>")
+        .replace(STOP_SEL, "</mark>")
+    )
+
+
+def search_articles(
+    pool, query, start=None, end=None, limit=50, cursor=None, candidates=1000
+):
+    """
+    Full-text searches news titles and descriptions.
+
+    Matches use the ``search_vector`` column (title weighted above the
+    description) and its GIN index. Results are ordered by relevance and
+    paginated with a keyset cursor on ``(rank, id)``. Only the ``candidates``
+    most recent matches are ranked, so words that appear in a large share of
+    the archive do not make every search rank the whole table; older
+    matches are left out and the result is marked ``truncated``, and a
+    narrower date range reaches them.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connection from.
+        query (str): Search text; supports quoted phrases, ``or`` and ``-word``.
+        start (datetime): Optional inclusive lower bound of ``published_at``.
+        end (datetime): Optional exclusive upper bound of ``published_at``.
+        limit (int): Page size.
+        cursor (str): ``next_cursor`` from the previous page.
+        candidates (int): Maximum number of matches considered for ranking.
+
+    Returns:
+        dict: ``results`` (articles with ``title_html`` and ``description_html``
+        highlights), ``next_cursor`` (None on the last page) and
+        ``truncated`` (whether more than ``candidates`` articles matched).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    filters = []
+    keyset = ""
+    params = {
+        "query": query,
+        "limit": limit,
+        "candidates": candidates,
+        "title_options": HEADLINE_OPTIONS + ", HighlightAll=true",
+        "description_options": HEADLINE_OPTIONS + ", MaxFragments=2, MaxWords=30",
+    }
+    if start is not None:
+        filters.append("published_at >= %(start)s")
+        params["start"] = start
+    if end is not None:
+        filters.append("published_at < %(end)s")
+        params["end"] = end
+    if cursor:
+        try:
+            rank, last_id = decode_cursor(cursor)
+            params["rank"] = float(rank)
+            params["last_id"] = int(last_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
+        # rank is stored as real, so compare against a real as well
+        keyset = (
+            f" AND (ts_rank(search_vector, {TSQUERY}), id)"
+            " < (%(rank)s::real, %(last_id)s)"
+        )
+
+    sql = SEARCH_SQL.format(
+        tsquery=TSQUERY,
+        filters="".join(f" AND {f}" for f in filters),
+        keyset=keyset,
+    )
+    with pool.connection() as conn, conn.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+    truncated = rows[0][-1]
+    # Without matches on the page, the one row only says whether matches were cut off
+    rows = [row[:-1] for row in rows if row[0] is not None]
+
+    results = [
+        {
+            "title": title,
+            "description": description,
+            "url": url,
+            "source": source,
+            "published_at": published_at,
+            "rank": rank,
+            "title_html": highlight(title_hl),
+            "description_html": highlight(description_hl),
+        }
+        for _, title, description, url, source, published_at, rank, title_hl, description_hl in rows
+    ]
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor([rows[-1][6], rows[-1][0]])
+    return {"results": results, "next_cursor": next_cursor, "truncated": truncated}
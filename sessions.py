@@ -0,0 +1,264 @@
+import json
+import re
+import threading
+
+from cache import LRUCache
+
+
+def summarize_turns(summary, turns, max_chars=1500):
+    """
+    Extractive summary of a conversation, used when no model is available.
+
+    Keeps every question and the first sentence of every answer.
+
+    Args:
+        summary (str): Summary of the turns before these ones.
+        turns (list): Turns to add, dicts with ``user`` and ``ai``.
+        max_chars (int): Maximum length; the oldest lines are dropped first.
+
+    Returns:
+        str: The new summary.
+    """
+    lines = [summary] if summary else []
+    for turn in turns:
+        answer = re.split(r"(?<=[.!?])\s", turn["ai"].strip(), maxsplit=1)[0]
+        lines.append(f"- Asked: {turn['user']} Answered: {answer}")
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)[-max_chars:]
+
+
+class MemorySessionBackend:
+    """
+    Keeps chat sessions in this process, dropping the least recently used.
+
+    Args:
+        max_entries (int): Maximum number of sessions.
+        ttl (float): Seconds of inactivity after which a session expires.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self._cache = LRUCache(max_entries=max_entries, ttl=ttl)
+        # Only held to compare and swap a version, never while summarizing
+        self._lock = threading.Lock()
+
+    def get(self, chat_id):
+        return self.read(chat_id)[0]
+
+    def read(self, chat_id):
+        """Returns (conversation or None, version) of a chat."""
+        entry = self._cache.get(chat_id)
+        return entry if entry is not None else (None, None)
+
+    def replace(self, chat_id, conversation, version):
+        """
+        Stores a conversation if the chat is still at ``version``.
+
+        Returns:
+            bool: False if another change came first.
+        """
+        size = len(conversation["summary"]) + sum(
+            len(t["user"]) + len(t["ai"]) for t in conversation["turns"]
+        )
+        with self._lock:
+            if self.read(chat_id)[1] != version:
+                return False
+            self._cache.set(chat_id, (conversation, (version or 0) + 1), size=size)
+            return True
+
+    def delete(self, chat_id):
+        self._cache.delete(chat_id)
+
+    def purge(self):
+        """Expired sessions are dropped by the LRU cache itself."""
+        return 0
+
+
+class PostgresSessionBackend:
+    """
+    Keeps chat sessions in the ``chat_sessions`` table, shared by all workers.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow connections from.
+        ttl (float): Seconds of inactivity after which a session expires.
+    """
+
+    def __init__(self, pool, ttl=3600):
+        self.pool = pool
+        self.ttl = ttl
+
+    def get(self, chat_id):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """SELECT summary, turns FROM chat_sessions
+                   WHERE id = %s AND updated_at > now() - %s * interval '1 second'""",
+                (chat_id, self.ttl),
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return {"summary": row[0], "turns": row[1]}
+
+    def read(self, chat_id):
+        """
+        Returns (conversation or None, version) of a chat.
+
+        An expired session has no conversation but keeps the version of its
+        row, so replacing it still notices a concurrent change.
+        """
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """SELECT summary, turns, version,
+                       updated_at > now() - %s * interval '1 second'
+                   FROM chat_sessions WHERE id = %s""",
+                (self.ttl, chat_id),
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None, None
+        summary, turns, version, live = row
+        return ({"summary": summary, "turns": turns} if live else None), version
+
+    def replace(self, chat_id, conversation, version):
+        """
+        Stores a conversation if its row is still at ``version``.
+
+        The check and the write are one statement, so no row lock is held
+        between reading a conversation and writing it back.
+
+        Returns:
+            bool: False if another change came first.
+        """
+        values = (conversation["summary"], json.dumps(conversation["turns"]), chat_id)
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            if version is None:
+                cursor.execute(
+                    """INSERT INTO chat_sessions (summary, turns, id, updated_at)
+                       VALUES (%s, %s, %s, now())
+                       ON CONFLICT (id) DO NOTHING""",
+                    values,
+                )
+            else:
+                cursor.execute(
+                    """UPDATE chat_sessions
+                       SET summary = %s, turns = %s, updated_at = now(), version = version + 1
+                       WHERE id = %s AND version = %s""",
+                    (*values, version),
+                )
+            return cursor.rowcount == 1
+
+    def delete(self, chat_id):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM chat_sessions WHERE id = %s", (chat_id,))
+
+    def purge(self):
+        """Deletes expired sessions and returns how many there were."""
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM chat_sessions WHERE updated_at <= now() - %s * interval '1 second'",
+                (self.ttl,),
+            )
+            return cursor.rowcount
+
+
+class ChatSessionStore:
+    """
+    Server-side chat conversations, referenced from the session cookie by id.
+
+    A conversation is a list of structured turns plus a summary of older
+    turns. Once more than ``2 * keep_turns`` turns are stored, the oldest
+    ``keep_turns`` are folded into the summary. Folding in batches keeps the
+    rendered history a stable prefix of the next prompt for several turns
+    in a row, instead of shifting on every turn like a truncated string.
+
+    Args:
+        backend: ``MemorySessionBackend`` or ``PostgresSessionBackend``.
+        summarize (callable): ``summarize(summary, turns)`` returning the new
+            summary; ``summarize_turns`` if None or if it fails.
+        keep_turns (int): Turns that are always kept word for word.
+        purge_every (int): Expired sessions are purged every this many writes.
+    """
+
+    def __init__(self, backend, summarize=None, keep_turns=6, purge_every=500):
+        self.backend = backend
+        self.summarize = summarize
+        self.keep_turns = keep_turns
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.summaries = 0
+        self.summary_failures = 0
+        self.purged = 0
+
+    def load(self, chat_id):
+        """Returns the conversation of a chat, empty if it is new or expired."""
+        return self.backend.get(chat_id) or {"summary": "", "turns": []}
+
+    def append(self, chat_id, question, answer):
+        """
+        Adds a finished turn to a conversation, summarizing old turns if needed.
+
+        The conversation is read, changed and written back only if nobody
+        changed it in between; otherwise the turn is added again to the new
+        state. No lock is held while old turns are summarized, which may
+        take a model call, so turns finishing at the same time in one chat
+        (e.g. a new answer and one still being saved after the client went
+        away) are both kept without blocking each other.
+
+        Args:
+            chat_id (str): Id of the chat.
+            question (str): The user's message.
+            answer (str): The model's reply.
+        """
+        summaries = {}  # a retry folding the same turns reuses the summary
+        while True:
+            conversation, version = self.backend.read(chat_id)
+            conversation = conversation or {"summary": "", "turns": []}
+            turns = conversation["turns"] + [{"user": question, "ai": answer}]
+            summary = conversation["summary"]
+            if len(turns) > 2 * self.keep_turns:
+                old, turns = turns[: self.keep_turns], turns[self.keep_turns :]
+                key = json.dumps([summary, old])
+                if key not in summaries:
+                    summaries[key] = self._summarize(summary, old)
+                summary = summaries[key]
+            if self.backend.replace(chat_id, {"summary": summary, "turns": turns}, version):
+                break
+
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self.purged += self.backend.purge()
+
+    def _summarize(self, summary, turns):
+        self.summaries += 1
+        if self.summarize is not None:
+            try:
+                return self.summarize(summary, turns)
+            except Exception as e:
+                self.summary_failures += 1
+                print(f"❌ Summarizing the chat failed, keeping an extract: {e}")
+        return summarize_turns(summary, turns)
+
+    def clear(self, chat_id):
+        """Forgets a conversation."""
+        self.backend.delete(chat_id)
+
+    @staticmethod
+    def render(conversation):
+        """Formats a conversation for the prompt."""
+        lines = []
+        if conversation["summary"]:
+            lines.append(f"Summary of the earlier conversation:\n{conversation['summary']}\n")
+        for turn in conversation["turns"]:
+            lines.append(f"User: {turn['user']}\nAI: {turn['ai']}")
+        return "\n".join(lines)
+
+    def stats(self):
+        """Returns how often old turns were summarized and sessions purged."""
+        return {
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "purged": self.purged,
+        }
@@ -73,43 +73,64 @@ filterButton.addEventListener("click", async () => {
         return;
     }
 
-    const newsData = await fetchData(
-        `/news-by-category-and-date?category=${category}&date=${date}`
-    );
     const newsContainer = document.getElementById("newsContainer");
     newsContainer.innerHTML = "";
-
-    if (newsData.length === 0) {
+    const params = new URLSearchParams({ category, date });
+    const found = await loadArticlesPage(newsContainer, params, null);
+    if (!found) {
         newsContainer.innerHTML = "<p>No data</p>";
         newsContainer.style.display = "block";
         return;
     }
+    newsContainer.style.display = "grid";
+});
+
+// Only what the news cards show is requested, a page at a time
+const ARTICLE_FIELDS = "title,description,url";
+
+// Appends one page of /articles to a container; returns the number of articles
+const loadArticlesPage = async (container, params, cursor) => {
+    const query = new URLSearchParams(params);
+    query.set("fields", ARTICLE_FIELDS);
+    if (cursor) query.set("cursor", cursor);
+    const page = await fetchData(`/articles?${query}`);
+    if (!page.results) {
+        return 0;
+    }
+
+    container.querySelector(".articles-more")?.remove();
 
-    newsData.forEach((news) => {
+    page.results.forEach((news) => {
         const div = document.createElement("div");
         div.classList.add("news-item");
-        div.innerHTML = `<h3>${news.title}</h3><p>${news.description}</p><div class="card-link-container"><a href="${news.url}" target="_blank">Read more</a></div>`;
-        newsContainer.appendChild(div);
+        div.innerHTML = `<h3>${news.title}</h3><p>${news.description ?? ""}</p><div class="card-link-container"><a href="${news.url}" target="_blank">Read more</a></div>`;
+        container.appendChild(div);
     });
-    newsContainer.style.display = "grid";
-});
+
+    if (page.next_cursor) {
+        const more = document.createElement("button");
+        more.classList.add("btn", "articles-more");
+        more.innerText = "Show more";
+        more.addEventListener("click", () =>
+            loadArticlesPage(container, params, page.next_cursor)
+        );
+        container.appendChild(more);
+    }
+    return page.results.length;
+};
 
 const loadNewsByDate = async (date) => {
     const newsContainer = document.getElementById("newsContainer");
     newsContainer.innerHTML = "";
-    const newsData = await fetchData(`/news-by-date?date=${date}`);
+    const found = await loadArticlesPage(
+        newsContainer,
+        new URLSearchParams({ date }),
+        null
+    );
 
-    if (newsData.length === 0) {
+    if (!found) {
         newsContainer.innerHTML = "<p>No data</p>";
-        return;
     }
-
-    newsData.forEach((news) => {
-        const div = document.createElement("div");
-        div.classList.add("news-item");
-        div.innerHTML = `<h3>${news.title}</h3><p>${news.description}</p><a href="${news.url}" target="_blank">Read more</a>`;
-        newsContainer.appendChild(div);
-    });
 };
 
 loadDayChart.addEventListener("click", async () => {
@@ -126,16 +147,21 @@ reportForm.addEventListener("submit", async (event) => {
     const loaderAnimation = document.getElementById("loaderAnimation");
     loaderAnimation.classList.remove("report-non-visible");
     loaderAnimation.classList.add("report-visible");
+    const emailStatus = document.getElementById("status");
     const response = await fetch("/send-report", {
         method: "POST",
         headers: {
             "Content-Type": "application/x-www-form-urlencoded",
         },
-        body: `date=${date}&email=${email}`,
+        body: `date=${encodeURIComponent(date)}&email=${encodeURIComponent(email)}`,
     });
     const result = await response.json();
-    const emailStatus = document.getElementById("status");
     emailStatus.innerText = result.message;
+
+    if (response.status === 202) {
+        emailStatus.innerText = await waitForReport(result.status_url, emailStatus);
+    }
+
     setTimeout(() => {
         emailStatus.innerText = "";
     }, 3000);
@@ -143,6 +169,29 @@ reportForm.addEventListener("submit", async (event) => {
     loaderAnimation.classList.add("report-non-visible");
 });
 
+// Polls the report job until it finishes; returns the final message
+const waitForReport = async (statusUrl, emailStatus) => {
+    while (true) {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        let job;
+        try {
+            job = await fetchData(statusUrl);
+        } catch (error) {
+            console.error("Error polling report status:", error);
+            return "❌ Could not check the report status";
+        }
+        if (job.status === "done") {
+            return job.result;
+        }
+        if (job.status === "failed" || !job.status) {
+            return `❌ ${job.error || job.message}`;
+        }
+        if (job.status === "retrying") {
+            emailStatus.innerText = "⏳ Mail server is busy, retrying...";
+        }
+    }
+};
+
 searchButton.addEventListener("click", async () => {
     const query = document.getElementById("searchInput").value.trim();
     const date = document.getElementById("searchDate").value.trim();
@@ -173,59 +222,115 @@ searchButton.addEventListener("click", async () => {
 
     hideError();
 
-    let results;
+    container.innerHTML = "";
+    const found = await loadSearchPage(query, date, null);
+    if (found === null) {
+        showError("Something went wrong while searching");
+        return;
+    }
+    if (found === 0) {
+        showError("Your search query is not found");
+        return;
+    }
+
+    container.style.display = "grid";
+    isSearchButtonClicked = true;
+});
+
+// Appends one page of search results; returns the number of results or null on error
+const loadSearchPage = async (query, date, cursor) => {
+    const container = document.getElementById("searchResults");
+    let page;
     try {
         const url = `/search?q=${encodeURIComponent(query)}${
             date ? `&date=${encodeURIComponent(date)}` : ""
-        }`;
+        }${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`;
         const response = await fetch(url);
 
-        results = await response.json();
+        page = await response.json();
     } catch (error) {
         console.error("Error fetching search results:", error);
-        showError("Something went wrong while searching");
-        return;
+        return null;
     }
-
-    if (results.length === 0) {
-        showError("Your search query is not found");
-        return;
+    if (!page.results) {
+        return null;
     }
 
-    hideError();
-    container.innerHTML = "";
+    container.querySelector(".search-more")?.remove();
 
-    results.forEach((news) => {
+    page.results.forEach((news) => {
         const div = document.createElement("div");
         div.classList.add("news-item");
 
-        const regex = new RegExp(`(${query})`, "gi");
-        const title = news.title.replace(regex, `<mark>$1</mark>`);
-        const description = (news.description || "").replace(
-            regex,
-            `<mark>$1</mark>`
-        );
-
+        // Matches are already wrapped in <mark> (and the text escaped) by the server
         div.innerHTML = `
-            <h3>${title}</h3>
-            <p>${description}</p>
+            <h3>${news.title_html}</h3>
+            <p>${news.description_html}</p>
             <a href="${news.url}" target="_blank">Read more</a>
         `;
         container.appendChild(div);
     });
 
-    container.style.display = "grid";
-    isSearchButtonClicked = true;
-});
+    if (page.next_cursor) {
+        const more = document.createElement("button");
+        more.classList.add("btn", "search-more");
+        more.innerText = "Show more";
+        more.addEventListener("click", () =>
+            loadSearchPage(query, date, page.next_cursor)
+        );
+        container.appendChild(more);
+    } else if (page.truncated) {
+        const note = document.createElement("p");
+        note.classList.add("search-more");
+        note.innerText = "Only the most recent matches are shown. Pick a date to search older news.";
+        container.appendChild(note);
+    }
+    return page.results.length;
+};
+
+// Answer being streamed; sending a new message cancels it on the server too
+let chatController = null;
+
+const hideChatLoader = (loader) => {
+    loader.classList.remove("loader-visible"); // ховаємо після завершення
+    loader.style.height = "0px";
+    loader.style.width = "0px";
+    loader.style.margin = "0px";
+};
+
+// Reads a text/event-stream response and calls onEvent(event, data) per event
+const readEvents = async (res, onEvent) => {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let end;
+        while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            let event = "message";
+            let data = "";
+            for (const line of frame.split("\n")) {
+                if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            onEvent(event, data ? JSON.parse(data) : {});
+        }
+    }
+};
 
 const sendChat = async () => {
     const date = document.getElementById("chatDate").value;
     const category = document.getElementById("chatCategory").value;
+    const scope = document.getElementById("chatScope").value;
     const input = document.getElementById("chatInput");
     const box = document.getElementById("chatBox");
     const msg = input.value.trim();
     const loader = document.getElementById("responseLoader");
-    if (!msg || !date) {
+    if (!msg || (!date && scope !== "all")) {
         box.insertAdjacentHTML(
             "beforeend",
             `<p class="user-request">Error, input message or select date</p>`
@@ -233,6 +338,10 @@ const sendChat = async () => {
         return;
     }
 
+    if (chatController) chatController.abort();
+    const controller = new AbortController();
+    chatController = controller;
+
     loader.classList.add("loader-visible"); // показуємо анімацію
     loader.style.height = "100px";
     loader.style.width = "100px";
@@ -244,34 +353,53 @@ const sendChat = async () => {
     );
     input.value = "...";
 
+    // The reply is filled in chunk by chunk as the server streams it
+    const reply = document.createElement("p");
+    reply.className = "user-request";
+    reply.innerHTML = "<b>🤖 AI:</b> ";
+    const text = document.createElement("span");
+    reply.appendChild(text);
+
+    const show = (chunk) => {
+        if (!reply.isConnected) {
+            hideChatLoader(loader);
+            box.appendChild(reply);
+        }
+        text.textContent += chunk;
+        box.scrollTop = box.scrollHeight;
+    };
+
     try {
-        const res = await fetch("/chat", {
+        const res = await fetch("/chat/stream", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({
                 message: msg,
                 date: date,
                 category: category,
+                scope: scope,
             }),
+            signal: controller.signal,
+        });
+        if (!res.ok) {
+            const data = await res.json();
+            throw new Error(data.error || res.statusText);
+        }
+
+        await readEvents(res, (event, data) => {
+            if (event === "error") show(" ❌ Error occurred");
+            else if (data.text) show(data.text);
         });
-
-        const data = await res.json();
-
-        box.insertAdjacentHTML(
-            "beforeend",
-            `<p class="user-request"><b>🤖 AI:</b> ${data.response}</p>`
-        );
     } catch (err) {
-        box.insertAdjacentHTML(
-            "beforeend",
-            `<p class="user-request"><b>🤖 AI:</b> ❌ Error occurred</p>`
-        );
-        console.error(err);
+        if (err.name !== "AbortError") {
+            show("❌ Error occurred");
+            console.error(err);
+        }
     } finally {
-        input.value = "";
-        loader.classList.remove("loader-visible"); // ховаємо після завершення
-        loader.style.height = "0px";
-        loader.style.width = "0px";
-        loader.style.margin = "0px";
+        if (chatController === controller) {
+            chatController = null;
+            input.value = "";
+            hideChatLoader(loader);
+        }
     }
 };
@@ -0,0 +1,394 @@
+import csv
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+from dedup import fill_url_keys
+from rollup import rebuild_counts
+
+# Columns written to archives and restored from them; search_vector is
+# generated from title and description, and url_key is derived from url
+ARCHIVE_COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "url",
+    "source",
+    "published_at",
+    "category",
+    "cluster_id",
+)
+PARTITION_NAME = re.compile(r"news_(\d{4})_(\d{2})")
+DEFAULT_PARTITION = "news_default"
+# Marks a partition brought back from an archive (see ``restore``)
+RESTORED_COMMENT = "restored"
+# Arbitrary key for pg_advisory_xact_lock so two processes never change
+# the partitions at the same time
+PARTITION_LOCK_ID = 4_815_162_343
+
+PARTITIONS_SQL = """
+    SELECT c.relname, obj_description(c.oid, 'pg_class')
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'news'::regclass
+"""
+
+
+def month_start(value):
+    """First moment of the month of a date or datetime."""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, months):
+    """The first of the month ``months`` after (or before) ``month``."""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Name of the partition holding a month, e.g. ``news_2025_04``."""
+    return f"news_{month:%Y_%m}"
+
+
+class NewsStorage:
+    """
+    Manages the monthly partitions of ``news``: creates them ahead of time,
+    archives and drops those past the retention period, and restores them
+    from their archives.
+
+    ``news`` is partitioned by ``published_at`` month. Rows of a month
+    without a partition go to the ``news_default`` partition, so an insert
+    never fails; ``create_partitions`` moves them into a partition of
+    their own. Date-filtered queries only read the partitions of their
+    dates, and old months are removed by detaching a partition instead of
+    deleting rows.
+
+    An archive is a gzip-compressed CSV of a month's rows, next to a JSON
+    manifest with the number of rows, in ``archive_dir``. The URLs of
+    archived articles stay in ``news_urls``, so ingest does not store
+    them again.
+
+    Args:
+        pool (db.ConnectionPool): Pool to borrow the connections from.
+        archive_dir (str): Directory of the archives.
+        months_ahead (int): Months after the current one that get a
+            partition in advance.
+        retention_months (int): Months kept in the table, the current one
+            included; older ones are archived. 0 keeps everything.
+    """
+
+    def __init__(self, pool, archive_dir="archive", months_ahead=2, retention_months=0):
+        self.pool = pool
+        self.archive_dir = archive_dir
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+
+    def _archive_path(self, month, suffix=".csv.gz"):
+        return os.path.join(self.archive_dir, partition_name(month) + suffix)
+
+    def partitions(self, cursor=None):
+        """
+        Lists the monthly partitions.
+
+        Args:
+            cursor: Cursor to use (optional, a pooled connection otherwise).
+
+        Returns:
+            dict: First day of the month (datetime) -> whether the partition
+            was restored from an archive.
+        """
+        if cursor is None:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                return self.partitions(cursor)
+        cursor.execute(PARTITIONS_SQL)
+        months = {}
+        for name, comment in cursor.fetchall():
+            match = PARTITION_NAME.fullmatch(name)
+            if match:
+                months[datetime(int(match[1]), int(match[2]), 1)] = comment == RESTORED_COMMENT
+        return months
+
+    def archives(self):
+        """
+        Lists the archived months.
+
+        Returns:
+            dict: First day of the month -> manifest of the archive.
+        """
+        if not os.path.isdir(self.archive_dir):
+            return {}
+        archives = {}
+        for name in os.listdir(self.archive_dir):
+            match = PARTITION_NAME.fullmatch(name.removesuffix(".json"))
+            if match and name.endswith(".json"):
+                with open(os.path.join(self.archive_dir, name)) as f:
+                    archives[datetime(int(match[1]), int(match[2]), 1)] = json.load(f)
+        return archives
+
+    def _create_partition(self, cursor, month, load=None):
+        """
+        Adds the partition of a month, with the month's rows from the
+        default partition and, with ``load``, an archive's rows.
+
+        The partition is filled as a standalone table and then attached,
+        which only locks ``news`` against schema changes, not reads or
+        writes.
+        """
+        name = partition_name(month)
+        columns = ", ".join(ARCHIVE_COLUMNS)
+        stored = f"{columns}, url_key"
+        bounds = {"start": month, "end": add_months(month, 1)}
+        cursor.execute(
+            f"CREATE TABLE {name} "
+            "(LIKE news INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE published_at >= %(start)s AND published_at < %(end)s
+                RETURNING {stored}
+            )
+            INSERT INTO {name} ({stored}) SELECT {stored} FROM moved
+            """,
+            bounds,
+        )
+        moved = cursor.rowcount
+        if load is not None:
+            cursor.execute(f"ALTER TABLE {name} ALTER COLUMN url_key DROP NOT NULL")
+            cursor.copy_expert(f"COPY {name} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER)", load)
+            fill_url_keys(cursor, name)
+            cursor.execute(f"ALTER TABLE {name} ALTER COLUMN url_key SET NOT NULL")
+        cursor.execute(
+            f"ALTER TABLE news ATTACH PARTITION {name} FOR VALUES FROM (%(start)s) TO (%(end)s)",
+            bounds,
+        )
+        return moved
+
+    def create_partitions(self, now=None):
+        """
+        Creates the partitions of the coming months and of the months that
+        have rows in the default partition.
+
+        Args:
+            now (datetime): Current UTC time (optional).
+
+        Returns:
+            list: First days of the months whose partition was created.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        current = month_start(now)
+        wanted = {add_months(current, i) for i in range(self.months_ahead + 1)}
+        created = []
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_ID,))
+            cursor.execute(
+                f"SELECT DISTINCT date_trunc('month', published_at) FROM {DEFAULT_PARTITION}"
+            )
+            wanted.update(month for (month,) in cursor.fetchall())
+            existing = self.partitions(cursor)
+            for month in sorted(wanted - set(existing)):
+                moved = self._create_partition(cursor, month)
+                created.append(month)
+                print(f"🗂 Created partition {partition_name(month)} ({moved} rows moved)")
+        return created
+
+    def _archived_ids(self, month):
+        """Ids of the rows in a month's archive, empty if there is none."""
+        try:
+            with gzip.open(self._archive_path(month), "rt", newline="") as f:
+                reader = csv.reader(f)
+                next(reader, None)  # header
+                return {int(row[0]) for row in reader}
+        except FileNotFoundError:
+            return set()
+
+    def archive(self, month):
+        """
+        Archives one month and drops its partition.
+
+        The rows are written to ``<archive_dir>/news_YYYY_MM.csv.gz`` and
+        the file is synced to disk before the partition is detached and
+        dropped. If the month was archived before, the archive is extended
+        with the partition's rows that it does not hold yet: rows of a
+        partition restored from it, or rows written by an earlier attempt
+        whose drop failed, are not added twice. The manifest is only
+        written once the drop is committed, so a month whose drop failed
+        keeps its partition and its previous manifest (none for a first
+        archive, which then is not listed by ``archives``). The month's
+        daily counts are rebuilt.
+
+        Args:
+            month (datetime): First day of the month.
+
+        Returns:
+            int: Number of archived rows.
+        """
+        name = partition_name(month)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self._archive_path(month)
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_ID,))
+            # Blocks writes to the month while it is copied
+            cursor.execute(f"LOCK TABLE {name} IN SHARE MODE")
+            archived = self._archived_ids(month)
+            extend = os.path.exists(path)
+            new_rows = cursor.mogrify(
+                f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {name} WHERE id <> ALL(%s) ORDER BY id",
+                (sorted(archived),),
+            ).decode()
+            # The gzip trailer is only written on close, so the file is
+            # synced after the GzipFile, not inside it
+            with open(f"{path}.tmp", "wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                    if extend:
+                        with gzip.open(path, "rb") as previous:
+                            while chunk := previous.read(1024 * 1024):
+                                f.write(chunk)
+                    cursor.copy_expert(
+                        f"COPY ({new_rows}) "
+                        f"TO STDOUT WITH (FORMAT csv, HEADER {'false' if extend else 'true'})",
+                        f,
+                    )
+                raw.flush()
+                os.fsync(raw.fileno())
+            rows = len(archived) + cursor.rowcount
+            os.replace(f"{path}.tmp", path)
+            cursor.execute(f"ALTER TABLE news DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+        manifest = {
+            "month": f"{month:%Y-%m}",
+            "rows": rows,
+            "columns": list(ARCHIVE_COLUMNS),
+            "archived_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        manifest_path = self._archive_path(month, ".json")
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        rebuild_counts(self.pool, month.date(), add_months(month, 1).date() - timedelta(days=1))
+        print(f"📦 Archived {rows} articles of {month:%Y-%m} to {path}")
+        return rows
+
+    def apply_retention(self, now=None, include_restored=False, months=None):
+        """
+        Archives the months older than the retention period.
+
+        Args:
+            now (datetime): Current UTC time (optional).
+            include_restored (bool): Also archive months restored with
+                ``restore``; they are kept until then.
+            months (int): Months to keep instead of ``retention_months``.
+
+        Returns:
+            list: First days of the archived months.
+        """
+        months = self.retention_months if months is None else months
+        if not months:
+            return []
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        cutoff = add_months(month_start(now), 1 - months)
+        archived = []
+        for month, restored in sorted(self.partitions().items()):
+            if month < cutoff and (include_restored or not restored):
+                self.archive(month)
+                archived.append(month)
+        return archived
+
+    def maintain(self, now=None):
+        """
+        Creates upcoming partitions and applies the retention policy.
+
+        Returns:
+            dict: ``created`` and ``archived`` months.
+        """
+        created = self.create_partitions(now)
+        return {"created": created, "archived": self.apply_retention(now)}
+
+    def restore(self, first, last=None):
+        """
+        Loads archived months back into ``news``.
+
+        A restored partition is marked so the retention policy keeps it
+        until it is archived with ``include_restored``. Months that are in
+        the table already or have no archive are skipped. The daily counts
+        of the restored months are rebuilt.
+
+        Args:
+            first (datetime): A day of the first month.
+            last (datetime): A day of the last month (optional, only
+                ``first``'s month by default).
+
+        Returns:
+            dict: First day of every restored month -> number of rows.
+
+        Raises:
+            ValueError: If an archive holds another number of rows than its
+                manifest says.
+        """
+        first = month_start(first)
+        last = month_start(last or first)
+        archives = self.archives()
+        restored = {}
+        month = first
+        while month <= last:
+            if month in archives:
+                rows = self._restore_month(month, archives[month])
+                if rows is not None:
+                    restored[month] = rows
+            month = add_months(month, 1)
+        return restored
+
+    def _restore_month(self, month, manifest):
+        name = partition_name(month)
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_ID,))
+            if month in self.partitions(cursor):
+                print(f"⚠️ {month:%Y-%m} is in the table already, not restored")
+                return None
+            with gzip.open(self._archive_path(month), "rb") as f:
+                moved = self._create_partition(cursor, month, load=f)
+            cursor.execute(f"SELECT count(*) FROM {name}")
+            rows = cursor.fetchone()[0] - moved
+            if rows != manifest["rows"]:
+                raise ValueError(
+                    f"Archive of {month:%Y-%m} holds {rows} rows, its manifest {manifest['rows']}"
+                )
+            # Archives from before news_urls existed may hold unregistered URLs
+            cursor.execute(
+                f"""INSERT INTO news_urls (url_key, published_at)
+                    SELECT url_key, published_at FROM {name}
+                    ON CONFLICT (url_key) DO NOTHING"""
+            )
+            cursor.execute(f"COMMENT ON TABLE {name} IS %s", (RESTORED_COMMENT,))
+            cursor.execute(f"ANALYZE {name}")
+        rebuild_counts(self.pool, month.date(), add_months(month, 1).date() - timedelta(days=1))
+        print(f"📂 Restored {rows} articles of {month:%Y-%m}")
+        return rows
+
+    def stats(self):
+        """
+        Returns the partitions and archives.
+
+        Returns:
+            dict: Months in the table (``partitions``, with the
+            ``restored`` ones), rows waiting in the default partition, and
+            archived months with their number of rows.
+        """
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            partitions = self.partitions(cursor)
+            cursor.execute(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+            default_rows = cursor.fetchone()[0]
+        return {
+            "partitions": [f"{month:%Y-%m}" for month in sorted(partitions)],
+            "restored": [f"{month:%Y-%m}" for month, r in sorted(partitions.items()) if r],
+            "default_rows": default_rows,
+            "archives": {
+                f"{month:%Y-%m}": manifest["rows"]
+                for month, manifest in sorted(self.archives().items())
+            },
+            "retention_months": self.retention_months,
+        }
@@ -0,0 +1,83 @@
+"""
+Fixtures shared by the tests.
+
+Tests that need PostgreSQL use the ``postgres`` fixture. It connects with
+the same environment variables as the app (``DB_NAME``, ``DB_USER``,
+``BD_PASSWORD``, ``DB_HOST``), only ever touches a scratch ``tests``
+schema, and skips the test when no database can be reached.
+"""
+
+import os
+
+import psycopg2
+import pytest
+
+from db import ConnectionPool
+from schema import migrate
+
+TEST_SCHEMA = "tests"
+
+
+def db_config():
+    """Returns connection parameters for the scratch schema."""
+    return {
+        "dbname": os.getenv("DB_NAME", "newsdb"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("BD_PASSWORD"),
+        "host": os.getenv("DB_HOST", "localhost"),
+        "options": f"-c search_path={TEST_SCHEMA}",
+    }
+
+
+@pytest.fixture
+def postgres():
+    """
+    Recreates the scratch schema, applies all migrations to it and returns
+    its connection parameters.
+    """
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **db_config())
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+    with conn, conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {TEST_SCHEMA}")
+    conn.close()
+
+    pool = ConnectionPool(minconn=1, maxconn=1, **db_config())
+    migrate(pool)
+    pool.close()
+    return db_config()
+
+
+@pytest.fixture
+def news_app(postgres, monkeypatch, tmp_path):
+    """The Flask app module, reading and writing the scratch schema."""
+    monkeypatch.setenv("NEWS_INDEX_DIR", str(tmp_path / "news-index"))
+    import app  # only tests taking this fixture need the app and its dependencies
+    from embeddings import EmbeddingIndex
+
+    monkeypatch.setattr(app.db_pool, "dsn", {**app.db_pool.dsn, **postgres})
+    index = EmbeddingIndex(str(tmp_path / "news-index"), app.news_index.embedder)
+    monkeypatch.setattr(app, "news_index", index)
+    monkeypatch.setattr(app.report_store, "root", str(tmp_path / "reports"))
+    monkeypatch.setattr(app.app, "secret_key", app.app.secret_key or "tests")
+    yield app
+    app.db_pool.close()
+
+
+def seed(pool, rows, **options):
+    """Stores ``rows`` synthetic articles (see ``benchmarks.synthetic_articles``)."""
+    from benchmarks import synthetic_articles
+    from ingest import bulk_save_news, normalize_article
+
+    articles = synthetic_articles(rows, **options)
+    bulk_save_news(pool, [normalize_article(a, c) for a, c in articles], 5000)
+
+
+@pytest.fixture
+def pool(postgres):
+    """Connection pool of the scratch schema."""
+    pool = ConnectionPool(minconn=1, maxconn=4, **postgres)
+    yield pool
+    pool.close()
@@ -0,0 +1,95 @@
+import time
+
+from flask import Flask, jsonify
+
+from cache import LocalSharedBackend, LRUCache, PostgresBackend, ResponseCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_bounds_bytes_and_expires():
+    cache = LRUCache(max_bytes=10, ttl=0.05)
+    cache.set("big", "x", size=11)
+    assert cache.get("big") is None
+    cache.set("a", "x", size=6)
+    cache.set("b", "y", size=6)
+    assert cache.get("a") is None and cache.get("b") == "y"
+    time.sleep(0.06)
+    assert cache.get("b") is None
+
+
+def test_local_shared_backend():
+    backend = LocalSharedBackend()
+    assert backend.set("k", b"1", nx=True)
+    assert not backend.set("k", b"2", nx=True)
+    assert backend.incr("n") == 1 and backend.incr("n") == 2
+    assert backend.mget(["k", "n", "missing"]) == [b"1", b"2", None]
+
+
+def cached_app(cache):
+    app = Flask(__name__)
+    calls = []
+
+    @app.route("/news")
+    @cache.cached(lambda: ["news", "date:2025-04-12"])
+    def news():
+        calls.append(1)
+        return jsonify({"calls": len(calls)})
+
+    return app.test_client(), calls
+
+
+def test_response_cache_serves_and_validates():
+    cache = ResponseCache(LRUCache(), shared=LocalSharedBackend())
+    client, calls = cached_app(cache)
+
+    first = client.get("/news")
+    assert first.status_code == 200 and first.get_etag()[0]
+    assert client.get("/news").get_json() == {"calls": 1}
+    assert client.get("/news", headers={"If-None-Match": first.get_etag()[0]}).status_code == 304
+    assert len(calls) == 1
+
+    cache.bump(["date:2025-04-12"])
+    changed = client.get("/news", headers={"If-None-Match": first.get_etag()[0]})
+    assert changed.status_code == 200 and changed.get_etag() != first.get_etag()
+    assert len(calls) == 2
+    cache.bump(["date:2025-04-13"])  # another day
+    assert client.get("/news", headers={"If-None-Match": changed.get_etag()[0]}).status_code == 304
+
+
+def test_response_cache_shares_versions_between_workers():
+    shared = LocalSharedBackend()
+    worker, ingest = ResponseCache(LRUCache(), shared), ResponseCache(LRUCache(), shared)
+    client, _ = cached_app(worker)
+    etag = client.get("/news").get_etag()[0]
+    ingest.bump(["news"])
+    assert client.get("/news", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_postgres_backend_shares_versions(pool):
+    worker = ResponseCache(LRUCache(), versions=PostgresBackend(pool))
+    ingest = ResponseCache(LRUCache(), versions=PostgresBackend(pool))
+    client, calls = cached_app(worker)
+    etag = client.get("/news").get_etag()[0]
+    assert client.get("/news", headers={"If-None-Match": etag}).status_code == 304
+    ingest.bump(["date:2025-04-12"])
+    assert client.get("/news", headers={"If-None-Match": etag}).status_code == 200
+    assert len(calls) == 2
+
+
+def test_postgres_backend(pool):
+    backend = PostgresBackend(pool)
+    assert backend.set("k", b"1", nx=True)
+    assert not backend.set("k", b"2", nx=True)
+    assert backend.set("k", b"3")
+    assert backend.incr("n") == 1 and backend.incr("n") == 2
+    assert backend.mget(["k", "n", "missing"]) == [b"3", b"2", None]
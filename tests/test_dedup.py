@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dedup import NearDuplicateIndex, canonical_url
+
+STORY = (
+    "Storm floods the coastal towns overnight",
+    "Heavy rain and wind forced hundreds of families to leave their homes on the coast.",
+)
+OTHER = (
+    "Central bank holds interest rates steady",
+    "The bank kept its key rate unchanged and signalled cuts later in the year.",
+)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com/news/story",
+        "http://www.example.com/news/story/",
+        "https://EXAMPLE.com//news/story#comments",
+        "https://example.com:443/news/story?utm_source=feed&fbclid=abc",
+    ],
+)
+def test_canonical_url_merges_variants(url):
+    assert canonical_url(url) == "https://example.com/news/story"
+
+
+def test_canonical_url_keeps_meaningful_parts():
+    assert canonical_url("https://example.com/a?b=2&a=1") == "https://example.com/a?a=1&b=2"
+    assert canonical_url("https://example.com:8080/a") == "https://example.com:8080/a"
+    assert canonical_url("https://example.com/a") != canonical_url("https://example.com/b")
+    assert canonical_url(" ftp://example.com/a ") == "ftp://example.com/a"
+
+
+def test_signatures_estimate_similarity():
+    index = NearDuplicateIndex()
+    same, edited, other = index.signatures(
+        [STORY, (STORY[0] + " - Daily News", STORY[1]), OTHER]
+    )
+    assert (same == edited).mean() == 1.0  # the publisher suffix is ignored
+    assert (same == other).mean() < 0.2
+
+
+def test_assign_clusters_near_duplicates():
+    index = NearDuplicateIndex()
+    now = datetime(2025, 4, 12, 10)
+    clusters = index.assign(
+        [
+            (1, *STORY, now),
+            (2, *OTHER, now),
+            (3, STORY[0], STORY[1].replace("hundreds", "many"), now + timedelta(hours=1)),
+        ]
+    )
+    assert clusters == [1, 2, 1]
+    # Too far apart in time to be the same story
+    assert index.assign([(4, *STORY, now + timedelta(days=30))]) == [4]
+
+
+def test_forget_takes_articles_out():
+    index = NearDuplicateIndex()
+    now = datetime(2025, 4, 12, 10)
+    index.assign([(1, *STORY, now)])
+    index.forget([1])
+    assert len(index) == 0
+    assert index.assign([(2, *STORY, now)]) == [2]
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import numpy as np
+
+from embeddings import EmbeddingIndex, HashingEmbedder, build_index
+from tests.conftest import seed
+
+ARTICLES = [
+    (1, "Storm floods coastal towns", "Rain forced families out", datetime(2025, 4, 10), "general"),
+    (2, "Bank holds interest rates", "The rate stays unchanged", datetime(2025, 4, 11), "business"),
+    (3, "Coastal storm damage grows", "Towns count flood damage", datetime(2025, 4, 12), "general"),
+]
+
+def test_hashing_embedder_is_normalized_and_deterministic():
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed(["storm floods towns", "storm floods towns", ""])
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert (vectors[0] == vectors[1]).all() and not vectors[2].any()
+
+
+def test_index_search_ranks_and_filters(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), HashingEmbedder(dim=256))
+    index.add(*map(list, zip(*ARTICLES)))
+    assert len(index) == 3 and sorted(index.ids()) == [1, 2, 3]
+    assert [i for i, _ in index.search("coastal storm floods")][:2] == [1, 3]
+    assert [i for i, _ in index.search("storm", category="business")] == []
+    assert [i for i, _ in index.search("storm", start=datetime(2025, 4, 12))] == [3]
+
+
+def test_build_index_adds_articles_below_the_highest_indexed_id(pool, tmp_path):
+    seed(pool, 300)
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, title, description, published_at, category FROM news ORDER BY id"
+        )
+        rows = cursor.fetchall()
+    index = EmbeddingIndex(str(tmp_path), HashingEmbedder(dim=64))
+    # The append of an earlier batch failed, a later one went through
+    index.add(*map(list, zip(*rows[150:])))
+
+    assert build_index(pool, index, chunk_size=100) == 150
+    assert sorted(index.ids()) == [row[0] for row in rows]
+    assert build_index(pool, index) == 0
+
+
+def test_ingest_indexes_articles_whose_append_failed(news_app, monkeypatch):
+    from benchmarks import synthetic_articles
+    from ingest import bulk_save_news, normalize_article
+
+    news_app.index_missing_news()
+    add = news_app.news_index.add
+
+    def failing_add(*args):
+        raise RuntimeError("embedder unavailable")
+
+    monkeypatch.setattr(news_app.news_index, "add", failing_add)
+    rows = [normalize_article(a, c) for a, c in synthetic_articles(20)]
+    bulk_save_news(news_app.db_pool, rows, on_insert=news_app.news_inserted)
+    assert len(news_app.news_index) == 0 and news_app.news_index_behind.is_set()
+
+    monkeypatch.setattr(news_app.news_index, "add", add)
+    assert news_app.index_missing_news() == 20
+    assert not news_app.news_index_behind.is_set()
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from fetcher import Fetcher, TokenBucket, retry_after_seconds
+from newsapi_fixture import NewsAPIFixture
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("3") == 3.0
+    assert retry_after_seconds("-1") == 0.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+    assert 8 < retry_after_seconds(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert retry_after_seconds(formatdate(time.time() - 10, usegmt=True)) == 0.0
+
+
+def test_token_bucket_spaces_out_requests():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_pause_holds_back_requests():
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.pause(0.5)
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.01)
+
+
+@pytest.fixture
+def newsapi():
+    fixture = NewsAPIFixture()
+    yield fixture
+    fixture.stop()
+
+
+def test_fetcher_retries_server_errors_and_rate_limits(newsapi):
+    newsapi.error_rate = 0.3
+    newsapi.rate_limit = 20
+    url = newsapi.start()
+
+    async def fetch():
+        fetcher = Fetcher(concurrency=8, rate=1000, burst=100, backoff=0.01, max_attempts=10)
+        async with fetcher:
+            return await asyncio.gather(
+                *(fetcher.get_json(url, {"q": "sports"}) for _ in range(40))
+            )
+
+    results = asyncio.run(fetch())
+    assert all(status == 200 for status, _ in results)
+    assert newsapi.faults["errors"] + newsapi.faults["rate_limited"] > 0
+
+
+def test_fetcher_gives_up_after_max_attempts(newsapi):
+    newsapi.error_rate = 1.0
+    url = newsapi.start()
+    fetcher = Fetcher(backoff=0.01, max_attempts=3)
+
+    async def fetch():
+        async with fetcher:
+            return await fetcher.get_json(url, {"q": "sports"})
+
+    status, data = asyncio.run(fetch())
+    assert status == 503 and data["code"] == "unexpectedError"
+    assert fetcher.stats()["requests"] == 3 and fetcher.stats()["failures"] == 1
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fetcher import Fetcher
+from ingest import fetch_new_articles, ingest_progress, normalize_article, parse_published_at
+from newsapi_fixture import NewsAPIFixture
+
+NOW = datetime(2025, 4, 12, 12)
+
+
+def articles(n, category="sports", start=NOW - timedelta(days=2)):
+    for i in range(n):
+        published = start + timedelta(minutes=10 * i)
+        yield {
+            "title": f"Article {i}",
+            "description": "Description.",
+            "url": f"https://example.com/{category}/{i}",
+            "source": {"name": "Source"},
+            "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }, category
+
+
+@pytest.fixture
+def newsapi():
+    fixture = NewsAPIFixture(articles(50))
+    fixture.url = fixture.start()
+    yield fixture
+    fixture.stop()
+
+
+def fetch(newsapi, since, **options):
+    async def run():
+        async with Fetcher(rate=1000, burst=100) as fetcher:
+            return await fetch_new_articles(
+                fetcher, "sports", since, "key", url=newsapi.url, **options
+            )
+
+    return asyncio.run(run())
+
+
+def test_normalize_article_skips_incomplete_and_removed():
+    article, _ = next(articles(1))
+    assert normalize_article(article, "sports")[2] == "https://example.com/sports/0"
+    assert normalize_article({**article, "url": ""}, "sports") is None
+    assert normalize_article({**article, "title": "[Removed]"}, "sports") is None
+
+
+def test_parse_published_at():
+    assert parse_published_at("2025-04-12T10:30:00Z") == datetime(2025, 4, 12, 10, 30)
+
+
+def test_fetch_new_articles_pages_until_the_end(newsapi):
+    result = fetch(newsapi, NOW - timedelta(days=2), page_size=20)
+    assert result["ok"] and not result["truncated"]
+    assert len(result["articles"]) == 50 and result["requests"] == 3
+    times = [parse_published_at(a["publishedAt"]) for a in result["articles"]]
+    assert times == sorted(times, reverse=True)
+
+
+def test_fetch_new_articles_only_asks_for_new_ones(newsapi):
+    since = NOW - timedelta(days=2) + timedelta(minutes=10 * 45)
+    result = fetch(newsapi, since, page_size=20)
+    assert [a["title"] for a in result["articles"]] == [f"Article {i}" for i in range(49, 44, -1)]
+    assert result["requests"] == 1
+
+
+def test_fetch_new_articles_reports_truncation(newsapi):
+    result = fetch(newsapi, NOW - timedelta(days=2), page_size=10, max_pages=2)
+    assert result["truncated"] and len(result["articles"]) == 20
+    newsapi.max_results = 30
+    result = fetch(newsapi, NOW - timedelta(days=2), page_size=10, max_pages=5)
+    assert result["truncated"] and len(result["articles"]) == 30  # maximumResultsReached
+
+
+def test_fetch_new_articles_fails_on_api_errors(newsapi):
+    newsapi.api_key = "other"
+    result = fetch(newsapi, NOW - timedelta(days=2))
+    assert not result["ok"] and result["articles"] == []
+
+
+def test_fetch_new_articles_until(newsapi):
+    until = NOW - timedelta(days=2) + timedelta(minutes=10 * 4)
+    result = fetch(newsapi, NOW - timedelta(days=2), until=until)
+    assert [a["title"] for a in result["articles"]] == [f"Article {i}" for i in range(4, -1, -1)]
+
+
+def test_truncated_runs_leave_a_gap_that_later_runs_close(newsapi):
+    mark, gap, titles = NOW - timedelta(days=2), None, set()
+    for run in range(10):
+        fresh = fetch(newsapi, mark, page_size=10, max_pages=2)
+        backlog = gap and fetch(newsapi, gap[0], until=gap[1], page_size=10, max_pages=2)
+        for result in (fresh, backlog or {"articles": []}):
+            titles.update(a["title"] for a in result["articles"])
+        newest, gap = ingest_progress(mark, gap, fresh, backlog)
+        mark = newest or mark
+        if run == 0:
+            oldest = parse_published_at(fresh["articles"][-1]["publishedAt"])
+            assert gap == (NOW - timedelta(days=2), oldest)
+        if gap is None:
+            break
+    assert titles == {f"Article {i}" for i in range(50)}
+    assert run == 2  # 20 + 20 + 10 articles
+
+
+def test_ingest_progress_keeps_the_gap_when_its_fetch_fails():
+    gap = (NOW - timedelta(days=2), NOW - timedelta(days=1))
+    failed = {"articles": [], "truncated": False, "ok": False}
+    nothing = {"articles": [], "truncated": False, "ok": True}
+    assert ingest_progress(NOW, gap, nothing, failed) == (None, gap)
+    assert ingest_progress(NOW, gap, failed) == (None, gap)
+    assert ingest_progress(NOW, gap, nothing, nothing) == (None, None)
+
+
+def test_ingest_fetches_what_truncated_runs_skipped(news_app, monkeypatch):
+    start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=1)
+    newsapi = NewsAPIFixture(articles(50, start=start), max_results=20)
+    monkeypatch.setattr(news_app, "NEWS_API_URL", newsapi.start())
+    monkeypatch.setattr(news_app, "INGEST_PAGE_SIZE", 10)
+    monkeypatch.setattr(news_app, "INGEST_BACKFILL_DAYS", 2)
+    monkeypatch.setattr(news_app, "categories", ["sports"])
+    try:
+        runs = [news_app.fetch_and_store_news() for _ in range(4)]
+    finally:
+        newsapi.stop()
+
+    assert runs[0]["truncated"] == ["sports"] and runs[0]["inserted"] == 20
+    assert [run["gaps"] for run in runs] == [["sports"], ["sports"], [], []]
+    assert sum(run["inserted"] for run in runs) == 50
+    assert news_app.load_ingest_gaps(news_app.db_pool) == {}
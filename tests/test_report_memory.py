@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks import CATEGORIES, synthetic_articles
+
+DATE = "2025-04-12"
+
+
+def report_rows(articles):
+    """Yields ``articles`` report rows of DATE, ordered by category like ``iter_news_by_date``."""
+    per_category = articles // len(CATEGORIES)
+    for seed, category in enumerate(CATEGORIES):
+        stories = synthetic_articles(per_category, seed=seed)
+        for i, (article, _) in enumerate(stories):
+            published = datetime(2025, 4, 12) + timedelta(seconds=i * 86400 // per_category)
+            yield article["title"], article["url"], category, published, article["source"]["name"]
+
+
+def report_rss_growth(articles, materialize):
+    """
+    Builds a report of ``articles`` rows in this (fresh) process.
+
+    Returns:
+        int: Growth of the peak RSS while the report was built, in bytes.
+    """
+    import app
+    from pdf import create_backend
+
+    counts = {category: articles // len(CATEGORIES) for category in CATEGORIES}
+    app.get_chart = lambda date: app.chart_cache.get(date, counts)  # no database
+    renderer = create_backend("native")
+    with tempfile.TemporaryDirectory() as out:
+        # Fonts, the chart and the code paths are loaded before measuring
+        app.generate_pdf(DATE, report_rows(100), renderer, "en", os.path.join(out, "warm.pdf"))
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rows = report_rows(articles)
+        if materialize:
+            rows = list(rows)  # like fetchall() did
+        app.generate_pdf(DATE, rows, renderer, "en", os.path.join(out, "report.pdf"))
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (after - before) * 1024  # ru_maxrss is in KiB on Linux
+
+
+def rss_growth(articles, materialize=False):
+    # A new process per report, so peak RSS is not carried over
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as ex:
+        return ex.submit(report_rss_growth, articles, materialize).result()
+
+
+@pytest.mark.skipif(not hasattr(resource, "RUSAGE_SELF"), reason="needs getrusage")
+def test_streamed_report_memory_does_not_grow_with_the_day():
+    small = rss_growth(2_000)
+    large = rss_growth(50_000)
+    held = rss_growth(50_000, materialize=True)
+    assert large - small < 8 * 2**20
+    # The check can tell: holding the day's rows needs more than that
+    assert held - small > 8 * 2**20
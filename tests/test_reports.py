@@ -0,0 +1,25 @@
+import time
+from datetime import datetime, timedelta
+
+from tests.conftest import seed
+
+
+def test_report_download_does_not_expose_paths(news_app, tmp_path):
+    day = (datetime.now() - timedelta(days=1)).date()
+    seed(news_app.db_pool, 50, day=day)
+    client = news_app.app.test_client()
+
+    building = client.get(f"/reports/{day}?lang=en")
+    assert building.status_code == 202
+    download_url = building.get_json()["download_url"]
+    for _ in range(100):
+        job = client.get(building.get_json()["status_url"]).get_json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.1)
+    assert job["status"] == "done"
+    assert job["result"] == download_url
+    assert str(tmp_path) not in str(job)
+
+    report = client.get(download_url)
+    assert report.status_code == 200 and report.data.startswith(b"%PDF")
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+from schema import PlanRecordingCursor, find_seq_scans
+from tests.conftest import seed
+
+
+def seq_scan(relation):
+    return {"Node Type": "Seq Scan", "Relation Name": relation}
+
+
+def test_find_seq_scans_matches_news_and_its_partitions():
+    plan = {
+        "Node Type": "Append",
+        "Plans": [
+            seq_scan("news_2025_04"),
+            {"Node Type": "Index Scan", "Relation Name": "news_2025_05"},
+            {"Node Type": "Nested Loop", "Plans": [seq_scan("news_default")]},
+        ],
+    }
+    assert [scan["Relation Name"] for scan in find_seq_scans(plan)] == [
+        "news_2025_04",
+        "news_default",
+    ]
+
+
+def test_find_seq_scans_ignores_other_tables():
+    assert find_seq_scans(seq_scan("news_daily_counts")) == []
+    assert find_seq_scans(seq_scan("news_urls")) == []
+    assert find_seq_scans(seq_scan("chat_sessions"), table="news") == []
+    assert find_seq_scans(seq_scan("chat_sessions"), table="chat_sessions") != []
+
+
+def test_endpoints_use_indexes(news_app, monkeypatch):
+    """
+    Every query of the read endpoints can use an index of ``news``.
+
+    Sequential scans are disabled, so the planner only picks one for a
+    query no index can serve; that keeps the check meaningful on a small
+    table. An endpoint that errors out or runs no query fails as well.
+    """
+    from benchmarks import VOCABULARY
+    from embeddings import build_index
+    from llm import CachingModel, FakeModel
+
+    app = news_app
+    seed(app.db_pool, 20_000, days=365)
+    # Like ingest does, move the seeded months out of the default partition
+    app.news_storage.create_partitions()
+    with app.db_pool.connection() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE news")
+        conn.autocommit = False
+    app.db_pool.close()
+
+    options = f"{app.db_pool.dsn['options']} -c enable_seqscan=off"
+    app.db_pool.dsn.update(options=options, cursor_factory=PlanRecordingCursor)
+    monkeypatch.setattr(app, "model", CachingModel(FakeModel(first_token_delay=0, token_delay=0)))
+    build_index(app.db_pool, app.news_index)
+    client = app.app.test_client()
+    date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    word = VOCABULARY[400]
+
+    def second_page_cursor():
+        return client.get(f"/articles?date={date}&limit=10").get_json()["next_cursor"]
+
+    checks = {
+        "news_exists_for": lambda: app.news_exists_for("sports", date),
+        "generate_chart": lambda: app.generate_chart(date),
+        "get_news_by_date": lambda: app.get_news_by_date(date),
+        "iter_news_by_date": lambda: list(app.iter_news_by_date(date)),
+        "/news-by-date": lambda: client.get(f"/news-by-date?date={date}"),
+        "/news-by-category": lambda: client.get("/news-by-category?category=sports"),
+        "/news-by-category-and-date": lambda: client.get(
+            f"/news-by-category-and-date?category=sports&date={date}"
+        ),
+        "/articles": lambda: client.get(f"/articles?date={date}"),
+        "/articles (next page)": lambda: client.get(
+            f"/articles?date={date}&cursor={second_page_cursor()}"
+        ),
+        "/articles (every copy)": lambda: client.get(f"/articles?date={date}&collapse=0"),
+        "/articles (filters)": lambda: client.get(
+            f"/articles?start={date}&end={date}&category=sports,health"
+            "&source=Source 1&fields=title,url"
+        ),
+        "/daily-data": lambda: client.get(f"/daily-data?date={date}"),
+        "/weekly-data": lambda: client.get("/weekly-data"),
+        "/search": lambda: client.get(f"/search?q={word}"),
+        "/search (with date)": lambda: client.get(f"/search?q={word}&date={date}"),
+        "/chat": lambda: client.post("/chat", json={"message": "Any storms?", "date": date}),
+        "/chat (week)": lambda: client.post(
+            "/chat", json={"message": "Any storms?", "date": date, "scope": "week"}
+        ),
+    }
+
+    failed = {}
+    for name, call in checks.items():
+        PlanRecordingCursor.plans.clear()
+        result = call()
+        # Routes return a response; an error page would run no queries at all
+        status = getattr(result, "status_code", 200)
+        if status != 200:
+            failed[name] = f"HTTP {status}"
+        elif not PlanRecordingCursor.plans:
+            failed[name] = "no plans"
+        elif any(find_seq_scans(plan) for _, plan in PlanRecordingCursor.plans):
+            failed[name] = "seq scan"
+    assert failed == {}
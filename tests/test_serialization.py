@@ -0,0 +1,25 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from serialization import create_encoder, iter_json_array
+
+COLUMNS = ("title", "published_at")
+
+
+@pytest.mark.parametrize("name", ["stdlib", "orjson"])
+@pytest.mark.parametrize("count", [0, 1, 3, 7])
+def test_iter_json_array_matches_one_shot_encoding(name, count):
+    encoder = create_encoder(name)
+    rows = [(f"Title {i}", datetime(2025, 4, 12, 10, i)) for i in range(count)]
+    body = b"".join(iter_json_array(encoder, COLUMNS, iter(rows), batch_size=3))
+    assert json.loads(body) == [
+        {"title": title, "published_at": published.isoformat()} for title, published in rows
+    ]
+    assert body.endswith(b"]\n")
+
+
+def test_iter_json_array_encodes_a_batch_at_a_time():
+    chunks = list(iter_json_array(create_encoder("stdlib"), COLUMNS, [("a", None)] * 5, 2))
+    assert len(chunks) == 2 + 3  # brackets around three batches
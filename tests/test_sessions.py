@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sessions import ChatSessionStore, MemorySessionBackend, PostgresSessionBackend
+
+
+@pytest.fixture(params=["memory", "postgres"])
+def backend(request):
+    if request.param == "memory":
+        return MemorySessionBackend()
+    return PostgresSessionBackend(request.getfixturevalue("pool"))
+
+
+def test_append_folds_old_turns_into_the_summary(backend):
+    store = ChatSessionStore(backend, keep_turns=2)
+    for i in range(5):
+        store.append("chat", f"question {i}?", f"Answer {i}. More.")
+
+    conversation = store.load("chat")
+    turns = [t["user"] for t in conversation["turns"]]
+    assert turns == ["question 2?", "question 3?", "question 4?"]
+    assert "question 0?" in conversation["summary"] and "Answer 1." in conversation["summary"]
+    assert "More" not in conversation["summary"]
+    assert store.stats()["summaries"] == 1
+
+
+def test_concurrent_appends_keep_every_turn(backend):
+    store = ChatSessionStore(backend, keep_turns=50)
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: store.append("chat", f"q{i}", f"a{i}"), range(40)))
+
+    turns = store.load("chat")["turns"]
+    assert sorted(t["user"] for t in turns) == sorted(f"q{i}" for i in range(40))
+
+
+def test_summarizing_does_not_block_the_chat_or_lose_turns(backend):
+    summarizing, release = threading.Event(), threading.Event()
+
+    def summarize(summary, turns):
+        if not summarizing.is_set():
+            # Only the first call waits, like a slow model
+            summarizing.set()
+            assert release.wait(5)
+        return " ".join([summary, *(t["user"] for t in turns)]).strip()
+
+    store = ChatSessionStore(backend, summarize=summarize, keep_turns=1)
+    store.append("chat", "q0", "a0")
+    store.append("chat", "q1", "a1")
+    with ThreadPoolExecutor(1) as executor:
+        folding = executor.submit(store.append, "chat", "q2", "a2")
+        assert summarizing.wait(5)
+        # Neither a lock nor a row lock is held while the model is called
+        store.append("chat", "q3", "a3")
+        release.set()
+        folding.result(timeout=5)
+
+    conversation = store.load("chat")
+    folded = conversation["summary"].split()
+    assert sorted(folded + [t["user"] for t in conversation["turns"]]) == ["q0", "q1", "q2", "q3"]
+    assert len(folded) == len(set(folded))
+    assert store.stats()["summary_failures"] == 0
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+
+import psycopg2
+import pytest
+
+from storage import NewsStorage
+from tests.conftest import seed
+
+MONTH = datetime(2025, 3, 1)
+
+
+def count(pool, table="news"):
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+def test_archive_publishes_the_manifest_only_after_the_drop(pool, tmp_path):
+    seed(pool, 200, day=date(2025, 3, 15))
+    storage = NewsStorage(pool, archive_dir=str(tmp_path))
+    storage.create_partitions(now=MONTH)
+    rows = count(pool, "news_2025_03")
+    assert rows == 200
+
+    # A view on the partition makes its DROP fail, after the rows were written
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("CREATE VIEW blocks_drop AS SELECT id FROM news_2025_03")
+    with pytest.raises(psycopg2.errors.DependentObjectsStillExist):
+        storage.archive(MONTH)
+    assert storage.archives() == {}
+    assert MONTH in storage.partitions() and count(pool) == 200
+
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("DROP VIEW blocks_drop")
+    assert storage.archive(MONTH) == 200  # the rows of the failed attempt are not added twice
+    assert storage.archives()[MONTH]["rows"] == 200
+    assert count(pool) == 0
+
+    assert storage.restore(MONTH) == {MONTH: 200}
+    assert count(pool) == 200
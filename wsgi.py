@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers.
+
+Usage:
+    gunicorn -c gunicorn.conf.py
+"""
+
+from app import app, start_background_work
+
+start_background_work()
+application = app